@@ -0,0 +1,97 @@
+"""
+Latency and score-parity benchmark: SparseBM25Index vs rank_bm25.BM25Okapi.
+
+    python -m benchmarks.bm25_engine --subject cloud_devops_docs_v1 --queries queries.txt
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.common import load_queries, sample_queries
+from core.constants import SUBJECT_CLOUD_DEVOPS_DOCS_V1
+from ingestion.storage.local_store import open_chunk_store
+from retrieval.bm25_index import SparseBM25Index, tokenize
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "mean_ms": float(arr.mean()),
+    }
+
+
+def run_benchmark(docs: List[List[str]], queries: List[str], top_k: int = 10) -> Dict[str, Dict]:
+    from rank_bm25 import BM25Okapi  # pyright: ignore[reportMissingImports]
+
+    start = time.perf_counter()
+    sparse_index = SparseBM25Index.build(docs)
+    sparse_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    okapi = BM25Okapi(docs)
+    okapi_build = time.perf_counter() - start
+
+    sparse_times, okapi_times = [], []
+    max_abs_diff = 0.0
+    overlaps = []
+
+    for query in queries:
+        tokens = tokenize(query)
+
+        start = time.perf_counter()
+        sparse_top, _ = sparse_index.top_k(tokens, top_k)
+        sparse_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        okapi_scores = okapi.get_scores(tokens)
+        okapi_top = np.argsort(okapi_scores)[::-1][:top_k]
+        okapi_times.append(time.perf_counter() - start)
+
+        sparse_scores = sparse_index.get_scores(tokens)
+        max_abs_diff = max(max_abs_diff, float(np.max(np.abs(sparse_scores - okapi_scores))))
+        overlaps.append(len(set(sparse_top) & set(okapi_top)) / max(len(okapi_top), 1))
+
+    return {
+        "sparse": {"build_s": sparse_build, **_percentiles(sparse_times)},
+        "rank_bm25": {"build_s": okapi_build, **_percentiles(okapi_times)},
+        "parity": {
+            "max_abs_score_diff": max_abs_diff,
+            "mean_top_k_overlap": float(np.mean(overlaps)) if overlaps else 1.0,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--queries", type=Path, help="one query per line; sampled from the corpus if omitted")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    store = open_chunk_store(args.subject)
+    docs = [tokenize(text) for text in store.iter_texts()]
+    queries = load_queries(args.queries) if args.queries else sample_queries(docs, args.num_queries)
+
+    print(f">>> BM25 benchmark: {len(docs)} docs, {len(queries)} queries, top_k={args.top_k}")
+    report = run_benchmark(docs, queries, args.top_k)
+    for engine in ("sparse", "rank_bm25"):
+        r = report[engine]
+        print(
+            f"{engine:>10}: build={r['build_s']:.3f}s "
+            f"p50={r['p50_ms']:.3f}ms p95={r['p95_ms']:.3f}ms mean={r['mean_ms']:.3f}ms"
+        )
+    print(
+        f"    parity: max |score diff|={report['parity']['max_abs_score_diff']:.2e} "
+        f"top-k overlap={report['parity']['mean_top_k_overlap']:.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
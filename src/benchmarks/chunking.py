@@ -0,0 +1,100 @@
+"""
+Chunk count and embedded-token comparison: recursive_chunker vs token_chunker.
+
+    python -m benchmarks.chunking --subject cloud_devops_docs_v1 --chunk-tokens 512
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from core.constants import SUBJECT_CLOUD_DEVOPS_DOCS_V1
+from ingestion.chunkers.recursive_chunker import recursive_chunker
+from ingestion.chunkers.token_chunker import token_chunker
+from ingestion.corpus import load_corpus
+from ingestion.loaders.text_loader import load_pdf_by_page
+
+
+def load_pages(subject: str) -> List[Tuple[object, int, str]]:
+    return [
+        (source, page, text)
+        for source in load_corpus(subject)
+        for page, text in load_pdf_by_page(source.path)
+    ]
+
+
+def chunk_stats(chunker, pages: Iterable[Tuple[object, int, str]], subject: str, encoding) -> Dict[str, float]:
+    start = time.perf_counter()
+    chunks = [
+        c
+        for source, page, text in pages
+        for c in chunker.chunk(text=text, subject=subject, source=source, page=page)
+    ]
+    seconds = time.perf_counter() - start
+
+    tokens = np.asarray(
+        [len(t) for t in encoding.encode_batch([c["text"] for c in chunks], disallowed_special=())]
+        if chunks else [],
+        dtype=np.int64,
+    )
+    return {
+        "chunks": len(chunks),
+        "embedded_tokens": int(tokens.sum()),
+        "mean_tokens": float(tokens.mean()) if tokens.size else 0.0,
+        "max_tokens": int(tokens.max()) if tokens.size else 0,
+        "chunking_s": seconds,
+    }
+
+
+def compare(pages, subject: str, chunk_tokens: int = 512, overlap_tokens: int = 64, encoding=None) -> Dict[str, Dict]:
+    if encoding is None:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+
+    report = {
+        "recursive": chunk_stats(recursive_chunker(), pages, subject, encoding),
+        "token": chunk_stats(
+            token_chunker(chunk_tokens, overlap_tokens, encoding=encoding), pages, subject, encoding
+        ),
+    }
+    base, new = report["recursive"], report["token"]
+    report["reduction"] = {
+        "chunks": 1 - new["chunks"] / base["chunks"] if base["chunks"] else 0.0,
+        "embedded_tokens": 1 - new["embedded_tokens"] / base["embedded_tokens"] if base["embedded_tokens"] else 0.0,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--chunk-tokens", type=int, default=512)
+    parser.add_argument("--overlap-tokens", type=int, default=64)
+    parser.add_argument("--out", type=Path, help="optional JSON report path")
+    args = parser.parse_args()
+
+    pages = load_pages(args.subject)
+    print(f">>> Chunking benchmark: {len(pages)} pages, budget={args.chunk_tokens} overlap={args.overlap_tokens}")
+    report = compare(pages, args.subject, args.chunk_tokens, args.overlap_tokens)
+    for name in ("recursive", "token"):
+        r = report[name]
+        print(
+            f"{name:>10}: chunks={r['chunks']} tokens={r['embedded_tokens']} "
+            f"mean={r['mean_tokens']:.1f} max={r['max_tokens']} time={r['chunking_s']:.2f}s"
+        )
+    print(
+        f"  reduction: chunks={report['reduction']['chunks']:.1%} "
+        f"embedded tokens={report['reduction']['embedded_tokens']:.1%}"
+    )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+keystone-bench: load-generation benchmark for retrieval strategies.
+
+    python -m benchmarks.cli --subject cloud_devops_docs_v1 --queries queries.txt \
+        --strategy dense sparse hybrid --top-k 5 10 --mode open --qps 200
+
+Queries are embedded with the deterministic HashEmbedder, so runs are
+offline and reproducible; dense scores are not meaningful, latency is.
+The repo is not packaged, so "keystone-bench" is only the program name:
+run it as a module with src on PYTHONPATH. Failed requests are excluded
+from latency and reported by exception type.
+"""
+
+import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import index_dim, load_queries, sample_queries
+from benchmarks.load import closed_loop, open_loop
+from config.strategy import STRATEGIES, strategy_config
+from core.constants import SUBJECT_CLOUD_DEVOPS_DOCS_V1
+from embeddings.fake_embedder import HashEmbedder
+from ingestion.storage.local_store import open_chunk_store
+from retrieval.bm25_index import tokenize
+from retrieval.interfaces import MetadataFilter
+from retrieval.pipeline import RetrievalPipeline
+from retrieval.result_cache import ResultCache
+
+
+def run_strategy(
+    name: str,
+    subject: str,
+    queries: List[str],
+    top_ks: List[int],
+    mode: str = "closed",
+    concurrency: int = 1,
+    qps: Optional[float] = None,
+    num_requests: int = 1000,
+    warmup: int = 20,
+    alpha: float = 0.5,
+    cache_size: int = 0,
+    filter: Optional[MetadataFilter] = None
+) -> List[Dict[str, Any]]:
+    config = strategy_config(name, subject, alpha)
+    embedder = HashEmbedder(index_dim(subject)) if name != "sparse" else None
+    cache = ResultCache(max_entries=cache_size) if cache_size > 0 else None
+    pipeline = RetrievalPipeline(config, embedder=embedder, cache=cache)
+
+    reports = []
+    try:
+        for top_k in top_ks:
+            def fn(query, top_k=top_k):
+                return pipeline.run(query, top_k, filter)
+
+            # Warm caches and lazy loads outside the measured window
+            for i in range(warmup):
+                fn(queries[i % len(queries)])
+            pipeline.telemetry.reset()
+
+            if mode == "open":
+                result = open_loop(fn, queries, qps, num_requests)
+            else:
+                result = closed_loop(fn, queries, concurrency, num_requests)
+
+            reports.append({
+                "strategy": name,
+                "top_k": top_k,
+                **result.to_dict(),
+                "stages": pipeline.telemetry.summary(),
+                "counters": pipeline.telemetry.get_counters(),
+            })
+    finally:
+        pipeline.close()
+    return reports
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="keystone-bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--queries", type=Path, help="one query per line; sampled from the corpus if omitted")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--strategy", nargs="+", choices=STRATEGIES, default=["dense", "sparse", "hybrid"])
+    parser.add_argument("--top-k", nargs="+", type=int, default=[5])
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=1, help="closed loop: in-flight requests")
+    parser.add_argument("--qps", type=float, default=100.0, help="open loop: mean Poisson arrival rate")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--cache-size", type=int, default=0, help="result cache entries; 0 disables the cache")
+    parser.add_argument("--filter-source", nargs="+", help="restrict retrieval to these source ids")
+    parser.add_argument("--filter-pages", nargs=2, type=int, metavar=("MIN", "MAX"), help="restrict retrieval to a page range")
+    parser.add_argument("--out", type=Path, help="optional JSON report path")
+    args = parser.parse_args(argv)
+
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        docs = [tokenize(t) for t in open_chunk_store(args.subject).iter_texts()]
+        queries = sample_queries(docs, args.num_queries)
+
+    filter = None
+    if args.filter_source or args.filter_pages:
+        page_min, page_max = args.filter_pages or (None, None)
+        filter = MetadataFilter(args.filter_source, page_min, page_max)
+
+    print(f">>> keystone-bench: {len(queries)} queries, mode={args.mode}, requests={args.requests}")
+    reports = []
+    for name in args.strategy:
+        # A fresh spawned process per strategy, so peak RSS is that strategy's
+        # own rather than the high-water mark of every strategy before it
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            strategy_reports = pool.submit(
+                run_strategy, name, args.subject, queries, args.top_k, args.mode,
+                args.concurrency, args.qps, args.requests, args.warmup, args.alpha,
+                args.cache_size, filter
+            ).result()
+        for r in strategy_reports:
+            lat = r["latency_ms"]
+            rss = f"{r['peak_rss_mb']:.0f}MB" if r["peak_rss_mb"] is not None else "n/a"
+            print(
+                f"{name:>10} top_k={r['top_k']:<3} qps={r['throughput_qps']:.1f} "
+                f"p50={lat.get('p50', 0):.2f}ms p95={lat.get('p95', 0):.2f}ms p99={lat.get('p99', 0):.2f}ms "
+                f"cpu={r['cpu_s']:.2f}s rss={rss} errors={r['errors']}"
+            )
+            if r["errors"]:
+                # Latency covers successful requests only; make failures impossible to miss
+                types = ", ".join(f"{t}={n}" for t, n in r["error_types"].items())
+                print(f">>> {name} top_k={r['top_k']}: {r['errors']}/{r['requests']} requests failed ({types}); first: {r['first_error']}")
+            reports.append(r)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
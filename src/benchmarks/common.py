@@ -0,0 +1,42 @@
+"""
+Query sets and index facts shared by the benchmark entry points.
+"""
+
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from core.constants import EMBEDDING_MANIFEST_FILENAME, FAISS_INDEX_FILENAME
+
+
+def load_queries(path: Path) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def sample_queries(docs: List[List[str]], n: int, seed: int = 0) -> List[str]:
+    # Short queries drawn from corpus tokens so every query has postings
+    rng = np.random.default_rng(seed)
+    queries = []
+    for doc_id in rng.integers(0, len(docs), size=n):
+        tokens = docs[doc_id] or ["empty"]
+        take = rng.integers(2, 6)
+        queries.append(" ".join(rng.choice(tokens, size=min(take, len(tokens)), replace=False)))
+    return queries
+
+
+def index_dim(subject: str) -> int:
+    subject_dir = Path("data/processed") / subject
+    manifest_path = subject_dir / EMBEDDING_MANIFEST_FILENAME
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return int(json.load(f)["dim"])
+    index_path = subject_dir / FAISS_INDEX_FILENAME
+    if not index_path.exists():
+        raise FileNotFoundError(f"FAISS index file not found at {index_path}")
+    # Only indexes without a manifest need faiss
+    from embeddings.index_factory import read_index_mmap
+
+    return read_index_mmap(index_path).d
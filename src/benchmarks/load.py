@@ -0,0 +1,200 @@
+"""
+Closed-loop and open-loop load generation against any `fn(query)` callable.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process so far. It never decreases, so
+    compare strategies by running each in its own process.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class LoadResult:
+    mode: str
+    requests: int
+    errors: int
+    duration_s: float
+    throughput_qps: float
+    cpu_s: float
+    peak_rss_mb: Optional[float]
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    params: Dict[str, Any] = field(default_factory=dict)
+    # Failed requests per exception type, and the first failure as "Type: message"
+    error_types: Dict[str, int] = field(default_factory=dict)
+    first_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    arr = np.asarray(samples) * 1000
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+        "max": float(arr.max()),
+    }
+
+
+def _warmup(fn: Callable[[str], Any], queries: List[str], warmup: int):
+    for i in range(warmup):
+        fn(queries[i % len(queries)])
+
+
+class _Errors:
+    """
+    Failed requests of one run: how many, of which types, and the first one.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.types: Counter = Counter()
+        self.first: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, error: Exception):
+        with self._lock:
+            self.count += 1
+            self.types[type(error).__name__] += 1
+            if self.first is None:
+                self.first = f"{type(error).__name__}: {error}"
+
+
+def _result(mode, latencies, errors: _Errors, wall, cpu, params) -> LoadResult:
+    done = len(latencies)
+    return LoadResult(
+        mode=mode,
+        requests=done + errors.count,
+        errors=errors.count,
+        duration_s=wall,
+        throughput_qps=done / wall if wall > 0 else 0.0,
+        cpu_s=cpu,
+        peak_rss_mb=peak_rss_mb(),
+        latency_ms=_latency_summary(latencies),
+        params=params,
+        error_types=dict(errors.types),
+        first_error=errors.first,
+    )
+
+
+def closed_loop(
+    fn: Callable[[str], Any],
+    queries: List[str],
+    concurrency: int = 1,
+    num_requests: int = 1000,
+    warmup: int = 0
+) -> LoadResult:
+    """
+    `concurrency` workers each issue the next query as soon as their
+    previous one returns, until `num_requests` have been sent.
+    """
+    if not queries:
+        raise ValueError("queries must not be empty")
+    if concurrency <= 0 or num_requests <= 0:
+        raise ValueError("concurrency and num_requests must be positive integers")
+    _warmup(fn, queries, warmup)
+
+    next_request = iter(range(num_requests))
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = _Errors()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                fn(queries[i % len(queries)])
+            except Exception as e:
+                errors.record(e)
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    return _result("closed", latencies, errors, wall, cpu, {"concurrency": concurrency})
+
+
+def open_loop(
+    fn: Callable[[str], Any],
+    queries: List[str],
+    qps: float,
+    num_requests: int = 1000,
+    max_workers: int = 64,
+    seed: int = 0,
+    warmup: int = 0
+) -> LoadResult:
+    """
+    Requests arrive as a Poisson process at `qps` regardless of how fast
+    earlier ones complete. Latency is measured from each request's scheduled
+    arrival, so time spent queued behind a slow system is counted instead
+    of hidden (no coordinated omission).
+    """
+    if not queries:
+        raise ValueError("queries must not be empty")
+    if qps <= 0 or num_requests <= 0:
+        raise ValueError("qps and num_requests must be positive")
+    _warmup(fn, queries, warmup)
+
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1.0 / qps, size=num_requests))
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = _Errors()
+
+    def issue(i: int, scheduled: float):
+        try:
+            fn(queries[i % len(queries)])
+        except Exception as e:
+            errors.record(e)
+            return
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            latencies.append(elapsed)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i, offset in enumerate(arrivals):
+            scheduled = wall_start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(issue, i, scheduled)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    return _result("open", latencies, errors, wall, cpu, {"target_qps": qps, "seed": seed})
@@ -0,0 +1,106 @@
+"""
+Throughput and latency of the micro-batching server vs one request per call.
+
+    python -m benchmarks.serving --subject cloud_devops_docs_v1 --concurrency 64 \
+        --batch-size 1 8 32 --max-wait-ms 2 --embed-latency-ms 5
+
+Queries are embedded with HashEmbedder; --embed-latency-ms adds a fixed
+per-call delay standing in for a remote or GPU embedder.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import index_dim, load_queries, sample_queries
+from benchmarks.load import closed_loop
+from config.strategy import strategy_config
+from core.constants import SUBJECT_CLOUD_DEVOPS_DOCS_V1
+from embeddings.fake_embedder import HashEmbedder
+from ingestion.storage.local_store import open_chunk_store
+from retrieval.bm25_index import tokenize
+from retrieval.pipeline import RetrievalPipeline
+from serving.batching import MicroBatchServer
+
+
+def run_batch_size(
+    subject: str,
+    queries: List[str],
+    batch_size: int,
+    max_wait_ms: float = 2.0,
+    concurrency: int = 64,
+    num_requests: int = 2000,
+    top_k: int = 5,
+    embed_latency_ms: float = 0.0,
+    warmup: int = 20
+) -> Dict[str, Any]:
+    embedder = HashEmbedder(index_dim(subject), call_latency_ms=embed_latency_ms)
+    pipeline = RetrievalPipeline(strategy_config("dense", subject), embedder=embedder)
+    server = MicroBatchServer(pipeline, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+    server.start_in_thread()
+    try:
+        def fn(query):
+            return server.query_sync(query, top_k)
+
+        for i in range(warmup):
+            fn(queries[i % len(queries)])
+        pipeline.telemetry.reset()
+        server.reset_stats()
+
+        result = closed_loop(fn, queries, concurrency, num_requests)
+        return {
+            "batch_size": batch_size,
+            "max_wait_ms": max_wait_ms,
+            **result.to_dict(),
+            "server": server.stats(),
+        }
+    finally:
+        server.stop_thread()
+        pipeline.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--queries", type=Path, help="one query per line; sampled from the corpus if omitted")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--batch-size", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--out", type=Path, help="optional JSON report path")
+    args = parser.parse_args(argv)
+
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        docs = [tokenize(t) for t in open_chunk_store(args.subject).iter_texts()]
+        queries = sample_queries(docs, args.num_queries)
+
+    print(f">>> Serving benchmark: {len(queries)} queries, concurrency={args.concurrency}, requests={args.requests}")
+    reports = []
+    for batch_size in args.batch_size:
+        r = run_batch_size(
+            args.subject, queries, batch_size, args.max_wait_ms, args.concurrency,
+            args.requests, args.top_k, args.embed_latency_ms, args.warmup
+        )
+        lat, sizes = r["latency_ms"], r["server"]["batch_size"]
+        print(
+            f"batch<={batch_size:<4} qps={r['throughput_qps']:.1f} "
+            f"p50={lat.get('p50', 0):.2f}ms p99={lat.get('p99', 0):.2f}ms "
+            f"mean_batch={sizes.get('mean', 0):.1f} batches={sizes['count']} errors={r['errors']}"
+        )
+        reports.append(r)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Cold-start cost per strategy: import time, construction time and time to first query.
+
+    python -m benchmarks.startup --subject cloud_devops_docs_v1 \
+        --strategy dense sparse hybrid --load eager lazy background
+
+Every measurement runs in a fresh interpreter, so module imports and index
+loads are paid exactly as a newly started worker pays them.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.constants import SUBJECT_CLOUD_DEVOPS_DOCS_V1
+
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("scipy", "faiss", "torch", "sentence_transformers", "tiktoken", "openai")
+
+
+def _child(strategy: str, subject: str, load: str, dim: int, query: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    from config.strategy import strategy_config
+    from embeddings.fake_embedder import HashEmbedder
+    from retrieval.pipeline import RetrievalPipeline
+    imported = time.perf_counter()
+    heavy_at_import = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    embedder = HashEmbedder(dim) if strategy != "sparse" else None
+    pipeline = RetrievalPipeline(strategy_config(strategy, subject), embedder=embedder, load=load)
+    constructed = time.perf_counter()
+
+    pipeline.run(query, 5)
+    first_query = time.perf_counter()
+    pipeline.run(query, 5)
+    second_query = time.perf_counter()
+    pipeline.close()
+
+    return {
+        "strategy": strategy,
+        "load": load,
+        "import_s": imported - start,
+        "construct_s": constructed - imported,
+        "first_query_s": first_query - constructed,
+        "time_to_first_result_s": first_query - start,
+        "warm_query_s": second_query - first_query,
+        "heavy_modules_at_import": heavy_at_import,
+    }
+
+
+def measure(strategy: str, subject: str, load: str, dim: int, query: str) -> Dict[str, Any]:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")]))}
+    # The child imports only this module before timing starts
+    code = (
+        "import json, sys; from benchmarks.startup import _child; "
+        "print(json.dumps(_child(*sys.argv[1:4], int(sys.argv[4]), sys.argv[5])))"
+    )
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code, strategy, subject, load, str(dim), query],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    report["process_s"] = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    # Imported here, not at module level: children import this module and
+    # would load numpy and the strategy config before their timers start
+    from benchmarks.common import index_dim
+    from config.strategy import STRATEGIES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--strategy", nargs="+", choices=STRATEGIES, default=["dense", "sparse", "hybrid"])
+    parser.add_argument("--load", nargs="+", choices=("eager", "lazy", "background"), default=["eager", "background"])
+    parser.add_argument("--query", default="how do I roll back a deployment")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, help="optional JSON report path")
+    args = parser.parse_args(argv)
+
+    dims = {s: index_dim(args.subject) for s in args.strategy if s != "sparse"}
+    print(f">>> Startup benchmark: subject={args.subject}, repeat={args.repeat}")
+    reports = []
+    for strategy in args.strategy:
+        for load in args.load:
+            runs = [
+                measure(strategy, args.subject, load, dims.get(strategy, 0), args.query)
+                for _ in range(args.repeat)
+            ]
+            # Medians damp one-off disk cache effects
+            r = {
+                k: sorted(run[k] for run in runs)[len(runs) // 2] if isinstance(v, float) else v
+                for k, v in runs[0].items()
+            }
+            print(
+                f"{strategy:>10} load={load:<10} import={r['import_s'] * 1000:.0f}ms "
+                f"construct={r['construct_s'] * 1000:.0f}ms first_query={r['first_query_s'] * 1000:.0f}ms "
+                f"ttfr={r['time_to_first_result_s'] * 1000:.0f}ms"
+            )
+            reports.append(r)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Recall, latency and size of float32 vs float16 vs int8 vector storage.
+
+    python -m benchmarks.vector_storage --subject cloud_devops_docs_v1 --index-type flat
+"""
+
+import argparse
+import json
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from core.constants import EMBEDDINGS_FILENAME, SUBJECT_CLOUD_DEVOPS_DOCS_V1
+from embeddings.index_factory import (
+    INDEX_TYPES,
+    STORAGE_TYPES,
+    IndexConfig,
+    build_faiss_index,
+    decode_vectors,
+    encode_vectors,
+    recall_report
+)
+from embeddings.normalize import l2_normalize
+
+
+def compare(
+    vectors: np.ndarray,
+    config: Optional[IndexConfig] = None,
+    k: int = 10,
+    num_queries: int = 500
+) -> Dict[str, Any]:
+    """
+    One recall_report per storage type, each against exact float32 search,
+    plus the index and embeddings.npy sizes.
+    """
+    config = config or IndexConfig()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    report: Dict[str, Any] = {}
+    for storage in STORAGE_TYPES:
+        cfg = replace(config, storage=storage)
+        index = build_faiss_index(vectors, cfg)
+        r = recall_report(index, vectors, cfg, k=k, num_queries=num_queries)
+        stored = encode_vectors(vectors, storage)
+        r["index_bytes"] = int(faiss.serialize_index(index).size)
+        r["npy_bytes"] = int(stored.nbytes)
+        r["max_abs_decode_error"] = float(np.abs(decode_vectors(stored) - vectors).max())
+        report[storage] = r
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--out", type=Path, help="optional JSON report path")
+    args = parser.parse_args()
+
+    path = Path("data/processed") / args.subject / EMBEDDINGS_FILENAME
+    if not path.exists():
+        raise FileNotFoundError(f"Embeddings not found at {path}")
+    vectors = l2_normalize(decode_vectors(np.load(path, mmap_mode="r")))
+
+    print(f">>> Storage comparison: {vectors.shape[0]} vectors, dim={vectors.shape[1]}, index={args.index_type}")
+    report = compare(vectors, IndexConfig(type=args.index_type), args.k, args.num_queries)
+    for storage, r in report.items():
+        best = r["operating_points"][-1]
+        recall_key = f"recall@{r['k']}"
+        print(
+            f"{storage:>8}: {recall_key}={best[recall_key]:.4f} "
+            f"latency={best['latency_ms_per_query']:.3f}ms/query "
+            f"index={r['index_bytes'] / 2**20:.1f}MiB npy={r['npy_bytes'] / 2**20:.1f}MiB"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
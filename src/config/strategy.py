@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from embeddings.index_config import IndexConfig
+
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    """
+    A retrieval strategy as consumed by RetrievalFactory.
+
+    `index` selects the FAISS index built by run_embeddings for the
+    strategy's dense subject. With `sharded=True` each subject is served
+    through its shard_subject() shards (or as one shard if it has none).
+    """
+    type: str = "dense"
+    subject: Optional[str] = None
+    dense_subject: Optional[str] = None
+    sparse_subject: Optional[str] = None
+    alpha: float = 0.5
+    fusion: str = "weighted"           # "weighted" or "rrf"
+    candidate_k: Optional[int] = None  # per-leg depth; defaults to 4 * top_k
+    index: IndexConfig = field(default_factory=IndexConfig)
+    sharded: bool = False
+
+
+STRATEGIES = ("dense", "sparse", "hybrid", "hybrid_rrf")
+
+
+def strategy_config(name: str, subject: str, alpha: float = 0.5) -> StrategyConfig:
+    """
+    StrategyConfig for a named strategy over a single subject.
+    """
+    if name == "hybrid_rrf":
+        return StrategyConfig(type="hybrid", dense_subject=subject, sparse_subject=subject, alpha=alpha, fusion="rrf")
+    if name == "hybrid":
+        return StrategyConfig(type="hybrid", dense_subject=subject, sparse_subject=subject, alpha=alpha)
+    if name in ("dense", "sparse"):
+        return StrategyConfig(type=name, subject=subject)
+    raise ValueError(f"Unknown strategy '{name}', expected one of {STRATEGIES}")
@@ -35,6 +35,16 @@ META_END_CHAR = "end_char"
 
 # -------- Filenames --------
 CHUNKS_FILENAME = "chunks.json"
+CHUNK_STORE_DIRNAME = "chunk_store"
 EMBEDDINGS_FILENAME = "embeddings.npy"
+# Full-precision copy kept next to reduced-precision embeddings, for reuse
+EMBEDDINGS_FLOAT32_FILENAME = "embeddings_float32.npy"
 METADATA_FILENAME = "metadata.json"
 FAISS_INDEX_FILENAME = "faiss.index"
+INDEX_REPORT_FILENAME = "index_report.json"
+VECTOR_METADATA_FILENAME = "vector_metadata.json"
+VECTOR_IDS_FILENAME = "vector_ids.npy"
+EMBEDDING_MANIFEST_FILENAME = "embedding_manifest.json"
+EMBEDDING_CHECKPOINT_DIRNAME = "embedding_checkpoint"
+BM25_INDEX_DIRNAME = "bm25"
+DEDUP_ALIASES_FILENAME = "dedup_aliases.json"
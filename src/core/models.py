@@ -1,5 +1,7 @@
-from dataclasses import dataclass
-from typing import Any, List, Dict
+from dataclasses import dataclass, replace
+from typing import Any, List, Dict, Tuple
+
+import numpy as np
 
 
 @dataclass
@@ -24,3 +26,120 @@ class RAGResponse:
     sources: List[Dict[str, Any]]
     metrics: Dict[str, Any]
     latency: Dict[str, float]
+
+
+class _ResultListStore:
+    """
+    Store view over materialized RetrievalResults, row i being results[i].
+    Lets results from retrievers without a chunk store ride in a ResultBatch.
+    """
+
+    def __init__(self, results: List[RetrievalResult]):
+        self.results = results
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def chunk_id(self, row: int) -> str:
+        return self.results[row].id
+
+    def source_id(self, row: int) -> str:
+        return self.results[row].source_id
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in ("page", "chunk_index"):
+            raise KeyError(f"Unknown result column: {name}")
+        return np.array([getattr(r, name) for r in self.results], dtype=np.int64)
+
+    def to_result(self, row: int, score: float) -> RetrievalResult:
+        return replace(self.results[row], score=float(score))
+
+
+@dataclass
+class ResultBatch:
+    """
+    Struct-of-arrays results for a batch of queries over one chunk store.
+
+    `rows` and `scores` are (Q, K) arrays, best first per query; a row of -1
+    pads queries with fewer than K hits. Metadata columns are read from
+    `store` only when asked for, and RetrievalResult objects are only built
+    by to_results(), at the API edge.
+    """
+    rows: np.ndarray
+    scores: np.ndarray
+    store: Any  # ChunkStore, or anything with chunk_id / source_id / column / to_result
+
+    def __post_init__(self):
+        self.rows = np.asarray(self.rows, dtype=np.int64)
+        self.scores = np.asarray(self.scores)
+        if not np.issubdtype(self.scores.dtype, np.floating):
+            self.scores = self.scores.astype(np.float32)
+        if self.rows.ndim != 2 or self.rows.shape != self.scores.shape:
+            raise ValueError("rows and scores must be (num_queries, k) arrays of the same shape")
+
+    @classmethod
+    def empty(cls, num_queries: int, store: Any) -> "ResultBatch":
+        return cls(np.empty((num_queries, 0), dtype=np.int64), np.empty((num_queries, 0), dtype=np.float32), store)
+
+    @classmethod
+    def from_results(cls, results: List[List[RetrievalResult]]) -> "ResultBatch":
+        flat = [r for per_query in results for r in per_query]
+        width = max((len(r) for r in results), default=0)
+        rows = np.full((len(results), width), -1, dtype=np.int64)
+        scores = np.zeros((len(results), width), dtype=np.float64)
+        start = 0
+        for q, per_query in enumerate(results):
+            n = len(per_query)
+            rows[q, :n] = np.arange(start, start + n)
+            scores[q, :n] = [r.score for r in per_query]
+            start += n
+        return cls(rows, scores, _ResultListStore(flat))
+
+    def __len__(self) -> int:
+        return self.rows.shape[0]
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.rows >= 0
+
+    def counts(self) -> np.ndarray:
+        return self.valid.sum(axis=1)
+
+    def hits(self, q: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, scores) of query q without padding.
+        """
+        n = int(self.valid[q].sum())
+        return self.rows[q, :n], self.scores[q, :n]
+
+    def select(self, keep: np.ndarray) -> "ResultBatch":
+        """
+        Keeps the entries where `keep` is True, packed to the front of each
+        query in their original order.
+        """
+        keep = np.asarray(keep, dtype=bool) & self.valid
+        order = np.argsort(~keep, axis=1, kind="stable")
+        kept = np.take_along_axis(keep, order, axis=1)
+        width = int(kept.sum(axis=1).max(initial=0))
+        rows = np.where(kept, np.take_along_axis(self.rows, order, axis=1), -1)[:, :width]
+        scores = np.where(kept, np.take_along_axis(self.scores, order, axis=1), 0.0)[:, :width]
+        return ResultBatch(rows, scores, self.store)
+
+    def truncate(self, k: int) -> "ResultBatch":
+        return ResultBatch(self.rows[:, :k], self.scores[:, :k], self.store)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        (Q, K) values of a store metadata column, -1 at padding.
+        """
+        values = np.asarray(self.store.column(name))
+        return np.where(self.valid, values[np.maximum(self.rows, 0)], -1)
+
+    def ids(self, q: int) -> List[str]:
+        return [self.store.chunk_id(int(row)) for row in self.hits(q)[0]]
+
+    def to_results(self) -> List[List[RetrievalResult]]:
+        return [
+            [self.store.to_result(int(row), score) for row, score in zip(*self.hits(q))]
+            for q in range(len(self))
+        ]
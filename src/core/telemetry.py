@@ -1,18 +1,231 @@
+import contextvars
+import json
+import math
+import threading
 import time
-from contextlib import contextmanager
-from typing import Dict
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+
+# Names of the spans open in the current thread / task, outermost first
+_span_path: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar(
+    "telemetry_span_path", default=()
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencySketch:
+    """
+    DDSketch-style latency histogram.
+
+    Samples land in logarithmic buckets whose width is a fixed fraction of
+    their value, so every quantile is within `relative_accuracy` of the true
+    sample and memory grows with the log of the value range, not the sample
+    count. Sketches with the same accuracy merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: "LatencySketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative_accuracy")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("q must be in [0, 1]")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                # Exact extremes are known; keep estimates inside them
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        out = {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_s": self.sum / self.count if self.count else 0.0,
+            "min_s": self.min if self.count else 0.0,
+            "max_s": self.max if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            out[f"p{round(q * 100)}_s"] = self.quantile(q) or 0.0
+        return out
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "path", "token", "start")
+
+    def __init__(self, recorder: "TelemetryRecorder", name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.path = _span_path.get() + (self.name,)
+        self.token = _span_path.set(self.path)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _span_path.reset(self.token)
+        self.recorder._record(self.name, "/".join(self.path), elapsed)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
 
 
 class TelemetryRecorder:
-    def __init__(self):
+    """
+    Per-stage latency histograms with nested spans.
+
+    `stage()` opens a span; spans opened inside it (in the same thread or
+    asyncio task, or in work submitted with a copied context) are recorded
+    under their full path, e.g. "retrieval/dense/embed_query". Every sample
+    is kept in a LatencySketch, so p50/p95/p99 survive long runs. A disabled
+    recorder hands out a shared no-op span and records nothing.
+    """
+
+    def __init__(self, enabled: bool = True, relative_accuracy: float = 0.01):
+        self.enabled = enabled
+        self.relative_accuracy = relative_accuracy
         self.timings: Dict[str, float] = {}
+        self.histograms: Dict[str, LatencySketch] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: Union[str, Enum]):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name.value if isinstance(name, Enum) else name)
 
-    @contextmanager
-    def stage(self, name: str):
-        start = time.perf_counter()
-        yield
-        end = time.perf_counter()
-        self.timings[name] = end - start
+    def _record(self, name: str, path: str, seconds: float):
+        with self._lock:
+            self.timings[name] = seconds
+            sketch = self.histograms.get(path)
+            if sketch is None:
+                sketch = self.histograms[path] = LatencySketch(self.relative_accuracy)
+            sketch.add(seconds)
+
+    def record(self, name: Union[str, Enum], seconds: float):
+        """
+        Adds an externally measured sample, nested under the open spans.
+        """
+        if not self.enabled:
+            return
+        name = name.value if isinstance(name, Enum) else name
+        self._record(name, "/".join(_span_path.get() + (name,)), seconds)
+
+    def increment(self, name: str, value: float = 1.0):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + value
+
+    def get_counters(self) -> Dict[str, float]:
+        with self._lock:
+            return self.counters.copy()
 
     def get_timings(self) -> Dict[str, float]:
-        return self.timings.copy()
+        # Last sample per stage name
+        with self._lock:
+            return self.timings.copy()
+
+    def merge(self, other: "TelemetryRecorder"):
+        with self._lock:
+            for path, sketch in other.histograms.items():
+                mine = self.histograms.get(path)
+                if mine is None:
+                    mine = self.histograms[path] = LatencySketch(self.relative_accuracy)
+                mine.merge(sketch)
+            self.timings.update(other.timings)
+            for name, value in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0.0) + value
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.histograms.clear()
+            self.counters.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {path: s.summary() for path, s in sorted(self.histograms.items())}
+
+    def to_json(self, path: Optional[Path] = None) -> str:
+        payload = json.dumps({"stages": self.summary(), "counters": self.get_counters()}, indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(payload)
+        return payload
+
+    def to_prometheus(self, metric: str = "keystone_stage_latency_seconds") -> str:
+        """
+        Prometheus text exposition, one summary series per span path.
+        """
+        lines = [
+            f"# HELP {metric} Stage latency in seconds.",
+            f"# TYPE {metric} summary",
+        ]
+        for path, s in self.summary().items():
+            label = path.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                value = s[f"p{round(q * 100)}_s"]
+                lines.append(f'{metric}{{stage="{label}",quantile="{q}"}} {value:.9g}')
+            lines.append(f'{metric}_sum{{stage="{label}"}} {s["sum_s"]:.9g}')
+            lines.append(f'{metric}_count{{stage="{label}"}} {s["count"]}')
+        for name, value in sorted(self.get_counters().items()):
+            counter = "keystone_" + "".join(c if c.isalnum() else "_" for c in name) + "_total"
+            lines.append(f"# TYPE {counter} counter")
+            lines.append(f"{counter} {value:.9g}")
+        return "\n".join(lines) + "\n"
@@ -8,6 +8,14 @@ class BaseEmbedder(ABC):
   def embed_documents(self, texts: List[str])->np.ndarray:
     #returns a np array of size(N,D)
     pass
+
+  def embed_query(self, text: str)->np.ndarray:
+    #returns a np array of size(1,D)
+    return self.embed_documents([text])
+
+  def embed_queries(self, texts: List[str])->np.ndarray:
+    #returns a np array of size(Q,D); one request for the whole batch
+    return self.embed_documents(texts)
   
   @staticmethod
   def L2_normalize(vectors:np.ndarray)->np.ndarray:
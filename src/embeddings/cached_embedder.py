@@ -0,0 +1,177 @@
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings.base import BaseEmbedder
+
+
+def normalize_text(text: str) -> str:
+    # Unicode NFC and collapsed whitespace; case is kept since it can change embeddings
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbedder(BaseEmbedder):
+    """
+    Caching layer around any embedder.
+
+    Vectors are keyed on model name, role (document, or query plus the
+    embedder's query_prompt) and a hash of the normalized text, held
+    in a bounded in-memory LRU and optionally persisted to SQLite so the
+    cache survives restarts. Only texts missing from both tiers reach the
+    wrapped embedder, in a single batched call.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        max_entries: int = 10_000,
+        cache_path: Optional[Path] = None,
+        model: Optional[str] = None
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer")
+
+        self.embedder = embedder
+        self.model = model or getattr(embedder, "model", type(embedder).__name__)
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if cache_path is not None:
+            cache_path = Path(cache_path)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def cache_key(self, text: str, as_query: bool = False) -> str:
+        # Query vectors can differ from document vectors (e.g. a query prompt)
+        role = "q" + (getattr(self.embedder, "query_prompt", None) or "") if as_query else "d"
+        payload = f"{self.model}\0{role}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Tuple[Dict[str, np.ndarray], int]:
+        """
+        Vectors found in either tier, and how many keys the LRU served.
+        """
+        found: Dict[str, np.ndarray] = {}
+        disk_keys: Dict[str, None] = {}
+        memory_hits = 0
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+                    memory_hits += 1
+                else:
+                    disk_keys[key] = None
+
+            rows = []
+            if self._db is not None:
+                pending = list(disk_keys)
+                # Bounded IN lists stay under SQLite's host parameter limit
+                for start in range(0, len(pending), 500):
+                    part = pending[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows.extend(self._db.execute(
+                        f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})",
+                        part,
+                    ).fetchall())
+            for key, dim, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32, count=dim).copy()
+                found[key] = vector
+                self._remember(key, vector)
+        return found, memory_hits
+
+    def _store(self, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self._db is not None and vectors:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                    [(k, int(v.shape[0]), v.astype(np.float32).tobytes()) for k, v in vectors.items()],
+                )
+                self._db.commit()
+
+    def _embed(self, texts: List[str], as_queries: bool) -> np.ndarray:
+        if not texts:
+            raise ValueError("CachedEmbedder received an empty input list")
+
+        keys = [self.cache_key(t, as_queries) for t in texts]
+        found, memory_hits = self._lookup(keys)
+
+        # Each distinct missing text is embedded once, in one call
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            inner = self.embedder.embed_documents
+            if as_queries and hasattr(self.embedder, "embed_queries"):
+                inner = self.embedder.embed_queries
+            vectors = np.asarray(inner(list(missing.values())), dtype=np.float32)
+            if vectors.shape[0] != len(missing):
+                raise RuntimeError(
+                    f"Embedder returned {vectors.shape[0]} vectors for {len(missing)} texts"
+                )
+            fresh = dict(zip(missing, vectors))
+            self._store(fresh)
+            found.update(fresh)
+
+        misses = sum(1 for k in keys if k in missing)
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += len(keys) - memory_hits - misses
+            self.misses += misses
+
+        return np.vstack([found[k] for k in keys])
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self._embed(texts, as_queries=False)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed([text], as_queries=True)
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self._embed(texts, as_queries=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._lru),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
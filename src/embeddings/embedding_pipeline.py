@@ -1,63 +1,318 @@
+import argparse
+import hashlib
 import json
+import shutil
 import numpy as np
+from dataclasses import asdict
 from pathlib import Path
-from typing import List,Dict
+from typing import Any,Iterator,List,Dict,Optional,Tuple
 import faiss
 
-from core.constants import (SUBJECT_CLOUD_DEVOPS_DOCS_V1,CHUNKS_FILENAME)
+from core.constants import (
+    SUBJECT_CLOUD_DEVOPS_DOCS_V1,
+    EMBEDDINGS_FILENAME,
+    EMBEDDINGS_FLOAT32_FILENAME,
+    FAISS_INDEX_FILENAME,
+    INDEX_REPORT_FILENAME,
+    VECTOR_METADATA_FILENAME,
+    VECTOR_IDS_FILENAME,
+    EMBEDDING_MANIFEST_FILENAME,
+    EMBEDDING_CHECKPOINT_DIRNAME
+)
+from embeddings.fake_embedder import HashEmbedder
+from embeddings.local_embedder import LocalEmbedder
 from embeddings.openai_embedder import OpenAIEmbedder
 from embeddings.normalize import l2_normalize
+from ingestion.storage.local_store import open_chunk_store
+from embeddings.index_factory import (
+    INDEX_TYPES,
+    STORAGE_TYPES,
+    IndexConfig,
+    build_id_mapped_index,
+    encode_vectors,
+    recall_report,
+    supports_removal,
+    write_index_atomic
+)
 
-def load_chunks(subject:str)->List[Dict]:
-    chunks_path=Path("data/processed")/subject/CHUNKS_FILENAME
-    if not chunks_path.exists():
-        raise FileNotFoundError(f"Chunks file not found at {chunks_path}")
-    with open(chunks_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def build_faiss_index(vectors:np.ndarray)->faiss.Index:
-    dim=vectors.shape[1]
-    index=faiss.IndexFlatIP(dim)
-    index.add(vectors)
-    return index
-
-    
-def run_embeddings(subject:str):
-    
-    print(f">>> Running embedding pipeline for subject: {subject}")
+def load_chunks(subject:str)->Iterator[Dict]:
+    # Streams rows from the chunk store instead of materializing the corpus
+    return open_chunk_store(subject).iter_chunks()
 
-    chunks=load_chunks(subject)
+EMBEDDERS=("openai","local","hash")
 
-    texts=[c["text"] for c in chunks]
-    metadata=[
-        {
-            "id":c["id"],
-            **c["metadata"]
-        } for c in chunks
-    ]
-    print(f">>> Loaded {len(texts)} chunks and {len(metadata)} metadata")
+def make_embedder(name:str="openai", model:Optional[str]=None):
+    # "local" runs sentence-transformers on this machine; "hash" is the offline fake
+    if name=="local":
+        return LocalEmbedder(model) if model else LocalEmbedder()
+    if name=="hash":
+        return HashEmbedder()
+    if name=="openai":
+        return OpenAIEmbedder(model) if model else OpenAIEmbedder()
+    raise ValueError(f"Unknown embedder '{name}', expected one of {EMBEDDERS}")
 
-    embedder=OpenAIEmbedder()
-    vectors=embedder.embed_documents(texts)
+def content_hash(text:str)->str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-    print(f">>> Generated embeddings: shape={vectors.shape}")
+def vector_id(chunk_id:str)->int:
+    # Stable non-negative int64 FAISS label for a chunk id
+    digest=hashlib.sha256(chunk_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+class EmbeddingCheckpoint:
+    """
+    Vectors embedded by an unfinished run, keyed by content hash.
+
+    Each embedded batch is written as its own .npy/.json pair, so a crash
+    loses at most the batch in flight and a rerun with the same model picks
+    the rest up instead of paying for them again.
+    """
+
+    def __init__(self, path:Path, model:str):
+        self.path=Path(path)
+        self.model=model
+        self.vectors:Dict[str,np.ndarray]={}
+        self._batches=0
+
+        state_path=self.path / "checkpoint.json"
+        if state_path.exists():
+            with open(state_path, "r", encoding="utf-8") as f:
+                state=json.load(f)
+            if state.get("model")!=model:
+                shutil.rmtree(self.path)
+            else:
+                for batch_path in sorted(self.path.glob("batch_*.json")):
+                    vectors_path=batch_path.with_suffix(".npy")
+                    if not vectors_path.exists():
+                        continue
+                    with open(batch_path, "r", encoding="utf-8") as f:
+                        hashes=json.load(f)
+                    vectors=np.load(vectors_path)
+                    if len(hashes)!=len(vectors):
+                        continue
+                    self.vectors.update(zip(hashes, vectors))
+                    self._batches+=1
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model}, f)
+
+    def add(self, hashes:List[str], vectors:np.ndarray):
+        name=f"batch_{self._batches:06d}"
+        # Vectors first: a batch only counts once its hash list exists
+        np.save(self.path / f"{name}.npy", vectors)
+        tmp_path=self.path / f"{name}.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(hashes, f)
+        tmp_path.replace(self.path / f"{name}.json")
+        self._batches+=1
+        self.vectors.update(zip(hashes, vectors))
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _tmp_path(path:Path)->Path:
+    return path.with_name(path.name+".tmp")
+
+def stage_npy(path:Path, array:np.ndarray)->Path:
+    # Through a file object: np.save would append .npy to a .tmp name
+    tmp_path=_tmp_path(path)
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    return tmp_path
+
+def stage_json(path:Path, obj:Any)->Path:
+    tmp_path=_tmp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2)
+    return tmp_path
+
+
+def load_previous_run(out_dir:Path, model:str)->Tuple[Dict[int,Tuple[str,int]],Optional[np.ndarray],Dict[str,Any]]:
+    """
+    label -> (content hash, row) and the float32 vectors of the last
+    completed run, if it used the same embedding model and stored content
+    hashes. Reduced-precision runs are reused through their float32 copy,
+    so vectors never lose precision from one run to the next.
+    """
+    manifest_path=out_dir / EMBEDDING_MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return {}, None, {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest=json.load(f)
+    if manifest.get("model")!=model:
+        return {}, None, {}
+
+    vectors_path=out_dir / (EMBEDDINGS_FILENAME if manifest.get("storage","float32")=="float32" else EMBEDDINGS_FLOAT32_FILENAME)
+    paths=[out_dir / VECTOR_METADATA_FILENAME, out_dir / VECTOR_IDS_FILENAME, vectors_path]
+    if not all(p.exists() for p in paths):
+        return {}, None, {}
+
+    with open(out_dir / VECTOR_METADATA_FILENAME, "r", encoding="utf-8") as f:
+        metadata=json.load(f)
+    ids=np.load(out_dir / VECTOR_IDS_FILENAME)
+    vectors=np.load(vectors_path, mmap_mode="r")
+    if vectors.dtype!=np.float32 or not (len(metadata)==len(ids)==len(vectors)):
+        return {}, None, {}
 
-    vectors=l2_normalize(vectors)
+    previous={int(label): (m.get("content_hash"), row) for row, (label, m) in enumerate(zip(ids, metadata))}
+    return previous, vectors, manifest
 
-    index=build_faiss_index(vectors)
+
+def run_embeddings(
+    subject:str,
+    index_config:Optional[IndexConfig]=None,
+    embedder=None,
+    batch_size:int=256
+):
+
+    print(f">>> Running embedding pipeline for subject: {subject}")
 
     out_dir = Path("data/processed") / subject
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    np.save(out_dir / "embeddings.npy", vectors)
+    store=open_chunk_store(subject)
+
+    # One streaming pass; texts are re-read from the store only when embedded
+    hashes:List[str]=[]
+    label_list:List[int]=[]
+    metadata:List[Dict]=[]
+    for c in store.iter_chunks():
+        h=content_hash(c["text"])
+        hashes.append(h)
+        label_list.append(vector_id(c["id"]))
+        metadata.append({"id":c["id"], **c["metadata"], "content_hash":h})
+    labels=np.array(label_list, dtype=np.int64)
+    print(f">>> Loaded {len(hashes)} chunks and {len(metadata)} metadata")
+    if not hashes:
+        raise ValueError(f"No chunks to embed for subject '{subject}'")
+    if len(set(labels.tolist()))!=len(labels):
+        raise ValueError(f"Duplicate chunk ids in subject '{subject}'")
+
+    embedder=embedder or OpenAIEmbedder()
+    model=getattr(embedder, "model", type(embedder).__name__)
+    index_config=index_config or IndexConfig()
+
+    previous, previous_vectors, previous_manifest=load_previous_run(out_dir, model)
+    checkpoint=EmbeddingCheckpoint(out_dir / EMBEDDING_CHECKPOINT_DIRNAME, model)
+
+    # Unchanged chunks reuse their vector; changed or new ones are embedded
+    available:Dict[str,np.ndarray]=dict(checkpoint.vectors)
+    for label,h in zip(labels.tolist(),hashes):
+        prev=previous.get(label)
+        if prev is not None and prev[0]==h and h not in available:
+            available[h]=np.array(previous_vectors[prev[1]])
+
+    pending:Dict[str,int]={}
+    for row,h in enumerate(hashes):
+        if h not in available and h not in pending:
+            pending[h]=row
+    print(f">>> Reusing {len(hashes)-len(pending)} vectors, embedding {len(pending)} chunks")
+
+    pending_items=list(pending.items())
+    for start in range(0, len(pending_items), batch_size):
+        batch=pending_items[start:start+batch_size]
+        vectors=l2_normalize(embedder.embed_documents([store.text(row) for _,row in batch]))
+        checkpoint.add([h for h,_ in batch], vectors.astype(np.float32))
+        available.update(zip((h for h,_ in batch), vectors))
+        print(f">>> Embedded {min(start+batch_size, len(pending_items))}/{len(pending_items)}")
 
-    faiss.write_index(index, str(out_dir / "faiss.index"))
+    vectors=np.vstack([available[h] for h in hashes]).astype(np.float32)
+    print(f">>> Generated embeddings: shape={vectors.shape}")
+
+    index=None
+    index_path=out_dir / FAISS_INDEX_FILENAME
+    same_index=previous_manifest.get("index")==asdict(index_config) and previous_manifest.get("dim")==vectors.shape[1]
+    if previous and same_index and index_path.exists():
+        index=faiss.read_index(str(index_path))
+        current={label:h for label,h in zip(labels.tolist(),hashes)}
+        stale=[label for label,(h,_) in previous.items() if current.get(label)!=h]
+        added=[row for row,(label,h) in enumerate(zip(labels.tolist(),hashes)) if previous.get(label,(None,))[0]!=h]
+
+        if not isinstance(index, faiss.IndexIDMap2) or (stale and not supports_removal(index)):
+            index=None
+        else:
+            if stale:
+                index.remove_ids(np.array(stale, dtype=np.int64))
+            if added:
+                index.add_with_ids(vectors[added], labels[added])
+            print(f">>> Updated index in place: -{len(stale)} +{len(added)}")
+
+    if index is None:
+        index=build_id_mapped_index(vectors, labels, index_config)
+        print(f">>> Built {index_config.type} index: {type(index.index).__name__}")
+
+    # recall@k against exact search, to pick an operating point per subject
+    report=recall_report(index, vectors, index_config, ids=labels)
+    for point in report["operating_points"]:
+        print(f">>> {point}")
 
-    with open(out_dir / "vector_metadata.json", "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    # Everything is written to .tmp files first, so a crash while writing leaves the last run intact
+    staged={
+        # Stored at the configured precision; readers memory-map and decode
+        out_dir / EMBEDDINGS_FILENAME: stage_npy(out_dir / EMBEDDINGS_FILENAME, encode_vectors(vectors, index_config.storage)),
+        out_dir / VECTOR_IDS_FILENAME: stage_npy(out_dir / VECTOR_IDS_FILENAME, labels),
+        out_dir / INDEX_REPORT_FILENAME: stage_json(out_dir / INDEX_REPORT_FILENAME, report),
+        out_dir / VECTOR_METADATA_FILENAME: stage_json(out_dir / VECTOR_METADATA_FILENAME, metadata),
+    }
+    if index_config.storage!="float32":
+        staged[out_dir / EMBEDDINGS_FLOAT32_FILENAME]=stage_npy(out_dir / EMBEDDINGS_FLOAT32_FILENAME, vectors)
+    manifest_tmp=stage_json(out_dir / EMBEDDING_MANIFEST_FILENAME, {
+        "model": model,
+        "index": asdict(index_config),
+        "dim": int(vectors.shape[1]),
+        "storage": index_config.storage,
+        "num_vectors": int(vectors.shape[0]),
+    })
+
+    # Dropped first so a crash between the renames is never mistaken for a complete run
+    (out_dir / EMBEDDING_MANIFEST_FILENAME).unlink(missing_ok=True)
+    previous_vectors=None
+    for path,tmp_path in staged.items():
+        tmp_path.replace(path)
+    if index_config.storage=="float32":
+        (out_dir / EMBEDDINGS_FLOAT32_FILENAME).unlink(missing_ok=True)
+    write_index_atomic(index, index_path)
+
+    # Renamed last: its presence marks the run as complete
+    manifest_tmp.replace(out_dir / EMBEDDING_MANIFEST_FILENAME)
+
+    checkpoint.clear()
 
     print(">>> Embedding pipeline completed successfully")
     print(f">>> Vectors: {vectors.shape[0]}, Dim: {vectors.shape[1]}")
 
 if __name__=="__main__":
-    run_embeddings(SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser=argparse.ArgumentParser(description="Embed a processed subject and build its FAISS index")
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--nlist", type=int)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--sq-type", default="8bit")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default="float32")
+    parser.add_argument("--embedder", choices=EMBEDDERS, default="openai")
+    parser.add_argument("--model", help="embedding model name; the backend's default if omitted")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args=parser.parse_args()
+
+    embedder=make_embedder(args.embedder, args.model)
+    try:
+        run_embeddings(
+            args.subject,
+            IndexConfig(
+                type=args.index_type,
+                nlist=args.nlist,
+                pq_m=args.pq_m,
+                hnsw_m=args.hnsw_m,
+                sq_type=args.sq_type,
+                storage=args.storage
+            ),
+            embedder=embedder,
+            batch_size=args.batch_size
+        )
+    finally:
+        if hasattr(embedder, "close"):
+            embedder.close()
@@ -0,0 +1,37 @@
+import time
+import zlib
+from typing import List
+
+import numpy as np
+
+from embeddings.base import BaseEmbedder
+
+
+class HashEmbedder(BaseEmbedder):
+  """
+  Deterministic, offline embedder: a bag of crc32-hashed words.
+
+  Related texts share buckets and so score higher, which is enough to
+  exercise indexes and benchmarks reproducibly without an API key. The
+  dimension must match the FAISS index it is queried against.
+  `call_latency_ms` adds a fixed sleep per call, standing in for the
+  round trip of a remote or GPU embedder when load testing batching.
+  """
+
+  def __init__(self, dim: int = 1536, call_latency_ms: float = 0.0):
+    if dim <= 0:
+      raise ValueError("dim must be a positive integer")
+    self.dim = dim
+    self.call_latency_ms = call_latency_ms
+    self.model = f"fake-hash-{dim}"
+
+  def embed_documents(self, texts: List[str]) -> np.ndarray:
+    if not texts:
+      raise ValueError("HashEmbedder received an empty input list")
+    if self.call_latency_ms > 0:
+      time.sleep(self.call_latency_ms / 1000)
+    vectors = np.full((len(texts), self.dim), 1e-3, dtype=np.float32)
+    for row, text in enumerate(texts):
+      for token in text.lower().split():
+        vectors[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+    return vectors
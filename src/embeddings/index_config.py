@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq")
+
+SQ_TYPE_NAMES = ("8bit", "fp16", "4bit")
+
+# Precision of stored vectors, in the index and in embeddings.npy
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    """
+    FAISS index choice for a subject. All indexes use inner product over
+    L2-normalized vectors, i.e. cosine similarity.
+    """
+    type: str = "flat"
+    nlist: Optional[int] = None        # IVF cells; defaults to ~4*sqrt(N)
+    pq_m: Optional[int] = None         # PQ sub-quantizers; must divide the dimension
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    sq_type: str = "8bit"
+    storage: str = "float32"           # float16 / int8 scalar-quantize flat, hnsw and ivf_flat codes
+    train_sample_size: int = 100_000
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.type}', expected one of {INDEX_TYPES}")
+        if self.sq_type not in SQ_TYPE_NAMES:
+            raise ValueError(f"Unknown sq_type '{self.sq_type}', expected one of {SQ_TYPE_NAMES}")
+        if self.storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown storage '{self.storage}', expected one of {STORAGE_TYPES}")
+        if self.storage != "float32" and self.type in ("ivf_pq", "sq"):
+            # Those types already pick their own code size (pq_nbits / sq_type)
+            raise ValueError(f"storage='{self.storage}' is not supported for index type '{self.type}'")
+        if self.train_sample_size <= 0:
+            raise ValueError("train_sample_size must be a positive integer")
@@ -0,0 +1,282 @@
+import os
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+# Re-exported: IndexConfig lives in a faiss-free module so configs can be
+# built without importing faiss
+from embeddings.index_config import INDEX_TYPES, STORAGE_TYPES, IndexConfig
+
+
+SQ_TYPES = {
+    "8bit": faiss.ScalarQuantizer.QT_8bit,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "4bit": faiss.ScalarQuantizer.QT_4bit,
+}
+
+_STORAGE_SQ = {"float16": "fp16", "int8": "8bit"}
+# int8 storage of L2-normalized vectors: components lie in [-1, 1]
+INT8_SCALE = 127.0
+
+
+def _nlist(config: IndexConfig, n: int) -> int:
+    nlist = config.nlist or int(4 * np.sqrt(n))
+    return max(1, min(nlist, n))
+
+
+def _pq_m(config: IndexConfig, dim: int) -> int:
+    if config.pq_m is not None:
+        if dim % config.pq_m:
+            raise ValueError(f"pq_m={config.pq_m} must divide the dimension {dim}")
+        return config.pq_m
+    # Largest divisor of dim that is at most 64 sub-quantizers
+    return max(m for m in range(1, min(dim, 64) + 1) if dim % m == 0)
+
+
+def training_sample(vectors: np.ndarray, config: IndexConfig) -> np.ndarray:
+    n = vectors.shape[0]
+    if n <= config.train_sample_size:
+        return vectors
+    rng = np.random.default_rng(config.seed)
+    rows = np.sort(rng.choice(n, size=config.train_sample_size, replace=False))
+    return np.ascontiguousarray(vectors[rows])
+
+
+def new_faiss_index(vectors: np.ndarray, config: Optional[IndexConfig] = None) -> faiss.Index:
+    """
+    An empty index of the configured type, trained on a sample of `vectors`.
+    """
+    config = config or IndexConfig()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    reduced = _STORAGE_SQ.get(config.storage)
+    qtype = SQ_TYPES[reduced] if reduced else None
+
+    if config.type == "flat":
+        if qtype is None:
+            index = faiss.IndexFlatIP(dim)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, qtype, metric)
+    elif config.type == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dim, config.hnsw_m, metric)
+        else:
+            index = faiss.IndexHNSWSQ(dim, qtype, config.hnsw_m, metric)
+        index.hnsw.efConstruction = config.ef_construction
+    elif config.type == "sq":
+        index = faiss.IndexScalarQuantizer(dim, SQ_TYPES[config.sq_type], metric)
+    else:
+        quantizer = faiss.IndexFlatIP(dim)
+        nlist = _nlist(config, n)
+        if config.type == "ivf_flat" and qtype is not None:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, metric)
+        elif config.type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            # Each sub-quantizer trains 2**pq_nbits centroids, one vector at least per centroid
+            train_n = min(n, config.train_sample_size)
+            if train_n < 2 ** config.pq_nbits:
+                raise ValueError(
+                    f"ivf_pq with pq_nbits={config.pq_nbits} needs at least {2 ** config.pq_nbits} "
+                    f"training vectors, got {train_n}; lower pq_nbits or use another index type"
+                )
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, _pq_m(config, dim), config.pq_nbits, metric
+            )
+
+    if not index.is_trained:
+        index.train(training_sample(vectors, config))
+
+    return index
+
+
+def build_faiss_index(vectors: np.ndarray, config: Optional[IndexConfig] = None) -> faiss.Index:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = new_faiss_index(vectors, config)
+    index.add(vectors)
+    return index
+
+
+def build_id_mapped_index(
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    config: Optional[IndexConfig] = None
+) -> faiss.IndexIDMap2:
+    """
+    Index whose search results are the given int64 ids instead of row
+    positions, so vectors can later be added or removed individually.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.IndexIDMap2(new_faiss_index(vectors, config))
+    index.add_with_ids(vectors, np.ascontiguousarray(ids, dtype=np.int64))
+    return index
+
+
+def encode_vectors(vectors: np.ndarray, storage: str = "float32") -> np.ndarray:
+    """
+    L2-normalized float32 vectors in the requested storage precision.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if storage == "float16":
+        return vectors.astype(np.float16)
+    if storage == "int8":
+        return np.clip(np.rint(vectors * INT8_SCALE), -127, 127).astype(np.int8)
+    if storage == "float32":
+        return vectors
+    raise ValueError(f"Unknown storage '{storage}', expected one of {STORAGE_TYPES}")
+
+
+def decode_vectors(stored: np.ndarray) -> np.ndarray:
+    """
+    float32 view of vectors written by encode_vectors; the dtype says how.
+    """
+    if stored.dtype == np.int8:
+        return stored.astype(np.float32) / INT8_SCALE
+    return np.asarray(stored, dtype=np.float32)
+
+
+def read_index_mmap(path) -> faiss.Index:
+    """
+    Memory-maps an index read-only, so its codes live in the page cache and
+    are shared by every process serving the same file.
+    """
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    return faiss.read_index(str(path), flags)
+
+
+def write_index_atomic(index: faiss.Index, path):
+    """
+    Writes an index next to `path` and renames it into place. Serving
+    processes may have the old file memory-mapped; truncating it in place
+    would crash them with SIGBUS, while a rename leaves their mapping intact.
+    """
+    path = str(path)
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    # HNSW graphs cannot drop vectors; everything else used here can
+    return not isinstance(unwrap_index(index), faiss.IndexHNSW)
+
+
+def unwrap_index(index: faiss.Index) -> faiss.Index:
+    """
+    The index that actually searches, looking through id-map wrappers.
+    """
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def search_parameters(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector: Optional[faiss.IDSelector] = None
+) -> Optional[faiss.SearchParameters]:
+    """
+    Per-call search parameters for the index type, or None if nothing applies.
+    Passing them per call keeps concurrent searches with different settings
+    independent instead of mutating the shared index. `selector` restricts
+    the search to the ids it admits.
+    """
+    inner = unwrap_index(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    # Fields left unset would fall back to faiss defaults, not the index's own
+    if ivf is not None and (nprobe is not None or selector is not None):
+        return faiss.SearchParametersIVF(nprobe=nprobe or ivf.nprobe, sel=selector)
+    if isinstance(inner, faiss.IndexHNSW) and (ef_search is not None or selector is not None):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or inner.hnsw.efSearch, sel=selector)
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
+
+
+def id_selector(ids: np.ndarray, all_ids: Optional[np.ndarray] = None) -> faiss.IDSelector:
+    """
+    Selector admitting exactly `ids`. Given every id in the index, a set
+    covering most of it is expressed as the negation of the excluded ids,
+    so the hashed set is never larger than the smaller side.
+    """
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if all_ids is not None and 2 * len(ids) > len(all_ids):
+        excluded = np.ascontiguousarray(np.setdiff1d(all_ids, ids, assume_unique=True), dtype=np.int64)
+        inner = faiss.IDSelectorBatch(len(excluded), faiss.swig_ptr(excluded))
+        selector = faiss.IDSelectorNot(inner)
+        # IDSelectorNot holds a raw pointer; keep the wrapped selector alive
+        selector.referenced_objects = [inner]
+        return selector
+    return faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+
+
+def _sweep(index: faiss.Index) -> List[Dict[str, Optional[int]]]:
+    inner = unwrap_index(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        values = sorted({v for v in (1, 4, 16, 64, 256) if v <= ivf.nlist} | {ivf.nlist})
+        return [{"nprobe": v} for v in values]
+    if isinstance(inner, faiss.IndexHNSW):
+        return [{"ef_search": v} for v in (16, 32, 64, 128, 256)]
+    return [{}]
+
+
+def recall_report(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    config: IndexConfig,
+    k: int = 10,
+    num_queries: int = 500,
+    ids: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    recall@k and per-query latency of `index` against exact search, swept
+    over nprobe / efSearch so a latency/recall operating point can be chosen.
+    Queries are a fixed sample of the indexed vectors; `ids` gives the label
+    of each row for id-mapped indexes.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    k = min(k, n)
+
+    rng = np.random.default_rng(config.seed)
+    rows = rng.choice(n, size=min(num_queries, n), replace=False)
+    queries = np.ascontiguousarray(vectors[rows])
+
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    if ids is not None:
+        truth = np.asarray(ids, dtype=np.int64)[truth]
+
+    points = []
+    for params in _sweep(index):
+        search_params = search_parameters(index, **params)
+        start = time.perf_counter()
+        _, found = index.search(queries, k, params=search_params)
+        elapsed = time.perf_counter() - start
+
+        hits = sum(
+            len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth)
+        )
+        points.append({
+            **params,
+            f"recall@{k}": hits / (len(queries) * k),
+            "latency_ms_per_query": 1000 * elapsed / len(queries),
+        })
+
+    return {
+        "index": asdict(config),
+        "faiss_class": type(unwrap_index(index)).__name__,
+        "num_vectors": n,
+        "dim": dim,
+        "num_queries": len(queries),
+        "k": k,
+        "operating_points": points,
+    }
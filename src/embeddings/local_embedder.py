@@ -0,0 +1,158 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from embeddings.base import BaseEmbedder
+
+
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Pre-exported dynamic int8 ONNX weights shipped with the common
+# sentence-transformers checkpoints
+ONNX_INT8_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+
+class LocalEmbedder(BaseEmbedder):
+    """
+    Offline embedder on top of sentence-transformers.
+
+    Texts are sorted by length and packed into batches of at most
+    `max_batch_tokens` padded tokens (estimated from characters), so short
+    texts run in large batches and long ones in small batches. Corpora with
+    at least `multiprocess_threshold` texts are encoded on a pool of
+    `processes` CPU workers. backend="onnx" runs through ONNX Runtime, and
+    with quantize=True loads the int8 export.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_LOCAL_MODEL,
+        device: str = "cpu",
+        max_batch_tokens: int = 16_384,
+        max_batch_size: int = 256,
+        processes: Optional[int] = None,
+        multiprocess_threshold: int = 4096,
+        backend: str = "torch",
+        quantize: bool = False,
+        query_prompt: Optional[str] = None,
+        chars_per_token: float = 4.0,
+        encoder=None
+    ):
+        # model_name: any sentence-transformers checkpoint name or path
+        # processes: CPU workers for large corpora; defaults to os.cpu_count()
+        # query_prompt: prefix some models expect on queries (e.g. "query: ")
+        # encoder: optional, an already constructed SentenceTransformer
+        if max_batch_tokens <= 0 or max_batch_size <= 0:
+            raise ValueError("max_batch_tokens and max_batch_size must be positive integers")
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown backend '{backend}', expected 'torch' or 'onnx'")
+        if quantize and backend != "onnx":
+            raise ValueError("quantize=True requires backend='onnx'")
+
+        self.model = model_name
+        self.device = device
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.processes = processes or os.cpu_count() or 1
+        self.multiprocess_threshold = multiprocess_threshold
+        self.backend = backend
+        self.quantize = quantize
+        self.query_prompt = query_prompt
+        self.chars_per_token = chars_per_token
+        self._encoder = encoder
+        self._pool = None
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "LocalEmbedder requires sentence-transformers; install it to embed offline"
+                ) from e
+
+            kwargs: Dict[str, Any] = {"device": self.device}
+            if self.backend == "onnx":
+                kwargs["backend"] = "onnx"
+                if self.quantize:
+                    kwargs["model_kwargs"] = {"file_name": ONNX_INT8_FILE}
+            self._encoder = SentenceTransformer(self.model, **kwargs)
+        return self._encoder
+
+    def batches(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Row indices per batch, shortest texts first, each batch within the
+        padded token budget.
+        """
+        lengths = np.array([max(1, int(len(t) / self.chars_per_token)) for t in texts])
+        order = np.argsort(lengths, kind="stable")
+        batches, start = [], 0
+        while start < len(order):
+            end = start + 1
+            # Sorted ascending, so the last row sets the padded length
+            while (
+                end < len(order)
+                and end - start < self.max_batch_size
+                and (end - start + 1) * lengths[order[end]] <= self.max_batch_tokens
+            ):
+                end += 1
+            batches.append(order[start:end])
+            start = end
+        return batches
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if len(texts) >= self.multiprocess_threshold and self.processes > 1:
+            return self._encode_multiprocess(texts)
+
+        out: Optional[np.ndarray] = None
+        for rows in self.batches(texts):
+            vectors = np.asarray(
+                self.encoder.encode(
+                    [texts[i] for i in rows],
+                    batch_size=len(rows),
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                ),
+                dtype=np.float32,
+            )
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[rows] = vectors
+        return out
+
+    def _encode_multiprocess(self, texts: List[str]) -> np.ndarray:
+        if self._pool is None:
+            self._pool = self.encoder.start_multi_process_pool(["cpu"] * self.processes)
+        # Workers sort and batch their own shards
+        return np.asarray(
+            self.encoder.encode(
+                texts,
+                pool=self._pool,
+                batch_size=self.max_batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        )
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            raise ValueError("LocalEmbedder received an empty input list")
+        if any(not isinstance(t, str) or not t.strip() for t in texts):
+            raise ValueError("LocalEmbedder received an empty or non-string text")
+        return self._encode(texts)
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        if self.query_prompt:
+            texts = [self.query_prompt + t for t in texts]
+        return self.embed_documents(texts)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_queries([text])
+
+    def close(self):
+        if self._pool is not None:
+            self.encoder.stop_multi_process_pool(self._pool)
+            self._pool = None
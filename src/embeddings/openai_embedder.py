@@ -1,8 +1,31 @@
-from typing import List, Optional
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 import numpy as np
+import openai
 from openai import OpenAI
 
 from embeddings.base import BaseEmbedder
+from embeddings.rate_limit import RateLimiter
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    # Honour the server's Retry-After header when it sends one
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
 
 
 class OpenAIEmbedder(BaseEmbedder):
@@ -10,16 +33,132 @@ class OpenAIEmbedder(BaseEmbedder):
         self,
         model: str = "text-embedding-3-small",
         batch_size: int = 32,
-        client: Optional[OpenAI] = None
+        client: Optional[OpenAI] = None,
+        max_in_flight: int = 4,
+        max_batch_tokens: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
     ):
         # model: OpenAI embedding model to use (e.g., "text-embedding-3-small")
         # batch_size: how many texts to send per API request
+        # max_batch_tokens: optional token budget per request, counted with tiktoken
         # client: optional, custom OpenAI client instance
+        # max_in_flight: how many batch requests may be outstanding at once
+        # requests_per_minute / tokens_per_minute: client-side limits, None disables
+        # max_retries: retries per batch on 429, 5xx, timeouts and connection errors
         if batch_size <= 0:
             raise ValueError("batch_size must be a positive integer")
-        self.client = client or OpenAI()
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be a positive integer")
+        if max_batch_tokens is not None and max_batch_tokens <= 0:
+            raise ValueError("max_batch_tokens must be a positive integer")
+        if max_retries < 0:
+            raise ValueError("max_retries must be non-negative")
+        # Retries are handled here, with jitter, so the SDK's own are disabled
+        self.client = client or OpenAI(max_retries=0)
         self.model = model
         self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._encoding = None
+
+    def token_counts(self, texts: List[str]) -> List[int]:
+        # Counted with tiktoken for batch and tokens-per-minute budgets; rough estimate without it
+        if self._encoding is None:
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except ImportError:
+                self._encoding = False
+        if self._encoding is False:
+            return [len(t) // 4 + 1 for t in texts]
+        return [len(tokens) for tokens in self._encoding.encode_batch(texts)]
+
+    def _batches(self, texts: List[str]) -> List[Tuple[int, List[str], int]]:
+        # (start, texts, tokens) runs of at most batch_size texts and, with
+        # max_batch_tokens, at most that many tokens; a longer text goes alone
+        if self.max_batch_tokens is None and self.limiter.tokens is None:
+            return [
+                (start, texts[start : start + self.batch_size], 0)
+                for start in range(0, len(texts), self.batch_size)
+            ]
+        batches = []
+        start, tokens = 0, 0
+        for i, n in enumerate(self.token_counts(texts)):
+            full = i - start == self.batch_size or (
+                self.max_batch_tokens is not None and tokens + n > self.max_batch_tokens
+            )
+            if i > start and full:
+                batches.append((start, texts[start:i], tokens))
+                start, tokens = i, 0
+            tokens += n
+        batches.append((start, texts[start:], tokens))
+        return batches
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: uniform over the exponential window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _create(self, batch_start: int, batch: List[str], tokens: int):
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            try:
+                return self.client.embeddings.create(
+                    model=self.model,
+                    input=batch
+                )
+            except Exception as e:
+                if not _is_transient(e) or attempt >= self.max_retries:
+                    # Meaning: Exception means OpenAI API call failed (network, rate-limit, etc.)
+                    raise RuntimeError(
+                        f"OpenAI embedding request failed "
+                        f"(model={self.model}, "
+                        f"batch_start={batch_start}, "
+                        f"batch_size={len(batch)}, "
+                        f"attempts={attempt + 1}): {e}"
+                    ) from e
+                time.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    def _embed_batch(self, batch_start: int, batch: List[str], tokens: int) -> List[List[float]]:
+        response = self._create(batch_start, batch, tokens)
+
+        # Meaning: Ensure the API gave a list of data as expected
+        if not hasattr(response, 'data') or not isinstance(response.data, list):
+            raise RuntimeError(
+                f"OpenAI API response missing 'data' attribute or not a list (batch_start={batch_start})"
+            )
+        try:
+            # Each element in response.data must have an 'embedding' attribute
+            batch_embeddings = [item.embedding for item in response.data]
+        except Exception as e:
+            # Meaning: API returned malformed data structure
+            raise RuntimeError(
+                f"Failed to extract embeddings from response (batch_start={batch_start}): {e}"
+            ) from e
+
+        # Meaning: API returned fewer/more embeddings than requested
+        if len(batch_embeddings) != len(batch):
+            raise RuntimeError(
+                f"Embedding count mismatch in batch starting at {batch_start}: "
+                f"received {len(batch_embeddings)}, expected {len(batch)}"
+            )
+
+        return batch_embeddings
 
     def embed_documents(self, texts: List[str]) -> np.ndarray:
         # texts: list of text strings to embed
@@ -35,46 +174,16 @@ class OpenAIEmbedder(BaseEmbedder):
             if not t.strip():
                 raise ValueError(f"Empty or whitespace-only text at index {idx}")
 
-        all_embeddings: List[List[float]] = []
+        starts, batches, tokens = zip(*self._batches(texts))
 
-        for batch_start in range(0, len(texts), self.batch_size):
-            batch = texts[batch_start : batch_start + self.batch_size]
-            try:
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=batch
-                )
-            except Exception as e:
-                # Meaning: Exception means OpenAI API call failed (network, rate-limit, etc.)
-                raise RuntimeError(
-                    f"OpenAI embedding request failed "
-                    f"(model={self.model}, "
-                    f"batch_start={batch_start}, "
-                    f"batch_size={len(batch)}): {e}"
-                ) from e
-
-            # Meaning: Ensure the API gave a list of data as expected
-            if not hasattr(response, 'data') or not isinstance(response.data, list):
-                raise RuntimeError(
-                    f"OpenAI API response missing 'data' attribute or not a list (batch_start={batch_start})"
-                )
-            try:
-                # Each element in response.data must have an 'embedding' attribute
-                batch_embeddings = [item.embedding for item in response.data]
-            except Exception as e:
-                # Meaning: API returned malformed data structure
-                raise RuntimeError(
-                    f"Failed to extract embeddings from response (batch_start={batch_start}): {e}"
-                ) from e
-
-            # Meaning: API returned fewer/more embeddings than requested
-            if len(batch_embeddings) != len(batch):
-                raise RuntimeError(
-                    f"Embedding count mismatch in batch starting at {batch_start}: "
-                    f"received {len(batch_embeddings)}, expected {len(batch)}"
-                )
+        # Up to max_in_flight batches run concurrently; map() keeps input order
+        if self.max_in_flight == 1 or len(batches) == 1:
+            results = list(map(self._embed_batch, starts, batches, tokens))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as pool:
+                results = list(pool.map(self._embed_batch, starts, batches, tokens))
 
-            all_embeddings.extend(batch_embeddings)
+        all_embeddings: List[List[float]] = [emb for batch in results for emb in batch]
 
         # Meaning: Defensive - no content returned from any batch
         if not all_embeddings:
@@ -0,0 +1,162 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from core.constants import (
+    META_SUBJECT,
+    META_SOURCE_ID,
+    META_SOURCE_TITLE,
+    META_PAGE,
+    META_CHUNK_INDEX,
+    META_START_CHAR,
+    META_END_CHAR
+)
+
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+class token_chunker:
+    """
+    Packs text into chunks of at most `chunk_tokens` tokens, splitting on
+    paragraph, line, sentence and word boundaries in that order of
+    preference, with `overlap_tokens` of trailing context repeated.
+
+    Each page is encoded once; token counts for any character span are then
+    two binary searches over the token start offsets, so no window is ever
+    re-encoded. The default encoding is tiktoken's cl100k_base, the one
+    used by text-embedding-3-small.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens=512,
+        overlap_tokens=64,
+        encoding=None,
+        separators=DEFAULT_SEPARATORS
+    ):
+        if chunk_tokens <= 0:
+            raise ValueError("chunk_tokens must be a positive integer.")
+        if overlap_tokens < 0 or overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be in [0, chunk_tokens).")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.separators = tuple(separators)
+        self._encoding = encoding
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+
+    def __getstate__(self):
+        # tiktoken encodings do not pickle; worker processes load their own
+        state = self.__dict__.copy()
+        if type(self._encoding).__module__.startswith("tiktoken"):
+            state["_encoding"] = None
+        return state
+
+    def _token_starts(self, text: str) -> np.ndarray:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        return np.asarray(offsets, dtype=np.int64)
+
+    def _split(self, text: str, starts: np.ndarray, lo: int, hi: int, level: int) -> List[Tuple[int, int]]:
+        """
+        Character spans covering [lo, hi), each within the token budget.
+        """
+        n_tokens = np.searchsorted(starts, hi) - np.searchsorted(starts, lo)
+        if n_tokens <= self.chunk_tokens:
+            return [(lo, hi)]
+
+        if level == len(self.separators):
+            # No separator left: cut at token boundaries
+            first = np.searchsorted(starts, lo)
+            cuts = [int(c) for c in starts[first + self.chunk_tokens:np.searchsorted(starts, hi):self.chunk_tokens]]
+            bounds = [lo] + cuts + [hi]
+            return list(zip(bounds[:-1], bounds[1:]))
+
+        sep = self.separators[level]
+        spans = []
+        pos = lo
+        while pos < hi:
+            found = text.find(sep, pos, hi)
+            end = hi if found < 0 else found + len(sep)
+            spans.extend(self._split(text, starts, pos, end, level + 1))
+            pos = end
+        return spans
+
+    def _overlap_start(self, text: str, starts: np.ndarray, head: int, end: int, next_tokens: int) -> int:
+        """
+        Start of the next chunk: the last overlap_tokens tokens before `end`,
+        moved forward to a word start, leaving room for the next piece.
+        """
+        budget = min(self.overlap_tokens, self.chunk_tokens - int(next_tokens))
+        end_tok = int(np.searchsorted(starts, end))
+        tok = max(end_tok - budget, int(np.searchsorted(starts, head, side="right")))
+        while tok < end_tok and not (text[starts[tok]].isspace() or text[starts[tok] - 1].isspace()):
+            tok += 1
+        return int(starts[tok]) if tok < end_tok else end
+
+    def chunk(self, text, subject, source, page):
+        """
+        Splits the input text into token-budgeted chunks with token overlap
+        and attaches the same metadata as recursive_chunker.
+
+        Args:
+            text (str): The input text to be chunked.
+            subject (str): Corpus subject for metadata.
+            source (Any): Source object containing 'id' and 'title'.
+            page (int): Page number within the source.
+
+        Returns:
+            List[dict]: List of chunk dictionaries with metadata.
+        """
+        if not isinstance(text, str):
+            raise ValueError("Input 'text' must be a string.")
+        if not text.strip():
+            return []
+
+        starts = self._token_starts(text)
+        pieces = self._split(text, starts, 0, len(text), 0)
+        piece_ends = np.asarray([e for _, e in pieces], dtype=np.int64)
+        piece_tokens = np.diff(np.searchsorted(starts, [0] + piece_ends.tolist()))
+
+        chunks = []
+        idx = 0
+        head = 0        # first character of the current chunk
+        first = 0       # piece containing head
+        while True:
+            # Greedily pack whole pieces after the (possibly partial) first one
+            last = first
+            total = np.searchsorted(starts, piece_ends[first]) - np.searchsorted(starts, head)
+            while last + 1 < len(pieces) and total + piece_tokens[last + 1] <= self.chunk_tokens:
+                last += 1
+                total += piece_tokens[last]
+
+            end = int(piece_ends[last])
+            chunk_text = text[head:end].strip()
+            if chunk_text:
+                chunks.append({
+                    "id": f"{subject}_{source.id}_p{page}_c{idx}",
+                    "text": chunk_text,
+                    "metadata": {
+                        META_SUBJECT: subject,
+                        META_SOURCE_ID: source.id,
+                        META_SOURCE_TITLE: source.title,
+                        META_PAGE: page,
+                        META_CHUNK_INDEX: idx,
+                        META_START_CHAR: head,
+                        META_END_CHAR: end
+                    }
+                })
+                idx += 1
+
+            if last + 1 == len(pieces):
+                break
+            head = self._overlap_start(text, starts, head, end, piece_tokens[last + 1])
+            first = int(np.searchsorted(piece_ends, head, side="right")) if head < end else last + 1
+
+        return chunks
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.constants import META_SOURCE_ID
+
+
+DEDUP_SCOPES = ("source", "subject")
+
+# Mersenne prime for the MinHash permutations; a * x stays below 2**62
+_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Case and whitespace folded text; chunks equal after this are exact duplicates.
+    """
+    return " ".join(text.lower().split())
+
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    """
+    Unique hashes of the word `size`-grams of normalized text; texts shorter
+    than one shingle hash as a whole.
+    """
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)
+    ))
+
+
+class ChunkDeduplicator:
+    """
+    Streaming exact and near-duplicate filter for chunks at ingestion.
+
+    Exact duplicates are matched on a hash of the normalized text. Near
+    duplicates are found with MinHash signatures over word shingles and
+    banded LSH: a chunk is only compared with earlier canonical chunks that
+    share a band, and becomes their alias when the estimated Jaccard
+    similarity reaches `threshold`. The first chunk of each group (in corpus
+    order) stays canonical; the others are dropped from the stream and
+    recorded as aliases, so they are never embedded, indexed or scored.
+
+    By default (scope="source") only chunks of the same source are merged,
+    so results keep their source; scope="subject" also merges boilerplate
+    shared across sources. Either way MetadataIndex matches a canonical
+    chunk through its aliases' source and page, so metadata filters find
+    the same content as without deduplication.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 3,
+        scope: str = "source",
+        seed: int = 0
+    ):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        if bands <= 0 or num_perm <= 0 or num_perm % bands:
+            raise ValueError("num_perm must be a positive multiple of bands")
+        if shingle_size <= 0:
+            raise ValueError("shingle_size must be a positive integer")
+        if scope not in DEDUP_SCOPES:
+            raise ValueError(f"Unknown dedup scope '{scope}', expected one of {DEDUP_SCOPES}")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.scope = scope
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._rows_per_band = num_perm // bands
+
+        self._exact: Dict[Tuple[str, str], str] = {}
+        self._buckets: Dict[Tuple[str, int, bytes], List[int]] = {}
+        self._canonical_ids: List[str] = []
+        self._signatures: List[np.ndarray] = []
+
+        # canonical id -> aliases, each {"id", "kind", "similarity", "metadata"}
+        self.aliases: Dict[str, List[Dict[str, Any]]] = {}
+        self.chunks_seen = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.chars_saved = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text, self.shingle_size) % _PRIME
+        return ((self._a * hashes[None, :] + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, scope_key: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        r = self._rows_per_band
+        return [(scope_key, band, signature[band * r:(band + 1) * r].tobytes()) for band in range(self.bands)]
+
+    def _near_match(self, keys: List[Tuple[str, int, bytes]], signature: np.ndarray) -> Tuple[Optional[int], float]:
+        candidates = {c for key in keys for c in self._buckets.get(key, ())}
+        best, best_sim = None, 0.0
+        # Sorted so ties go to the earliest canonical chunk
+        for c in sorted(candidates):
+            sim = float(np.mean(self._signatures[c] == signature))
+            if sim > best_sim:
+                best, best_sim = c, sim
+        if best is None or best_sim < self.threshold:
+            return None, best_sim
+        return best, best_sim
+
+    def _alias(self, canonical_id: str, chunk: Dict[str, Any], kind: str, similarity: float):
+        self.aliases.setdefault(canonical_id, []).append({
+            "id": chunk["id"],
+            "kind": kind,
+            "similarity": similarity,
+            "metadata": chunk["metadata"],
+        })
+        self.chars_saved += len(chunk["text"])
+
+    def add(self, chunk: Dict[str, Any]) -> Optional[str]:
+        """
+        Registers a chunk; returns the canonical id it duplicates, or None
+        when the chunk is new and should be kept.
+        """
+        self.chunks_seen += 1
+        scope_key = chunk["metadata"][META_SOURCE_ID] if self.scope == "source" else ""
+
+        digest = hashlib.sha1(normalize_text(chunk["text"]).encode("utf-8")).hexdigest()
+        canonical_id = self._exact.get((scope_key, digest))
+        if canonical_id is not None:
+            self.exact_duplicates += 1
+            self._alias(canonical_id, chunk, "exact", 1.0)
+            return canonical_id
+
+        signature = self.signature(chunk["text"])
+        keys = self._band_keys(scope_key, signature)
+        match, similarity = self._near_match(keys, signature)
+        if match is not None:
+            canonical_id = self._canonical_ids[match]
+            self.near_duplicates += 1
+            self._alias(canonical_id, chunk, "near", similarity)
+            return canonical_id
+
+        position = len(self._canonical_ids)
+        self._canonical_ids.append(chunk["id"])
+        self._signatures.append(signature)
+        self._exact[(scope_key, digest)] = chunk["id"]
+        for key in keys:
+            self._buckets.setdefault(key, []).append(position)
+        return None
+
+    def filter(self, chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Yields only the canonical chunks, in order.
+        """
+        for chunk in chunks:
+            if self.add(chunk) is None:
+                yield chunk
+
+    def report(self) -> Dict[str, Any]:
+        duplicates = self.exact_duplicates + self.near_duplicates
+        return {
+            "scope": self.scope,
+            "threshold": self.threshold,
+            "chunks_seen": self.chunks_seen,
+            "canonical_chunks": len(self._canonical_ids),
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            # One dense vector, one FAISS entry and one BM25 document per dropped chunk
+            "embeddings_saved": duplicates,
+            "index_entries_saved": duplicates,
+            "chars_saved": self.chars_saved,
+            "saved_fraction": duplicates / self.chunks_seen if self.chunks_seen else 0.0,
+        }
+
+    def save(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"report": self.report(), "aliases": self.aliases}, f, indent=2)
+
+
+def read_aliases(path: Path) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Canonical chunk id -> its aliases, as written by ChunkDeduplicator.save().
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Dedup aliases not found at {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["aliases"]
@@ -1,43 +1,217 @@
-import json
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from core.constants import (
     SUBJECT_CLOUD_DEVOPS_DOCS_V1,
-    CHUNKS_FILENAME
+    CHUNKS_FILENAME,
+    CHUNK_STORE_DIRNAME,
+    DEDUP_ALIASES_FILENAME
 )
-from ingestion.corpus import load_corpus
-from ingestion.loaders.text_loader import load_pdf_by_page
+from ingestion.corpus import corpus_source, load_corpus
+from ingestion.dedup import DEDUP_SCOPES, ChunkDeduplicator
+from ingestion.loaders.text_loader import load_pdf_by_page, pdf_page_count
 from ingestion.chunkers.recursive_chunker import recursive_chunker
+from ingestion.chunkers.token_chunker import token_chunker
+from ingestion.storage.local_store import ChunkStoreWriter
+from retrieval.bm25_index import build_bm25_index
 
 
-def run_ingestion(subject: str):
+def _ingest_pages(
+    subject: str,
+    source: corpus_source,
+    chunker,
+    start_page: int = 1,
+    end_page: Optional[int] = None
+) -> Tuple[List[dict], float]:
+    """
+    Extracts and chunks one page range of a source.
+    Top-level so it can run in a worker process.
+    """
+    start = time.perf_counter()
+    chunks = []
+    for page, text in load_pdf_by_page(source.path, start_page, end_page):
+        chunks.extend(
+            chunker.chunk(
+                text=text,
+                subject=subject,
+                source=source,
+                page=page
+            )
+        )
+    return chunks, time.perf_counter() - start
+
+
+def _report_timings(timings: Dict[str, Dict[str, float]]):
+    for source_id, t in sorted(timings.items(), key=lambda kv: -kv[1]["seconds"]):
+        print(
+            f">>> {source_id}: {int(t['chunks'])} chunks, "
+            f"{t['seconds']:.2f}s extraction+chunking"
+        )
+
+
+def _report_dedup(report: Dict):
+    print(
+        f">>> Dedup ({report['scope']}, threshold={report['threshold']}): "
+        f"kept {report['canonical_chunks']} of {report['chunks_seen']} chunks, "
+        f"{report['exact_duplicates']} exact + {report['near_duplicates']} near duplicates; "
+        f"saved {report['embeddings_saved']} embeddings and index entries "
+        f"({report['saved_fraction']:.1%})"
+    )
+
+
+def _page_ranges(sources: List[corpus_source], pages_per_task: int) -> Iterator[Tuple[corpus_source, int, int]]:
+    for source in sources:
+        page_count = pdf_page_count(source.path)
+        print(f">>> PDF page count ({Path(source.path).name}): {page_count}")
+        for first in range(1, page_count + 1, pages_per_task):
+            yield source, first, min(first + pages_per_task - 1, page_count)
+
+
+def iter_chunks(
+    subject: str,
+    sources: List[corpus_source],
+    chunker,
+    timings: Dict[str, Dict[str, float]],
+    workers: int = 1,
+    pages_per_task: int = 20
+) -> Iterator[dict]:
+    """
+    Chunks of every source in corpus order, produced one page range at a time.
+
+    With workers > 1, page ranges run on a process pool with at most
+    2 * workers ranges in flight; results are consumed in submission order,
+    so chunk order and ids match the serial path. Per-source extraction time
+    and chunk counts are accumulated into `timings`.
+    """
+    def record(source, chunks, seconds):
+        t = timings.setdefault(source.id, {"seconds": 0.0, "chunks": 0})
+        t["seconds"] += seconds
+        t["chunks"] += len(chunks)
+
+    ranges = _page_ranges(sources, pages_per_task)
+
+    if workers == 1:
+        for source, first, last in ranges:
+            chunks, seconds = _ingest_pages(subject, source, chunker, first, last)
+            record(source, chunks, seconds)
+            yield from chunks
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for source, first, last in ranges:
+            in_flight.append((
+                source,
+                pool.submit(_ingest_pages, subject, source, chunker, first, last)
+            ))
+            if len(in_flight) < 2 * workers:
+                continue
+            source, future = in_flight.popleft()
+            chunks, seconds = future.result()
+            record(source, chunks, seconds)
+            yield from chunks
+
+        while in_flight:
+            source, future = in_flight.popleft()
+            chunks, seconds = future.result()
+            record(source, chunks, seconds)
+            yield from chunks
+
+
+CHUNKERS = {
+    "recursive": recursive_chunker,
+    "token": token_chunker,
+}
+
+
+def run_ingestion(
+    subject: str,
+    workers: int = 1,
+    pages_per_task: int = 20,
+    chunker=None,
+    dedup: Optional[ChunkDeduplicator] = None
+):
+    """
+    Extracts, chunks and stores every source of a subject.
+    `chunker` defaults to recursive_chunker().
+
+    With `dedup`, exact and near-duplicate chunks are dropped before they
+    reach the store (and so the embedding and BM25 indexes); their ids and
+    metadata are written to dedup_aliases.json next to the store.
+
+    Chunks stream from the loader and chunker straight into the chunk
+    store writer, so memory is bounded by a few page ranges rather than the
+    whole corpus. Returns per-source timings (summed worker time per source).
+    """
+    if workers <= 0:
+        raise ValueError("workers must be a positive integer")
+    if pages_per_task <= 0:
+        raise ValueError("pages_per_task must be a positive integer")
+
     try:
         out_dir = Path("data/processed") / subject
         out_dir.mkdir(parents=True, exist_ok=True)
 
-        out_file = out_dir / CHUNKS_FILENAME
+        chunker = chunker or recursive_chunker()
+        timings: Dict[str, Dict[str, float]] = {}
+
+        sources = load_corpus(subject)
+        wall_start = time.perf_counter()
 
-        chunker = recursive_chunker()
-        all_chunks = []
+        chunks = iter_chunks(subject, sources, chunker, timings, workers, pages_per_task)
+        if dedup is not None:
+            # Runs in this process on the ordered stream, so it is worker-count independent
+            chunks = dedup.filter(chunks)
 
-        for source in load_corpus(subject):
-            for page, text in load_pdf_by_page(source.path):
-                chunks = chunker.chunk(
-                    text=text,
-                    subject=subject,
-                    source=source,
-                    page=page
-                )
-                all_chunks.extend(chunks)
+        with ChunkStoreWriter(out_dir / CHUNK_STORE_DIRNAME, subject) as writer:
+            writer.extend(chunks)
+            count = len(writer)
 
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+        print(
+            f">>> Extracted {count} chunks in "
+            f"{time.perf_counter() - wall_start:.2f}s with {workers} worker(s)"
+        )
+        _report_timings(timings)
 
-        print(f"{subject} ingested {len(all_chunks)} chunks!")
+        aliases_path = out_dir / DEDUP_ALIASES_FILENAME
+        if dedup is not None:
+            dedup.save(aliases_path)
+            _report_dedup(dedup.report())
+        else:
+            # Aliases from an earlier deduplicated run no longer match the store
+            aliases_path.unlink(missing_ok=True)
+
+        # Superseded by the chunk store; an old copy would only go stale
+        (out_dir / CHUNKS_FILENAME).unlink(missing_ok=True)
+        build_bm25_index(subject)
+
+        print(f"{subject} ingested {count} chunks!")
+        return timings
 
     except Exception as e:
         print(f"Ingestion failed for subject '{subject}': {e}")
         raise
 
 if __name__ == "__main__":
-    run_ingestion(SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser = argparse.ArgumentParser(description="Extract, chunk and store a corpus subject")
+    parser.add_argument("--subject", default=SUBJECT_CLOUD_DEVOPS_DOCS_V1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=20)
+    parser.add_argument("--chunker", choices=sorted(CHUNKERS), default="recursive")
+    parser.add_argument("--dedup", action="store_true", help="drop exact and near-duplicate chunks")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9, help="MinHash Jaccard threshold")
+    parser.add_argument("--dedup-scope", choices=DEDUP_SCOPES, default="source")
+    args = parser.parse_args()
+
+    run_ingestion(
+        args.subject,
+        workers=args.workers,
+        pages_per_task=args.pages_per_task,
+        chunker=CHUNKERS[args.chunker](),
+        dedup=ChunkDeduplicator(args.dedup_threshold, scope=args.dedup_scope) if args.dedup else None
+    )
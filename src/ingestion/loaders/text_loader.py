@@ -1,24 +1,48 @@
 from pathlib import Path
+from typing import Optional
 from pypdf import PdfReader
 
 
-def load_pdf_by_page(pdf_path):
+def _open_pdf(pdf_path):
     path = Path(pdf_path)
 
     if not path.exists():
         raise FileNotFoundError(f"PDF not found: {path}")
 
-    reader = PdfReader(path)
+    return path, PdfReader(path)
 
+
+def pdf_page_count(pdf_path) -> int:
+    path, reader = _open_pdf(pdf_path)
     page_count = len(reader.pages)
-    print(f">>> PDF page count ({path.name}): {page_count}")
 
     if page_count == 0:
         raise ValueError(f"PDF contains no pages: {path}")
 
-    for i, page in enumerate(reader.pages, start=1):
+    return page_count
+
+
+def load_pdf_by_page(pdf_path, start_page: int = 1, end_page: Optional[int] = None):
+    """
+    Yields (page_number, text) for non-empty pages, 1-based.
+
+    start_page/end_page (inclusive) restrict extraction to a page range so
+    a large PDF can be split across worker processes.
+    """
+    path, reader = _open_pdf(pdf_path)
+
+    page_count = len(reader.pages)
+    if start_page == 1 and end_page is None:
+        print(f">>> PDF page count ({path.name}): {page_count}")
+
+    if page_count == 0:
+        raise ValueError(f"PDF contains no pages: {path}")
+
+    last = page_count if end_page is None else min(end_page, page_count)
+
+    for i in range(start_page, last + 1):
         try:
-            text = page.extract_text()
+            text = reader.pages[i - 1].extract_text()
         except Exception:
             continue
 
@@ -1 +1,398 @@
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
+
+from core.constants import (
+    CHUNKS_FILENAME,
+    CHUNK_STORE_DIRNAME,
+    META_SUBJECT,
+    META_SOURCE_ID,
+    META_SOURCE_TITLE,
+    META_PAGE,
+    META_CHUNK_INDEX,
+    META_START_CHAR,
+    META_END_CHAR
+)
+from core.models import RetrievalResult
+
+
+CHUNK_STORE_FORMAT_VERSION = 2
+MANIFEST_FILENAME = "manifest.json"
+
+TEXT_BLOB = "text.bin"
+TEXT_OFFSETS = "text_offsets.bin"
+ID_BLOB = "ids.bin"
+ID_OFFSETS = "id_offsets.bin"
+
+# Fixed-width per-row columns: name -> little-endian dtype
+COLUMNS: Dict[str, str] = {
+    "source": "<i4",
+    "page": "<i4",
+    "chunk_index": "<i4",
+    "start_char": "<i8",
+    "end_char": "<i8",
+}
+OFFSET_DTYPE = "<i8"
+
+
+def _id_hash(chunk_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _ChecksummedFile:
+    """
+    Binary append-only file that hashes and counts what is written to it.
+    """
+
+    def __init__(self, path: Path):
+        self._f = open(path, "wb")
+        self._sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes):
+        self._f.write(data)
+        self._sha.update(data)
+        self.size += len(data)
+
+    def close(self):
+        self._f.close()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"bytes": self.size, "sha256": self._sha.hexdigest()}
+
+
+class ChunkStoreWriter:
+    """
+    Writes chunks into a columnar on-disk store.
+
+    Text and ids go to UTF-8 blobs addressed by offset arrays, numeric
+    metadata goes to fixed-width columns and source ids are dictionary
+    encoded. Rows are appended as they arrive and the per-row columns are
+    flushed every `flush_rows` rows, so memory stays bounded for any corpus
+    size. The store is written to a temp directory and swapped in on
+    close(), so readers never see a half-written store.
+    """
+
+    def __init__(self, out_dir: Path, subject: str, flush_rows: int = 4096):
+        if flush_rows <= 0:
+            raise ValueError("flush_rows must be a positive integer")
+        self.out_dir = Path(out_dir)
+        self.subject = subject
+        self.flush_rows = flush_rows
+        self._tmp_dir = self.out_dir.with_name(self.out_dir.name + ".tmp")
+        if self._tmp_dir.exists():
+            shutil.rmtree(self._tmp_dir)
+        self._tmp_dir.mkdir(parents=True)
+
+        names = [TEXT_BLOB, ID_BLOB, TEXT_OFFSETS, ID_OFFSETS] + [f"{c}.bin" for c in COLUMNS]
+        self._files: Dict[str, _ChecksummedFile] = {
+            name: _ChecksummedFile(self._tmp_dir / name) for name in names
+        }
+        self._files[TEXT_OFFSETS].write(np.zeros(1, dtype=OFFSET_DTYPE).tobytes())
+        self._files[ID_OFFSETS].write(np.zeros(1, dtype=OFFSET_DTYPE).tobytes())
+
+        self._text_offsets: List[int] = []
+        self._id_offsets: List[int] = []
+        self._columns: Dict[str, List[int]] = {name: [] for name in COLUMNS}
+        self._source_codes: Dict[str, int] = {}
+        self._sources: List[Dict[str, str]] = []
+        self._content_hash = hashlib.sha256()
+        self._count = 0
+        self._closed = False
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, chunk: Dict[str, Any]):
+        meta = chunk["metadata"]
+        source_id = meta[META_SOURCE_ID]
+
+        code = self._source_codes.get(source_id)
+        if code is None:
+            code = len(self._sources)
+            self._source_codes[source_id] = code
+            self._sources.append(
+                {"id": source_id, "title": meta.get(META_SOURCE_TITLE, "")}
+            )
+
+        text = chunk["text"].encode("utf-8")
+        chunk_id = chunk["id"].encode("utf-8")
+        self._files[TEXT_BLOB].write(text)
+        self._files[ID_BLOB].write(chunk_id)
+        self._content_hash.update(chunk_id + b"\0" + text + b"\0")
+        self._text_offsets.append(self._files[TEXT_BLOB].size)
+        self._id_offsets.append(self._files[ID_BLOB].size)
+
+        self._columns["source"].append(code)
+        self._columns["page"].append(meta[META_PAGE])
+        self._columns["chunk_index"].append(meta[META_CHUNK_INDEX])
+        self._columns["start_char"].append(meta.get(META_START_CHAR, -1))
+        self._columns["end_char"].append(meta.get(META_END_CHAR, -1))
+        self._count += 1
+
+        if len(self._text_offsets) >= self.flush_rows:
+            self._flush()
+
+    def extend(self, chunks: Iterable[Dict[str, Any]]):
+        for chunk in chunks:
+            self.add(chunk)
+
+    def _flush(self):
+        self._files[TEXT_OFFSETS].write(np.asarray(self._text_offsets, dtype=OFFSET_DTYPE).tobytes())
+        self._files[ID_OFFSETS].write(np.asarray(self._id_offsets, dtype=OFFSET_DTYPE).tobytes())
+        self._text_offsets.clear()
+        self._id_offsets.clear()
+        for name, dtype in COLUMNS.items():
+            self._files[f"{name}.bin"].write(np.asarray(self._columns[name], dtype=dtype).tobytes())
+            self._columns[name].clear()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._flush()
+        for f in self._files.values():
+            f.close()
+
+        manifest = {
+            "format_version": CHUNK_STORE_FORMAT_VERSION,
+            "subject": self.subject,
+            "num_chunks": len(self),
+            "content_hash": self._content_hash.hexdigest(),
+            "sources": self._sources,
+            "columns": COLUMNS,
+            "files": {name: f.summary() for name, f in self._files.items()},
+        }
+        with open(self._tmp_dir / MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        if self.out_dir.exists():
+            shutil.rmtree(self.out_dir)
+        self._tmp_dir.rename(self.out_dir)
+
+    def abort(self):
+        self._closed = True
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view over a store written by ChunkStoreWriter.
+
+    Opening only parses the manifest. Columns are mapped on first access,
+    and rows are decoded one at a time, so resident memory stays flat no
+    matter how large the corpus is.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        manifest_path = self.path / MANIFEST_FILENAME
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"Chunk store manifest not found at {manifest_path}")
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format_version") != CHUNK_STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported chunk store format at {self.path}: "
+                f"{self.manifest.get('format_version')}"
+            )
+
+        self.subject: str = self.manifest["subject"]
+        self.num_chunks: int = self.manifest["num_chunks"]
+        self.sources: List[Dict[str, str]] = self.manifest["sources"]
+        # sha256 over ids and texts in row order; derived indexes key off it
+        self.content_hash: str = self.manifest["content_hash"]
+        self._maps: Dict[str, np.ndarray] = {}
+        self._id_hashes: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return self.num_chunks
+
+    def _map(self, filename: str, dtype: str, count: int) -> np.ndarray:
+        arr = self._maps.get(filename)
+        if arr is None:
+            if count == 0:
+                arr = np.empty(0, dtype=dtype)
+            else:
+                arr = np.memmap(
+                    self.path / filename, dtype=dtype, mode="r", shape=(count,)
+                )
+            self._maps[filename] = arr
+        return arr
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in COLUMNS:
+            raise KeyError(f"Unknown chunk store column: {name}")
+        return self._map(f"{name}.bin", COLUMNS[name], self.num_chunks)
+
+    def _blob_row(self, blob: str, offsets: str, row: int) -> str:
+        offs = self._map(offsets, OFFSET_DTYPE, self.num_chunks + 1)
+        data = self._map(blob, "u1", int(offs[-1]) if len(offs) else 0)
+        return bytes(data[int(offs[row]):int(offs[row + 1])]).decode("utf-8")
+
+    def _check_row(self, row: int) -> int:
+        row = int(row)
+        if row < 0 or row >= self.num_chunks:
+            raise IndexError(f"Row {row} out of range for {self.num_chunks} chunks")
+        return row
+
+    def text(self, row: int) -> str:
+        return self._blob_row(TEXT_BLOB, TEXT_OFFSETS, self._check_row(row))
+
+    def chunk_id(self, row: int) -> str:
+        return self._blob_row(ID_BLOB, ID_OFFSETS, self._check_row(row))
+
+    def _id_lookup(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Sorted 64-bit id hashes plus the row of each: 16 bytes per chunk,
+        # instead of a dict holding every id as a Python string
+        if self._id_hashes is None:
+            hashes = np.fromiter(
+                (_id_hash(self.chunk_id(row)) for row in range(self.num_chunks)),
+                dtype=np.uint64, count=self.num_chunks,
+            )
+            order = np.argsort(hashes, kind="stable")
+            self._id_hashes = (hashes[order], order)
+        return self._id_hashes
+
+    def row_of(self, chunk_id: str) -> int:
+        """
+        Row of a chunk id, by binary search over id hashes built on first use.
+        """
+        hashes, rows = self._id_lookup()
+        h = _id_hash(chunk_id)
+        pos = int(np.searchsorted(hashes, h))
+        # Hash collisions are resolved by comparing the stored ids
+        while pos < len(hashes) and hashes[pos] == h:
+            row = int(rows[pos])
+            if self.chunk_id(row) == chunk_id:
+                return row
+            pos += 1
+        raise KeyError(f"Unknown chunk id: {chunk_id}")
+
+    def source_id(self, row: int) -> str:
+        return self.sources[int(self.column("source")[self._check_row(row)])]["id"]
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        row = self._check_row(row)
+        source = self.sources[int(self.column("source")[row])]
+        return {
+            META_SUBJECT: self.subject,
+            META_SOURCE_ID: source["id"],
+            META_SOURCE_TITLE: source["title"],
+            META_PAGE: int(self.column("page")[row]),
+            META_CHUNK_INDEX: int(self.column("chunk_index")[row]),
+            META_START_CHAR: int(self.column("start_char")[row]),
+            META_END_CHAR: int(self.column("end_char")[row]),
+        }
+
+    def chunk(self, row: int) -> Dict[str, Any]:
+        return {
+            "id": self.chunk_id(row),
+            "text": self.text(row),
+            "metadata": self.metadata(row),
+        }
+
+    def verify(self):
+        """
+        Checks every file against the sizes and sha256 sums in the manifest.
+        Stores written before checksums were recorded are not checked.
+        """
+        for name, expected in self.manifest.get("files", {}).items():
+            path = self.path / name
+            if not path.exists() or path.stat().st_size != expected["bytes"]:
+                raise ValueError(f"Chunk store file {path} is missing or truncated")
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(block)
+            if sha.hexdigest() != expected["sha256"]:
+                raise ValueError(f"Checksum mismatch for chunk store file {path}")
+
+    def iter_texts(self) -> Iterator[str]:
+        for row in range(self.num_chunks):
+            yield self.text(row)
+
+    def iter_chunks(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self.num_chunks):
+            yield self.chunk(row)
+
+    def to_result(self, row: int, score: float) -> RetrievalResult:
+        row = self._check_row(row)
+        return RetrievalResult(
+            score=float(score),
+            id=self.chunk_id(row),
+            source_id=self.source_id(row),
+            page=int(self.column("page")[row]),
+            chunk_index=int(self.column("chunk_index")[row]),
+        )
+
+
+def write_chunk_store(
+    out_dir: Path,
+    subject: str,
+    chunks: Iterable[Dict[str, Any]]
+) -> int:
+    with ChunkStoreWriter(out_dir, subject) as writer:
+        writer.extend(chunks)
+        count = len(writer)
+    return count
+
+
+def _store_format(store_dir: Path) -> Optional[int]:
+    manifest_path = store_dir / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("format_version")
+
+
+def ensure_chunk_store(subject: str, base_dir: Optional[Path] = None) -> Path:
+    """
+    Returns the chunk store directory for a subject, creating it if needed.
+
+    Subjects ingested before the columnar store existed only have
+    chunks.json; those are converted once and the store is used from then on.
+    Stores in an older format are regenerated the same way when chunks.json
+    is still there; otherwise the subject has to be re-ingested.
+    """
+    subject_dir = Path(base_dir or "data/processed") / subject
+    store_dir = subject_dir / CHUNK_STORE_DIRNAME
+
+    store_format = _store_format(store_dir)
+    if store_format != CHUNK_STORE_FORMAT_VERSION:
+        chunks_path = subject_dir / CHUNKS_FILENAME
+        if not chunks_path.exists() and store_format is not None:
+            # Ingestion no longer keeps chunks.json, so there is nothing to convert from
+            raise ValueError(
+                f"Chunk store at {store_dir} has format version {store_format}, "
+                f"expected {CHUNK_STORE_FORMAT_VERSION}; re-run ingestion for '{subject}'"
+            )
+        if not chunks_path.exists():
+            raise FileNotFoundError(
+                f"No chunk store or {CHUNKS_FILENAME} found for subject at {subject_dir}"
+            )
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            write_chunk_store(store_dir, subject, json.load(f))
+
+    return store_dir
+
+
+def open_chunk_store(subject: str, base_dir: Optional[Path] = None) -> ChunkStore:
+    return ChunkStore(ensure_chunk_store(subject, base_dir))
@@ -0,0 +1,209 @@
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from core.models import ResultBatch, RetrievalResult
+from ingestion.storage.local_store import ChunkStore
+from reranking.interfaces import Reranker
+
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Cross-encoder reranking tuned for CPU latency.
+
+    Only the first `max_candidates` results are scored, which puts a hard
+    ceiling on the cost; the rest are dropped. Pairs already scored for the
+    same (query, chunk id) come from an LRU cache. The remaining pairs are
+    sorted by length so each batch pads to similar lengths and are scored in
+    one predict() call; rerank_batch() does the same for many queries over
+    a ResultBatch, reading chunk text by row. With `quantize=True` the
+    model's Linear layers are dynamically quantized to int8.
+
+    `chunks` may be several stores (e.g. one per subject or shard); rerank()
+    finds each result's text in whichever store holds its id, and passes
+    results it cannot resolve through after the reranked ones. Cached
+    scores are keyed on the store's content hash, so re-ingested chunks that
+    reuse an id are scored again.
+    """
+
+    def __init__(
+        self,
+        chunks: Union[ChunkStore, Sequence[ChunkStore]],
+        model_name: str = DEFAULT_CROSS_ENCODER,
+        max_candidates: int = 50,
+        batch_size: int = 32,
+        max_length: int = 512,
+        quantize: bool = False,
+        cache_size: int = 10_000,
+        model=None
+    ):
+        if max_candidates <= 0:
+            raise ValueError("max_candidates must be a positive integer")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer")
+        if cache_size < 0:
+            raise ValueError("cache_size must be non-negative")
+
+        self.stores: List[ChunkStore] = [chunks] if isinstance(chunks, ChunkStore) else list(chunks)
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.quantize = quantize
+        self.cache_size = cache_size
+        self._model = model
+        self._model_lock = threading.Lock()
+        # (query, store content hash, chunk id) -> score
+        self._cache: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.pairs_scored = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "CrossEncoderReranker requires sentence-transformers; "
+                "install it or pass a model with a predict() method"
+            ) from e
+
+        model = CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+        if self.quantize:
+            import torch
+
+            model.model = torch.quantization.quantize_dynamic(
+                model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        model.model.eval()
+        return model
+
+    def _cached(self, keys: List[Tuple[str, str, str]]) -> Dict[int, float]:
+        found: Dict[int, float] = {}
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    found[i] = score
+            self.cache_hits += len(found)
+        return found
+
+    def _remember(self, scores: Dict[Tuple[str, str, str], float]):
+        if self.cache_size == 0:
+            return
+        with self._cache_lock:
+            for key, score in scores.items():
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        # Shortest first so every batch pads to a similar length
+        order = np.argsort([len(q) + len(t) for q, t in pairs], kind="stable")
+        sorted_scores = np.asarray(
+            self.model.predict(
+                [pairs[i] for i in order],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        ).reshape(len(pairs))
+        scores = np.empty(len(pairs), dtype=np.float32)
+        scores[order] = sorted_scores
+        return scores
+
+    def _score(self, keys: List[Tuple[str, str, str]], text: Callable[[int], str]) -> np.ndarray:
+        """
+        Scores for (query, store hash, chunk id) keys: cached ones from the
+        LRU, the rest in one predict() call over text(i) for key i.
+        """
+        found = self._cached(keys)
+        flat = np.empty(len(keys), dtype=np.float32)
+        for i, score in found.items():
+            flat[i] = score
+
+        missing = [i for i in range(len(keys)) if i not in found]
+        if missing:
+            fresh = self._predict([(keys[i][0], text(i)) for i in missing])
+            with self._cache_lock:
+                self.pairs_scored += len(missing)
+            flat[missing] = fresh
+            self._remember({keys[i]: float(flat[i]) for i in missing})
+        return flat
+
+    def rerank_batch(self, queries: List[str], batch: ResultBatch) -> ResultBatch:
+        """
+        Reranks each query's hits; every missing pair in the batch is scored
+        by a single predict() call.
+        """
+        if len(queries) != len(batch):
+            raise ValueError("expected one query per batch row")
+        for query in queries:
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("query must be a non-empty string")
+
+        batch = batch.truncate(self.max_candidates)
+        query_of, col = np.nonzero(batch.valid)
+        if query_of.size == 0:
+            return batch.select(batch.valid)
+        rows = batch.rows[query_of, col]
+
+        store = batch.store
+        keys = [(queries[q], store.content_hash, store.chunk_id(int(row))) for q, row in zip(query_of, rows)]
+        flat = self._score(keys, lambda i: store.text(int(rows[i])))
+
+        scores = np.full(batch.rows.shape, -np.inf, dtype=np.float32)
+        scores[query_of, col] = flat
+        # Padding sorts last; the sort is stable so equal scores keep retrieval order
+        order = np.argsort(-scores, axis=1, kind="stable")
+        scores[~batch.valid] = 0.0
+        return ResultBatch(
+            np.take_along_axis(batch.rows, order, axis=1),
+            np.take_along_axis(scores, order, axis=1),
+            batch.store,
+        )
+
+    def _locate(self, chunk_id: str) -> Optional[Tuple[ChunkStore, int]]:
+        for store in self.stores:
+            try:
+                return store, store.row_of(chunk_id)
+            except KeyError:
+                continue
+        return None
+
+    def rerank(
+        self,
+        query: str,
+        results: List[RetrievalResult]
+    ) -> List[RetrievalResult]:
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("query must be a non-empty string")
+
+        candidates = results[:self.max_candidates]
+        located = [self._locate(r.id) for r in candidates]
+        known = [i for i, loc in enumerate(located) if loc is not None]
+        if not known:
+            return list(candidates)
+
+        keys = [(query, located[i][0].content_hash, candidates[i].id) for i in known]
+        scores = self._score(keys, lambda j: located[known[j]][0].text(located[known[j]][1]))
+        # Stable, so equal scores keep retrieval order
+        order = np.argsort(-scores, kind="stable")
+        reranked = [replace(candidates[known[j]], score=float(scores[j])) for j in order]
+        return reranked + [r for r, loc in zip(candidates, located) if loc is None]
@@ -0,0 +1,410 @@
+import json
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from core.constants import BM25_INDEX_DIRNAME, SUBJECT_CLOUD_DEVOPS_DOCS_V1
+from ingestion.storage.local_store import ChunkStore, open_chunk_store
+from retrieval.topk import top_k_indices, top_k_rows
+
+
+BM25_FORMAT_VERSION = 1
+TOKENIZER_NAME = "lower_whitespace"
+_MANIFEST = "manifest.json"
+_TERMS = "terms.txt"
+_ARRAYS = ("indptr", "indices", "data", "idf", "doc_len")
+
+
+def tokenize(text: str) -> List[str]:
+    return text.lower().split()
+
+
+class SparseBM25Index:
+    """
+    BM25 (Okapi) over a precomputed term x document impact matrix.
+
+    Every posting stores its final BM25 contribution, idf * saturated tf,
+    so scoring a query is one sparse product over the rows of its terms.
+    Scores match rank_bm25.BM25Okapi, including its epsilon floor for
+    negative IDF values.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        impacts: sparse.csr_matrix,
+        idf: np.ndarray,
+        doc_len: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25
+    ):
+        self.vocab = vocab
+        self.impacts = impacts
+        self.idf = idf
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+    @property
+    def num_docs(self) -> int:
+        return self.impacts.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        tokenized_docs: Iterable[List[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        stats: Optional[Tuple[int, int, Counter]] = None
+    ) -> "SparseBM25Index":
+        """
+        `stats`, from corpus_stats() summed over several corpora, makes the
+        index score with their joint document count, average length and
+        IDF, so raw scores compare across the corpora's indexes.
+        """
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_len: List[int] = []
+
+        for doc_id, tokens in enumerate(tokenized_docs):
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = vocab.setdefault(term, len(vocab))
+                term_ids.append(term_id)
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        num_docs = len(doc_len)
+        if num_docs == 0:
+            raise ValueError("Cannot build a BM25 index over an empty corpus")
+
+        lengths = np.asarray(doc_len, dtype=np.float32)
+        rows = np.asarray(term_ids, dtype=np.int64)
+        cols = np.asarray(doc_ids, dtype=np.int64)
+        tf = np.asarray(tfs, dtype=np.float32)
+
+        if stats is None:
+            # Document frequency and Okapi IDF, floored like BM25Okapi
+            df = np.bincount(rows, minlength=len(vocab)).astype(np.float64)
+            idf = _okapi_idf(df, num_docs, epsilon)
+            avgdl = max(float(lengths.mean()), 1e-9)
+        else:
+            total_docs, total_tokens, doc_freq = stats
+            # IDF over the whole vocabulary, so the floor matches one joint index
+            positions = {term: i for i, term in enumerate(doc_freq)}
+            all_df = np.fromiter(doc_freq.values(), dtype=np.float64, count=len(doc_freq))
+            all_idf = _okapi_idf(all_df, total_docs, epsilon)
+            idf = all_idf[np.fromiter((positions[t] for t in vocab), dtype=np.int64, count=len(vocab))]
+            avgdl = max(total_tokens / total_docs, 1e-9)
+
+        norm = k1 * (1 - b + b * lengths[cols] / avgdl)
+        data = (idf[rows] * (tf * (k1 + 1) / (tf + norm))).astype(np.float32)
+
+        impacts = sparse.csr_matrix(
+            (data, (rows, cols)), shape=(len(vocab), num_docs), dtype=np.float32
+        )
+        impacts.sort_indices()
+
+        return cls(vocab, impacts, idf.astype(np.float32), lengths, k1, b, epsilon)
+
+    def _query_terms(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        # Repeated query terms count once per occurrence, as in BM25Okapi
+        counts = Counter(t for t in tokens if t in self.vocab)
+        term_ids = np.fromiter((self.vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return term_ids, weights
+
+    def get_scores(self, tokens: List[str]) -> np.ndarray:
+        term_ids, weights = self._query_terms(tokens)
+        if term_ids.size == 0:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        postings = self.impacts[term_ids]
+        return np.asarray(postings.T @ weights, dtype=np.float32).ravel()
+
+    def top_k(self, tokens: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.get_scores(tokens)
+        indices = top_k_indices(scores, k)
+        return indices, scores[indices]
+
+    def query_matrix(self, token_lists: List[List[str]]) -> sparse.csr_matrix:
+        """
+        (Q, V) sparse matrix of query term counts.
+        """
+        rows, cols, vals = [], [], []
+        for q, tokens in enumerate(token_lists):
+            term_ids, weights = self._query_terms(tokens)
+            rows.append(np.full(term_ids.size, q, dtype=np.int64))
+            cols.append(term_ids)
+            vals.append(weights)
+        return sparse.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(token_lists), len(self.vocab)),
+            dtype=np.float32,
+        )
+
+    def get_scores_batch(self, token_lists: List[List[str]]) -> np.ndarray:
+        """
+        (Q, N) scores for all queries with one sparse matrix product.
+        """
+        if not token_lists:
+            return np.zeros((0, self.num_docs), dtype=np.float32)
+        scores = self.query_matrix(token_lists) @ self.impacts
+        return np.asarray(scores.toarray(), dtype=np.float32)
+
+    def top_k_batch(
+        self,
+        token_lists: List[List[str]],
+        k: int,
+        block_size: int = 256
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Blocks bound the dense (block, N) score matrix for large query sets
+        indices, scores = [], []
+        for start in range(0, len(token_lists), block_size):
+            idx, sc = top_k_rows(self.get_scores_batch(token_lists[start:start + block_size]), k)
+            indices.append(idx)
+            scores.append(sc)
+        if not indices:
+            return np.empty((0, 0), dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.vstack(indices), np.vstack(scores)
+
+    def params(self) -> Dict[str, float]:
+        return {"k1": self.k1, "b": self.b, "epsilon": self.epsilon}
+
+    def select_docs(self, rows: np.ndarray) -> "SparseBM25Index":
+        """
+        The index over the given documents only, numbered by their position
+        in `rows`. Impacts keep their corpus-wide statistics, so scores are
+        unchanged; scoring a query only touches the selected columns.
+        """
+        impacts = self.impacts[:, rows].tocsr()
+        impacts.sort_indices()
+        return SparseBM25Index(
+            self.vocab, impacts, self.idf, np.asarray(self.doc_len)[rows], self.k1, self.b, self.epsilon
+        )
+
+    def slice_docs(self, start: int, stop: int) -> "SparseBM25Index":
+        """
+        The index restricted to documents [start, stop), renumbered from 0.
+
+        Impacts keep the corpus-wide IDF, document count and average length
+        they were built with, so a slice scores its documents exactly as the
+        full index does. Terms without postings in the slice are dropped.
+        """
+        impacts = self.impacts[:, start:stop].tocsr()
+        terms = np.flatnonzero(np.diff(impacts.indptr) > 0)
+        impacts = impacts[terms]
+        impacts.sort_indices()
+        names = {term_id: term for term, term_id in self.vocab.items()}
+        vocab = {names[int(t)]: i for i, t in enumerate(terms)}
+        return SparseBM25Index(
+            vocab, impacts, np.asarray(self.idf)[terms], np.asarray(self.doc_len)[start:stop],
+            self.k1, self.b, self.epsilon
+        )
+
+    def save(self, out_dir: Path, source_hash: str, stats_subject: Optional[str] = None):
+        """
+        Writes the index as plain .npy arrays plus a sorted, newline-separated
+        vocabulary. Terms never contain whitespace, so the vocabulary needs no
+        escaping, and the arrays can be memory-mapped on load. `stats_subject`
+        records the subject whose corpus statistics a shard slice scores with.
+        """
+        out_dir = Path(out_dir)
+        tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        # Renumber terms in sorted order so the vocabulary file is the id map
+        terms = sorted(self.vocab)
+        order = np.fromiter((self.vocab[t] for t in terms), dtype=np.int64, count=len(terms))
+        impacts = self.impacts[order]
+        impacts.sort_indices()
+
+        arrays = {
+            "indptr": impacts.indptr,
+            "indices": impacts.indices,
+            "data": impacts.data,
+            "idf": self.idf[order],
+            "doc_len": self.doc_len,
+        }
+        for name, arr in arrays.items():
+            np.save(tmp_dir / f"{name}.npy", arr)
+
+        with open(tmp_dir / _TERMS, "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+
+        manifest = {
+            "format_version": BM25_FORMAT_VERSION,
+            "tokenizer": TOKENIZER_NAME,
+            "source_hash": source_hash,
+            "num_docs": self.num_docs,
+            "num_terms": len(terms),
+            "nnz": int(impacts.nnz),
+            "stats_subject": stats_subject,
+            **self.params(),
+        }
+        with open(tmp_dir / _MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        tmp_dir.rename(out_dir)
+
+    @classmethod
+    def load(cls, index_dir: Path, mmap: bool = True) -> "SparseBM25Index":
+        index_dir = Path(index_dir)
+        manifest = read_manifest(index_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"BM25 index not found at {index_dir}")
+
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(index_dir / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in _ARRAYS
+        }
+
+        with open(index_dir / _TERMS, "r", encoding="utf-8") as f:
+            terms = f.read().split("\n") if manifest["num_terms"] else []
+        vocab = dict(zip(terms, range(len(terms))))
+
+        impacts = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(manifest["num_terms"], manifest["num_docs"]),
+            copy=False,
+        )
+        return cls(
+            vocab,
+            impacts,
+            arrays["idf"],
+            arrays["doc_len"],
+            k1=manifest["k1"],
+            b=manifest["b"],
+            epsilon=manifest["epsilon"],
+        )
+
+
+def _okapi_idf(df: np.ndarray, num_docs: int, epsilon: float) -> np.ndarray:
+    idf = np.log(num_docs - df + 0.5) - np.log(df + 0.5)
+    if len(idf):
+        floor = epsilon * (idf.sum() / len(idf))
+        idf[idf < 0] = floor
+    return idf
+
+
+def corpus_stats(tokenized_docs: Iterable[List[str]]) -> Tuple[int, int, Counter]:
+    """
+    (documents, tokens, document frequency per term) of a tokenized corpus.
+    """
+    num_docs, num_tokens, doc_freq = 0, 0, Counter()
+    for tokens in tokenized_docs:
+        num_docs += 1
+        num_tokens += len(tokens)
+        doc_freq.update(set(tokens))
+    return num_docs, num_tokens, doc_freq
+
+
+def minmax_normalize(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores
+    max_s, min_s = float(np.max(scores)), float(np.min(scores))
+    if max_s == min_s:
+        return np.ones_like(scores)
+    return (scores - min_s) / (max_s - min_s)
+
+
+def minmax_normalize_rows(scores: np.ndarray) -> np.ndarray:
+    """
+    minmax_normalize applied to each row of a (Q, K) score matrix.
+    """
+    if scores.size == 0:
+        return scores
+    min_s = scores.min(axis=1, keepdims=True)
+    span = scores.max(axis=1, keepdims=True) - min_s
+    flat = span == 0
+    return np.where(flat, np.ones_like(scores), (scores - min_s) / np.where(flat, 1, span))
+
+
+def read_manifest(index_dir: Path) -> Optional[Dict]:
+    path = Path(index_dir) / _MANIFEST
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_fresh(index_dir: Path, store: ChunkStore, params: Optional[Dict[str, float]] = None) -> bool:
+    """
+    True if the persisted index was built from this exact chunk store
+    content with the current tokenizer and BM25 parameters.
+    """
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        return False
+    if manifest.get("format_version") != BM25_FORMAT_VERSION:
+        return False
+    if manifest.get("tokenizer") != TOKENIZER_NAME:
+        return False
+    if manifest.get("source_hash") != store.content_hash:
+        return False
+    if manifest.get("num_docs") != len(store):
+        return False
+    for key, value in (params or {}).items():
+        if manifest.get(key) != value:
+            return False
+    return True
+
+
+def build_bm25_index(subject: str, base_dir: Optional[Path] = None, **params) -> SparseBM25Index:
+    """
+    Builds the BM25 index for a processed subject and persists it next to
+    faiss.index so retrievers can load it instead of re-tokenizing.
+    """
+    store = open_chunk_store(subject, base_dir)
+    index = SparseBM25Index.build((tokenize(t) for t in store.iter_texts()), **params)
+    out_dir = Path(base_dir or "data/processed") / subject / BM25_INDEX_DIRNAME
+    index.save(out_dir, store.content_hash)
+    print(f">>> BM25 index written to {out_dir}: {index.num_docs} docs, {len(index.vocab)} terms")
+    return index
+
+
+def load_or_build_bm25(
+    store: ChunkStore,
+    index_dir: Path,
+    **params
+) -> SparseBM25Index:
+    """
+    Loads the persisted index if it is fresh, otherwise rebuilds it from the
+    chunk store and tries to persist the result for the next startup.
+    """
+    defaults = {"k1": 1.5, "b": 0.75, "epsilon": 0.25}
+    defaults.update(params)
+    if is_fresh(index_dir, store, defaults):
+        return SparseBM25Index.load(index_dir)
+
+    stats_subject = (read_manifest(index_dir) or {}).get("stats_subject")
+    if stats_subject:
+        # A rebuild would use this shard's statistics only, breaking comparability
+        raise RuntimeError(
+            f"Shard BM25 index at {index_dir} is stale; re-run shard_subject for '{stats_subject}'"
+        )
+
+    index = SparseBM25Index.build((tokenize(t) for t in store.iter_texts()), **defaults)
+    try:
+        index.save(index_dir, store.content_hash)
+    except OSError as e:
+        # Read-only deployments still work, they just rebuild every time
+        print(f">>> Could not persist BM25 index at {index_dir}: {e}")
+    return index
+
+
+if __name__ == "__main__":
+    build_bm25_index(SUBJECT_CLOUD_DEVOPS_DOCS_V1)
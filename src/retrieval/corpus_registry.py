@@ -0,0 +1,167 @@
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from core.constants import BM25_INDEX_DIRNAME, CHUNK_STORE_DIRNAME
+from ingestion.storage.local_store import ChunkStore, ensure_chunk_store
+
+
+# Indexes derived from the chunk store check their own freshness; counting
+# them here would hand out a new version every time one is rebuilt lazily.
+DERIVED_DIRNAMES = {BM25_INDEX_DIRNAME}
+
+
+def subject_version(subject_dir: Path) -> str:
+    """
+    Cheap content version for a processed subject.
+
+    Derived from the name, size and mtime of the subject's files and of the
+    manifests of its sub-stores, so re-running ingestion or embeddings
+    yields a new version without hashing any data.
+    """
+    subject_dir = Path(subject_dir)
+    if not subject_dir.exists():
+        raise FileNotFoundError(f"Processed subject not found at {subject_dir}")
+
+    entries: List[str] = []
+    for path in sorted(subject_dir.iterdir()):
+        if path.name in DERIVED_DIRNAMES or path.name.endswith(".tmp"):
+            continue
+        if path.is_dir():
+            path = path / "manifest.json"
+            if not path.exists():
+                continue
+        st = path.stat()
+        entries.append(f"{path.relative_to(subject_dir)}:{st.st_size}:{st.st_mtime_ns}")
+
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()[:16]
+
+
+class SubjectCorpus:
+    """
+    Shared, lazily populated resources for one subject at one on-disk version.
+
+    Retrievers ask for resources by name with a builder; the first caller
+    builds it and everyone else gets the same object.
+    """
+
+    def __init__(self, subject: str, version: str, base_dir: Path):
+        self.subject = subject
+        self.version = version
+        self.base_dir = Path(base_dir)
+        self.refcount = 0
+        self._resources: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def path(self) -> Path:
+        return self.base_dir / self.subject
+
+    def get(self, name: str, builder: Callable[[], Any]) -> Any:
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is None:
+                resource = builder()
+                self._resources[name] = resource
+        return resource
+
+    def loaded(self) -> List[str]:
+        return sorted(self._resources)
+
+    @property
+    def chunks(self) -> ChunkStore:
+        return self.get("chunks", lambda: ChunkStore(self.path / CHUNK_STORE_DIRNAME))
+
+    def clear(self):
+        with self._lock:
+            self._resources.clear()
+
+
+class CorpusRegistry:
+    """
+    Process-wide, reference-counted cache of SubjectCorpus handles.
+
+    Handles are keyed by subject and on-disk version: acquiring a subject
+    whose files changed returns a fresh handle, while retrievers still
+    holding the old one keep working against it until they release it.
+    """
+
+    def __init__(self, base_dir: Path = Path("data/processed")):
+        self.base_dir = Path(base_dir)
+        self._corpora: Dict[str, SubjectCorpus] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, subject: str) -> SubjectCorpus:
+        ensure_chunk_store(subject, self.base_dir)
+        version = subject_version(self.base_dir / subject)
+        with self._lock:
+            corpus = self._corpora.get(subject)
+            if corpus is None or corpus.version != version:
+                corpus = SubjectCorpus(subject, version, self.base_dir)
+                self._corpora[subject] = corpus
+            corpus.refcount += 1
+            return corpus
+
+    def release(self, corpus: SubjectCorpus):
+        with self._lock:
+            if corpus.refcount <= 0:
+                raise ValueError(f"Corpus '{corpus.subject}' released more times than acquired")
+            corpus.refcount -= 1
+            stale = self._corpora.get(corpus.subject) is not corpus
+        if stale and corpus.refcount == 0:
+            corpus.clear()
+
+    def evict(self, subject: str, force: bool = False) -> bool:
+        """
+        Drops a subject from the registry.
+
+        Without force, subjects still referenced by a retriever are kept.
+        """
+        with self._lock:
+            corpus = self._corpora.get(subject)
+            if corpus is None or (corpus.refcount > 0 and not force):
+                return False
+            del self._corpora[subject]
+        if corpus.refcount == 0:
+            corpus.clear()
+        return True
+
+    def reload(self, subject: str) -> SubjectCorpus:
+        """
+        Forces a fresh handle for a subject and returns it acquired.
+        """
+        self.evict(subject, force=True)
+        return self.acquire(subject)
+
+    def prune(self) -> int:
+        with self._lock:
+            unused = [s for s, c in self._corpora.items() if c.refcount == 0]
+        return sum(self.evict(s) for s in unused)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                subject: {
+                    "version": c.version,
+                    "refcount": c.refcount,
+                    "loaded": c.loaded(),
+                }
+                for subject, c in self._corpora.items()
+            }
+
+
+_default_registry: Optional[CorpusRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_corpus_registry() -> CorpusRegistry:
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = CorpusRegistry()
+    return _default_registry
@@ -1,75 +1,234 @@
-import json
-from pathlib import Path
-from typing import List
+import threading
+from typing import List, Optional
 
 import faiss
+import numpy as np
 
+from core.constants import VECTOR_IDS_FILENAME
+from core.telemetry import TelemetryRecorder
+from embeddings.index_factory import id_selector, read_index_mmap, search_parameters
 from embeddings.normalize import l2_normalize
-from retrieval.interfaces import Retriever, RetrievalConfig
-from core.models import RetrievalResult
+from retrieval.corpus_registry import SubjectCorpus, get_corpus_registry
+from retrieval.interfaces import MetadataFilter, Retriever, RetrievalConfig
+from retrieval.metadata_filter import MetadataIndex
+from core.models import ResultBatch, RetrievalResult
+
+
+class LabelRows:
+    """
+    Maps FAISS labels back to chunk store rows.
+
+    The embedding pipeline labels vectors with stable ids derived from chunk
+    ids (vector_ids.npy holds one per row); lookups are a binary search over
+    the sorted labels.
+    """
+
+    def __init__(self, labels: Optional[np.ndarray]):
+        self._labels = None if labels is None else np.asarray(labels)
+        if labels is None:
+            self._sorted = None
+            return
+        order = np.argsort(labels, kind="stable")
+        self._sorted = np.asarray(labels)[order]
+        self._rows = order
+
+    def labels(self, rows: np.ndarray) -> np.ndarray:
+        if self._labels is None:
+            return np.asarray(rows, dtype=np.int64)
+        return self._labels[rows]
+
+    def all_labels(self, num_rows: int) -> np.ndarray:
+        if self._labels is None:
+            return np.arange(num_rows, dtype=np.int64)
+        return self._sorted
+
+    def rows(self, labels: np.ndarray) -> np.ndarray:
+        if self._sorted is None:
+            return labels
+        pos = np.searchsorted(self._sorted, labels)
+        pos = np.minimum(pos, len(self._sorted) - 1)
+        found = (labels >= 0) & (self._sorted[pos] == labels)
+        return np.where(found, self._rows[pos], -1)
+
+
+# Filters are few and repeat across queries; building a selector is not free
+MAX_CACHED_SELECTORS = 64
 
 
 class DenseRetriever(Retriever):
     """
     Dense retrieval using FAISS + cosine similarity.
     Embedder is injected to keep retrieval testable and offline-safe.
+    With lazy=True nothing is read from disk until load() or the first query.
+    Metadata filters are pushed into the FAISS search as an IDSelector.
     """
 
-    def __init__(self, subject: str, embedder=None):
+    def __init__(
+        self,
+        subject: str,
+        embedder=None,
+        corpus: Optional[SubjectCorpus] = None,
+        telemetry: Optional[TelemetryRecorder] = None,
+        lazy: bool = False
+    ):
         self.subject = subject
         self.embedder = embedder  # injected dependency
-        self._load_index()
-        self._load_chunks()
-
-    def _load_index(self):
-        index_path = Path("data/processed") / self.subject / "faiss.index"
+        # Disabled unless a recorder is passed in; spans nest under the caller's
+        self.telemetry = telemetry or TelemetryRecorder(enabled=False)
+        self._owns_corpus = corpus is None
+        self.corpus = corpus
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._selectors = {}
+        self._selector_lock = threading.Lock()
+        if not lazy:
+            self.load()
+
+    def load(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            if self.corpus is None:
+                self.corpus = get_corpus_registry().acquire(self.subject)
+            self._load_index()
+            self._load_chunks()
+            self._loaded = True
+
+    def _read_index(self) -> faiss.Index:
+        index_path = self.corpus.path / "faiss.index"
         if not index_path.exists():
             raise FileNotFoundError(f"FAISS index file not found at {index_path}")
-        self.index = faiss.read_index(str(index_path))
+        # Read-only mmap: worker processes share the index pages
+        return read_index_mmap(index_path)
 
-    def _load_chunks(self):
-        chunks_path = Path("data/processed") / self.subject / "chunks.json"
-        if not chunks_path.exists():
-            raise FileNotFoundError(f"Chunks file not found at {chunks_path}")
+    def _load_index(self):
+        self.index = self.corpus.get("faiss_index", self._read_index)
+        self.label_rows = self.corpus.get("label_rows", self._read_label_rows)
 
-        with open(chunks_path, "r", encoding="utf-8") as f:
-            self.chunks = json.load(f)
+    def _read_label_rows(self) -> "LabelRows":
+        ids_path = self.corpus.path / VECTOR_IDS_FILENAME
+        if not ids_path.exists():
+            # Indexes built before id mapping label vectors by row
+            return LabelRows(None)
+        return LabelRows(np.load(ids_path))
 
-    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
+    def _load_chunks(self):
+        self.chunks = self.corpus.chunks
+
+    def _metadata(self) -> MetadataIndex:
+        # Shared by every retriever over the subject
+        return self.corpus.get("metadata_index", lambda: MetadataIndex(self.chunks))
+
+    def _selector(self, f: MetadataFilter):
+        """
+        (selector, matches anything) for a filter; selector is None when
+        the filter admits every row.
+        """
+        cached = self._selectors.get(f)
+        if cached is not None:
+            return cached
+        rows = self._metadata().rows(f)
+        if len(rows) == len(self.chunks):
+            cached = (None, True)
+        elif len(rows) == 0:
+            cached = (None, False)
+        else:
+            labels = self.label_rows.labels(rows)
+            cached = (id_selector(labels, self.label_rows.all_labels(len(self.chunks))), True)
+        with self._selector_lock:
+            if len(self._selectors) >= MAX_CACHED_SELECTORS:
+                self._selectors.pop(next(iter(self._selectors)))
+            self._selectors[f] = cached
+        return cached
+
+    def close(self):
+        if self._owns_corpus and self.corpus is not None:
+            get_corpus_registry().release(self.corpus)
+            self.corpus = None
+
+    def _validate(self, queries: List[str], config: RetrievalConfig):
         if self.embedder is None:
             raise RuntimeError(
                 "DenseRetriever requires an embedder to perform retrieval"
             )
 
-        if not isinstance(query, str) or not query.strip():
-            raise ValueError("query must be a non-empty string")
+        for query in queries:
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("query must be a non-empty string")
 
         if config.top_k <= 0:
             raise ValueError("top_k must be a positive integer")
 
-        # Embed query (query-time only)
-        query_vector = self.embedder.embed_query(query)
-        query_vector = l2_normalize(query_vector)
-
-        scores, indices = self.index.search(query_vector, config.top_k)
+        if config.nprobe is not None and config.nprobe <= 0:
+            raise ValueError("nprobe must be a positive integer")
+
+        if config.ef_search is not None and config.ef_search <= 0:
+            raise ValueError("ef_search must be a positive integer")
+
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        # Embedders without a batch method fall back to one call per query
+        if hasattr(self.embedder, "embed_queries"):
+            return self.embedder.embed_queries(queries)
+        return np.vstack([self.embedder.embed_query(q) for q in queries])
+
+    def _search(
+        self,
+        query_vectors: np.ndarray,
+        config: RetrievalConfig
+    ) -> ResultBatch:
+        query_vectors = np.atleast_2d(query_vectors)
+        selector = None
+        store = self.chunks
+        if config.filter is not None and not config.filter.is_empty():
+            selector, any_match = self._selector(config.filter)
+            if not any_match:
+                return ResultBatch.empty(len(query_vectors), self.chunks)
+            store = self._metadata().results_store(config.filter)
+
+        query_vectors = l2_normalize(np.ascontiguousarray(query_vectors, dtype=np.float32))
+        params = search_parameters(self.index, config.nprobe, config.ef_search, selector)
+        scores, labels = self.index.search(query_vectors, config.top_k, params=params)
+
+        # FAISS pads short result lists with label -1; unknown labels map to -1 too
+        rows = self.label_rows.rows(labels)
+        rows = np.where(rows < len(self.chunks), rows, -1)
+        batch = ResultBatch(rows, scores, store)
+        return batch.select(batch.valid)
+
+    def search(self, query: str, config: RetrievalConfig) -> ResultBatch:
+        self._validate([query], config)
+        self.load()
+
+        with self.telemetry.stage("dense"):
+            # Embed query (query-time only)
+            with self.telemetry.stage("embed_query"):
+                query_vector = self.embedder.embed_query(query)
+            with self.telemetry.stage("search"):
+                return self._search(query_vector, config)
+
+    def search_batch(self, queries: List[str], config: RetrievalConfig) -> ResultBatch:
+        self._validate(queries, config)
+        self.load()
+        if not queries:
+            return ResultBatch.empty(0, self.chunks)
+
+        # One embedding request and one (Q, D) FAISS search for the batch
+        with self.telemetry.stage("dense"):
+            with self.telemetry.stage("embed_query"):
+                query_vectors = self._embed_queries(queries)
+            with self.telemetry.stage("search"):
+                return self._search(query_vectors, config)
 
-        results: List[RetrievalResult] = []
-
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < 0 or idx >= len(self.chunks):
-                continue
-
-            chunk = self.chunks[idx]
-            meta = chunk["metadata"]
-
-            results.append(
-                RetrievalResult(
-                    score=float(score),
-                    id=chunk["id"],
-                    source_id=meta["source_id"],
-                    page=meta["page"],
-                    chunk_index=meta["chunk_index"],
-                )
-            )
-
-        return results
+    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
+        return self.search(query, config).to_results()[0]
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        config: RetrievalConfig
+    ) -> List[List[RetrievalResult]]:
+        if not queries:
+            return []
+        return self.search_batch(queries, config).to_results()
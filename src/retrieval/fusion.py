@@ -0,0 +1,159 @@
+from dataclasses import replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.models import ResultBatch, RetrievalResult
+from retrieval.topk import top_k_indices
+
+
+FUSION_METHODS = ("weighted", "rrf")
+RRF_K = 60
+
+
+def _concat(ids: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unique ids over all legs, the first candidate position of each, and the
+    unique slot of every candidate.
+    """
+    all_ids = np.concatenate([np.asarray(i, dtype=object) for i in ids]) if ids else np.empty(0, dtype=object)
+    if all_ids.size == 0:
+        return all_ids, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    unique, first, inverse = np.unique(all_ids.astype(str), return_index=True, return_inverse=True)
+    return unique, first, inverse
+
+
+def weighted_fusion(
+    ids: List[np.ndarray],
+    scores: List[np.ndarray],
+    weights: Sequence[float],
+    top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum of weight * score per id across legs.
+
+    Returns (positions, fused scores) for the top_k ids, highest first;
+    positions index the concatenation of the legs' candidates and point at
+    the first occurrence of each id.
+    """
+    _, first, inverse = _concat(ids)
+    if first.size == 0:
+        return first, np.empty(0, dtype=np.float64)
+    leg_weights = np.repeat(np.asarray(weights, dtype=np.float64), [len(i) for i in ids])
+    all_scores = np.concatenate([np.asarray(s, dtype=np.float64) for s in scores])
+    fused = np.bincount(inverse, weights=all_scores * leg_weights, minlength=first.size)
+    top = top_k_indices(fused, top_k)
+    return first[top], fused[top]
+
+
+def rrf_fusion(
+    ids: List[np.ndarray],
+    top_k: int,
+    k: int = RRF_K,
+    weights: Optional[Sequence[float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reciprocal Rank Fusion: sum of weight / (k + rank) per id, with ranks
+    starting at 1 in each leg. Scores are ignored, so legs with incomparable
+    score scales need no normalization. Same return shape as weighted_fusion.
+    """
+    _, first, inverse = _concat(ids)
+    if first.size == 0:
+        return first, np.empty(0, dtype=np.float64)
+    if weights is None:
+        weights = [1.0] * len(ids)
+    contrib = np.concatenate([
+        w / (k + np.arange(1, len(i) + 1, dtype=np.float64))
+        for i, w in zip(ids, weights)
+    ])
+    fused = np.bincount(inverse, weights=contrib, minlength=first.size)
+    top = top_k_indices(fused, top_k)
+    return first[top], fused[top]
+
+
+def fuse_results(
+    legs: List[List[RetrievalResult]],
+    top_k: int,
+    method: str = "weighted",
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: int = RRF_K
+) -> List[RetrievalResult]:
+    """
+    Fuses one query's result lists by chunk id. The first occurrence of
+    each id carries its metadata.
+    """
+    candidates = [r for leg in legs for r in leg]
+    if not candidates:
+        return []
+    if weights is None:
+        weights = [1.0] * len(legs)
+
+    ids = [np.array([r.id for r in leg], dtype=object) for leg in legs]
+    if method == "rrf":
+        positions, fused = rrf_fusion(ids, top_k, k=rrf_k, weights=weights)
+    else:
+        scores = [np.array([r.score for r in leg], dtype=np.float64) for leg in legs]
+        positions, fused = weighted_fusion(ids, scores, weights, top_k)
+    return [replace(candidates[p], score=float(s)) for p, s in zip(positions, fused)]
+
+
+def fuse_batches(
+    batches: List[ResultBatch],
+    top_k: int,
+    method: str = "weighted",
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: int = RRF_K
+) -> ResultBatch:
+    """
+    weighted_fusion / rrf_fusion for every query of a batch at once.
+
+    When all legs share one chunk store, candidates are keyed by
+    (query, row) integers, so the whole batch is fused with one np.unique,
+    one bincount and one lexsort; ties break by row. Legs over different
+    stores fall back to fusing materialized results by chunk id.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+    if weights is None:
+        weights = [1.0] * len(batches)
+    num_queries = len(batches[0])
+    store = batches[0].store
+    if any(b.store is not store for b in batches):
+        per_leg = [b.to_results() for b in batches]
+        return ResultBatch.from_results([
+            fuse_results([leg[q] for leg in per_leg], top_k, method, weights, rrf_k)
+            for q in range(num_queries)
+        ])
+
+    num_rows = len(store)
+    keys, contrib = [], []
+    for batch, w in zip(batches, weights):
+        valid = batch.valid
+        query_of = np.nonzero(valid)[0]
+        keys.append(query_of * num_rows + batch.rows[valid])
+        if method == "rrf":
+            # Hits are packed to the front, so column + 1 is the rank
+            ranks = np.nonzero(valid)[1] + 1
+            contrib.append(w / (rrf_k + ranks.astype(np.float64)))
+        else:
+            contrib.append(w * batch.scores[valid].astype(np.float64))
+    keys = np.concatenate(keys)
+    if keys.size == 0:
+        return ResultBatch.empty(num_queries, store)
+
+    unique, inverse = np.unique(keys, return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate(contrib), minlength=unique.size)
+    query_of, rows = np.divmod(unique, num_rows)
+
+    # By query, then by fused score descending; rank is the position within the query
+    order = np.lexsort((-fused, query_of))
+    query_of, rows, fused = query_of[order], rows[order], fused[order]
+    rank = np.arange(order.size) - np.searchsorted(query_of, query_of, side="left")
+    keep = rank < top_k
+
+    width = int(min(top_k, np.bincount(query_of, minlength=num_queries).max()))
+    out_rows = np.full((num_queries, width), -1, dtype=np.int64)
+    out_scores = np.zeros((num_queries, width), dtype=np.float64)
+    out_rows[query_of[keep], rank[keep]] = rows[keep]
+    out_scores[query_of[keep], rank[keep]] = fused[keep]
+    return ResultBatch(out_rows, out_scores, store)
@@ -1,55 +1,139 @@
-from typing import Dict, List
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Callable, List, Optional, Tuple, TypeVar
 
+from core.telemetry import TelemetryRecorder
+from retrieval.fusion import FUSION_METHODS, RRF_K, fuse_batches
 from retrieval.interfaces import Retriever, RetrievalConfig
-from core.models import RetrievalResult
+from core.models import ResultBatch, RetrievalResult
+
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hybrid_executor() -> ThreadPoolExecutor:
+    """
+    Process-wide pool the hybrid legs run on. FAISS and the sparse matrix
+    products release the GIL, so threads give real overlap.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=min(32, 2 * (os.cpu_count() or 1)),
+                    thread_name_prefix="hybrid-leg",
+                )
+    return _executor
 
 
 class HybridRetriever(Retriever):
     """
-    Score-level fusion of dense and sparse retrieval.
+    Fusion of dense and sparse retrieval.
+
+    Both legs run concurrently, each fetching `candidate_k` candidates
+    (default 4 * top_k), and are fused either by alpha-weighted scores or by
+    Reciprocal Rank Fusion. Per-leg timings go to `telemetry` when one is
+    passed in (RetrievalPipeline passes its own).
     """
 
-    def __init__(self, dense: Retriever, sparse: Retriever, alpha: float = 0.5):
+    def __init__(
+        self,
+        dense: Retriever,
+        sparse: Retriever,
+        alpha: float = 0.5,
+        fusion: str = "weighted",
+        candidate_k: Optional[int] = None,
+        rrf_k: int = RRF_K,
+        executor: Optional[ThreadPoolExecutor] = None,
+        telemetry: Optional[TelemetryRecorder] = None
+    ):
         if not 0.0 <= alpha <= 1.0:
             raise ValueError("alpha must be in [0, 1]")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}', expected one of {FUSION_METHODS}")
+        if candidate_k is not None and candidate_k <= 0:
+            raise ValueError("candidate_k must be a positive integer")
+        if rrf_k <= 0:
+            raise ValueError("rrf_k must be a positive integer")
 
         self.dense = dense
         self.sparse = sparse
         self.alpha = alpha
+        self.fusion = fusion
+        self.candidate_k = candidate_k
+        self.rrf_k = rrf_k
+        self.executor = executor
+        # Disabled unless a recorder is passed in, as in DenseRetriever
+        self.telemetry = telemetry or TelemetryRecorder(enabled=False)
 
-    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
-        dense_results = self.dense.retrieve(query, config)
-        sparse_results = self.sparse.retrieve(query, config)
-
-        fused: Dict[str, RetrievalResult] = {}
-
-        # Add dense results
-        for r in dense_results:
-            fused[r.id] = RetrievalResult(
-                id=r.id,
-                source_id=r.source_id,
-                page=r.page,
-                chunk_index=r.chunk_index,
-                score=self.alpha * r.score,
-            )
-
-        # Merge sparse results
-        for r in sparse_results:
-            if r.id in fused:
-                fused[r.id].score += (1 - self.alpha) * r.score
-            else:
-                fused[r.id] = RetrievalResult(
-                    id=r.id,
-                    source_id=r.source_id,
-                    page=r.page,
-                    chunk_index=r.chunk_index,
-                    score=(1 - self.alpha) * r.score,
-                )
+    def load(self):
+        # The legs read different files, so load them side by side
+        executor = self.executor or get_hybrid_executor()
+        dense_future = executor.submit(self.dense.load)
+        self.sparse.load()
+        dense_future.result()
+
+    def close(self):
+        self.dense.close()
+        self.sparse.close()
+
+    def _leg_config(self, config: RetrievalConfig) -> RetrievalConfig:
+        depth = self.candidate_k or 4 * config.top_k
+        return replace(config, top_k=max(depth, config.top_k))
+
+    def _timed(self, name: str, fn: Callable[[], T]) -> Callable[[], T]:
+        def run():
+            with self.telemetry.stage(name):
+                return fn()
+        return run
+
+    def _run_legs(self, dense_fn: Callable[[], T], sparse_fn: Callable[[], T]) -> Tuple[T, T]:
+        executor = self.executor or get_hybrid_executor()
+        # Sparse runs on the caller's thread; only the dense leg is handed off,
+        # in a copy of the caller's context so its spans nest under the caller's
+        context = contextvars.copy_context()
+        dense_future = executor.submit(context.run, self._timed("hybrid.dense", dense_fn))
+        sparse = self._timed("hybrid.sparse", sparse_fn)()
+        return dense_future.result(), sparse
 
-        results = sorted(
-            fused.values(),
-            key=lambda x: x.score,
-            reverse=True,
+    def _fuse(self, dense: ResultBatch, sparse: ResultBatch, top_k: int) -> ResultBatch:
+        weights = None if self.fusion == "rrf" else [self.alpha, 1 - self.alpha]
+        return fuse_batches([dense, sparse], top_k, self.fusion, weights, self.rrf_k)
+
+    def search(self, query: str, config: RetrievalConfig) -> ResultBatch:
+        leg_config = self._leg_config(config)
+        dense, sparse = self._run_legs(
+            lambda: self.dense.search(query, leg_config),
+            lambda: self.sparse.search(query, leg_config),
+        )
+        with self.telemetry.stage("hybrid.fusion"):
+            return self._fuse(dense, sparse, config.top_k)
+
+    def search_batch(self, queries: List[str], config: RetrievalConfig) -> ResultBatch:
+        leg_config = self._leg_config(config)
+        dense, sparse = self._run_legs(
+            lambda: self.dense.search_batch(queries, leg_config),
+            lambda: self.sparse.search_batch(queries, leg_config),
         )
+        # Legs over the same subject share a chunk store and fuse on rows
+        with self.telemetry.stage("hybrid.fusion"):
+            return self._fuse(dense, sparse, config.top_k)
+
+    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
+        return self.search(query, config).to_results()[0]
 
-        return results[: config.top_k]
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        config: RetrievalConfig
+    ) -> List[List[RetrievalResult]]:
+        if not queries:
+            return []
+        return self.search_batch(queries, config).to_results()
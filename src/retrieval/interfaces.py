@@ -1,11 +1,47 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, List, Optional, Tuple, Union
 from dataclasses import dataclass
-from core.models import RetrievalResult
+from core.models import ResultBatch, RetrievalResult
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    """
+    Restricts retrieval to chunks whose metadata matches every given field:
+    any of `source_ids`, and a page in [page_min, page_max] (inclusive).
+    Frozen and hashable so filtered configs can key caches and batches.
+    """
+    source_ids: Optional[Tuple[str, ...]] = None
+    page_min: Optional[int] = None
+    page_max: Optional[int] = None
+
+    def __init__(
+        self,
+        source_ids: Union[str, Iterable[str], None] = None,
+        page_min: Optional[int] = None,
+        page_max: Optional[int] = None
+    ):
+        if isinstance(source_ids, str):
+            source_ids = (source_ids,)
+        elif source_ids is not None:
+            source_ids = tuple(source_ids)
+        if page_min is not None and page_max is not None and page_min > page_max:
+            raise ValueError("page_min must not exceed page_max")
+        object.__setattr__(self, "source_ids", source_ids)
+        object.__setattr__(self, "page_min", page_min)
+        object.__setattr__(self, "page_max", page_max)
+
+    def is_empty(self) -> bool:
+        return self.source_ids is None and self.page_min is None and self.page_max is None
+
 
 @dataclass(frozen=True)
 class RetrievalConfig:
     top_k: int=5
+    # ANN search knobs, applied only to index types that use them
+    nprobe: Optional[int]=None
+    ef_search: Optional[int]=None
+    # Pushed down into index search, not applied to the results afterwards
+    filter: Optional[MetadataFilter]=None
 
 
 class Retriever(ABC):
@@ -16,3 +52,40 @@ class Retriever(ABC):
         config: RetrievalConfig
     ) -> List[RetrievalResult]:
         pass
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        config: RetrievalConfig
+    ) -> List[List[RetrievalResult]]:
+        """
+        Retrieves for many queries at once; one result list per query, in order.
+        Retrievers override this when they can share work across queries.
+        """
+        return [self.retrieve(query, config) for query in queries]
+
+    def search(self, query: str, config: RetrievalConfig) -> ResultBatch:
+        """
+        retrieve() as a one-query ResultBatch, for fusion and reranking.
+        """
+        return ResultBatch.from_results([self.retrieve(query, config)])
+
+    def search_batch(self, queries: List[str], config: RetrievalConfig) -> ResultBatch:
+        """
+        retrieve_batch() as a ResultBatch. Retrievers backed by a chunk store
+        override both to return store rows without building results.
+        """
+        return ResultBatch.from_results(self.retrieve_batch(queries, config))
+
+    def load(self):
+        """
+        Loads indexes now. Retrievers built with lazy=True otherwise load on
+        their first query; calling this again is a no-op.
+        """
+        pass
+
+    def close(self):
+        """
+        Releases shared resources held by the retriever.
+        """
+        pass
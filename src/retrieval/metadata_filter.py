@@ -0,0 +1,207 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from core.constants import DEDUP_ALIASES_FILENAME, META_CHUNK_INDEX, META_PAGE, META_SOURCE_ID
+from core.models import RetrievalResult
+from ingestion.dedup import read_aliases
+from ingestion.storage.local_store import ChunkStore
+from retrieval.interfaces import MetadataFilter
+
+# Filters are few and repeat across queries, like the retrievers' caches
+MAX_CACHED_VIEWS = 64
+
+
+class AliasedStore:
+    """
+    Chunk store view for one filter: rows the filter admits only through a
+    dedup alias report that alias's source, page and chunk index, so every
+    result satisfies the filter. Text and ids stay the canonical chunk's.
+    """
+
+    def __init__(self, store: ChunkStore, aliased: Dict[int, Tuple[str, int, int]]):
+        self.store = store
+        # canonical row -> (source id, page, chunk index) of the matching alias
+        self.aliased = aliased
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def source_id(self, row: int) -> str:
+        alias = self.aliased.get(int(row))
+        return alias[0] if alias is not None else self.store.source_id(row)
+
+    def column(self, name: str) -> np.ndarray:
+        field = {"page": 1, "chunk_index": 2}.get(name)
+        if field is None:
+            return self.store.column(name)
+        values = self._columns.get(name)
+        if values is None:
+            values = np.array(self.store.column(name))
+            for row, alias in self.aliased.items():
+                values[row] = alias[field]
+            self._columns[name] = values
+        return values
+
+    def to_result(self, row: int, score: float) -> RetrievalResult:
+        alias = self.aliased.get(int(row))
+        if alias is None:
+            return self.store.to_result(row, score)
+        return RetrievalResult(
+            score=float(score),
+            id=self.store.chunk_id(row),
+            source_id=alias[0],
+            page=alias[1],
+            chunk_index=alias[2],
+        )
+
+
+class MetadataIndex:
+    """
+    Precomputed row lookups over a chunk store's metadata columns.
+
+    Rows are grouped by source (one sorted run per source id, CSR-style)
+    and ordered by page, so a filter resolves to its matching rows with a
+    slice per source and two binary searches, without scanning the columns.
+
+    Subjects ingested with dedup keep only canonical chunks. A canonical row
+    also matches when one of its recorded aliases (dedup_aliases.json next
+    to the store) has a matching source and page, so filters find the same
+    content as before deduplication; results_store() then reports such a
+    row with the alias's metadata.
+    """
+
+    def __init__(self, store: ChunkStore, aliases_path: Optional[Path] = None):
+        self.store = store
+        self.num_rows = len(store)
+        source = np.asarray(store.column("source"), dtype=np.int64)
+        page = np.asarray(store.column("page"), dtype=np.int64)
+
+        self._source_codes: Dict[str, int] = {s["id"]: code for code, s in enumerate(store.sources)}
+        self._source_rows = np.argsort(source, kind="stable")
+        counts = np.bincount(source, minlength=len(store.sources))
+        self._source_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self._page = page
+        self._page_rows = np.argsort(page, kind="stable")
+        self._sorted_pages = page[self._page_rows]
+
+        if aliases_path is None:
+            aliases_path = Path(store.path).parent / DEDUP_ALIASES_FILENAME
+        self._load_aliases(store, Path(aliases_path))
+        self._source_names = {code: source_id for source_id, code in self._source_codes.items()}
+        self._views: Dict[MetadataFilter, Any] = {}
+        self._views_lock = threading.Lock()
+
+    def _load_aliases(self, store: ChunkStore, path: Path):
+        # One entry per alias: the canonical row it maps to, its source code and page
+        rows, sources, pages, chunk_indexes = [], [], [], []
+        if path.exists():
+            for canonical_id, group in read_aliases(path).items():
+                row = store.row_of(canonical_id)
+                for alias in group:
+                    meta = alias["metadata"]
+                    # Sources only present through aliases get codes past the store's
+                    code = self._source_codes.setdefault(meta[META_SOURCE_ID], len(self._source_codes))
+                    rows.append(row)
+                    sources.append(code)
+                    pages.append(meta[META_PAGE])
+                    chunk_indexes.append(meta.get(META_CHUNK_INDEX, 0))
+        self._alias_rows = np.asarray(rows, dtype=np.int64)
+        self._alias_sources = np.asarray(sources, dtype=np.int64)
+        self._alias_pages = np.asarray(pages, dtype=np.int64)
+        self._alias_chunk_indexes = np.asarray(chunk_indexes, dtype=np.int64)
+
+    def _rows_via_aliases(self, f: MetadataFilter) -> np.ndarray:
+        return self._alias_rows[self._alias_matches(f)]
+
+    def _alias_matches(self, f: MetadataFilter) -> np.ndarray:
+        keep = np.ones(len(self._alias_rows), dtype=bool)
+        if f.source_ids is not None:
+            codes = [self._source_codes[s] for s in f.source_ids if s in self._source_codes]
+            keep &= np.isin(self._alias_sources, codes)
+        if f.page_min is not None:
+            keep &= self._alias_pages >= f.page_min
+        if f.page_max is not None:
+            keep &= self._alias_pages <= f.page_max
+        return keep
+
+    def results_store(self, f: MetadataFilter):
+        """
+        The store to build this filter's results from: the chunk store
+        itself, or an AliasedStore when some rows match only through an
+        alias. Views are cached, so retrievers sharing this index share them.
+        """
+        if not len(self._alias_rows) or f.is_empty():
+            return self.store
+        view = self._views.get(f)
+        if view is not None:
+            return view
+
+        aliased: Dict[int, Tuple[str, int, int]] = {}
+        matches = np.flatnonzero(self._alias_matches(f))
+        # Rows matching directly keep their own metadata
+        matches = matches[~np.isin(self._alias_rows[matches], self._direct_rows(f))]
+        for i in matches:
+            row = int(self._alias_rows[i])
+            # First matching alias wins
+            if row not in aliased:
+                aliased[row] = (
+                    self._source_names[int(self._alias_sources[i])],
+                    int(self._alias_pages[i]),
+                    int(self._alias_chunk_indexes[i]),
+                )
+        view = AliasedStore(self.store, aliased) if aliased else self.store
+        with self._views_lock:
+            if len(self._views) >= MAX_CACHED_VIEWS:
+                self._views.pop(next(iter(self._views)))
+            self._views[f] = view
+        return view
+
+    def _rows_for_sources(self, source_ids) -> np.ndarray:
+        runs = []
+        for source_id in source_ids:
+            code = self._source_codes.get(source_id)
+            if code is not None and code + 1 < len(self._source_offsets):
+                runs.append(self._source_rows[self._source_offsets[code]:self._source_offsets[code + 1]])
+        if not runs:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(runs)
+
+    def _rows_for_pages(self, page_min: Optional[int], page_max: Optional[int]) -> np.ndarray:
+        lo = 0 if page_min is None else np.searchsorted(self._sorted_pages, page_min, side="left")
+        hi = len(self._sorted_pages) if page_max is None else np.searchsorted(self._sorted_pages, page_max, side="right")
+        return self._page_rows[lo:hi]
+
+    def rows(self, f: MetadataFilter) -> np.ndarray:
+        """
+        Sorted rows matching the filter, directly or through an alias.
+        """
+        rows = self._direct_rows(f)
+        if len(self._alias_rows):
+            rows = np.union1d(rows, self._rows_via_aliases(f))
+        return rows
+
+    def _direct_rows(self, f: MetadataFilter) -> np.ndarray:
+        has_pages = f.page_min is not None or f.page_max is not None
+        if f.source_ids is None:
+            rows = self._rows_for_pages(f.page_min, f.page_max) if has_pages else np.arange(self.num_rows)
+            return np.sort(rows)
+
+        rows = self._rows_for_sources(f.source_ids)
+        if has_pages:
+            # Source runs are usually the smaller set; check their pages directly
+            pages = self._page[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if f.page_min is not None:
+                keep &= pages >= f.page_min
+            if f.page_max is not None:
+                keep &= pages <= f.page_max
+            rows = rows[keep]
+        return np.sort(rows)
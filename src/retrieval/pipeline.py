@@ -1,16 +1,249 @@
-from retrieval.registry import RetrieverFactory
-from retrieval.interfaces import RetrievalConfig
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from core.constants import TelemetryStage
+from core.models import RetrievalResult
+from core.telemetry import TelemetryRecorder
+from retrieval.corpus_registry import get_corpus_registry, subject_version
+from retrieval.registry import RetrievalFactory
+from retrieval.interfaces import MetadataFilter, Retriever, RetrievalConfig
+from retrieval.result_cache import ResultCache
+
+
+LOAD_MODES = ("eager", "lazy", "background")
 
 class RetrievalPipeline:
     """
     End-to-end retrieval orchestration.
+
+    `load` picks when the retriever is imported, built and its indexes
+    read: "eager" in the constructor, "lazy" on the first query, or
+    "background" on a thread started by the constructor. Queries that
+    arrive before a background load finishes wait for it; `ready` is set
+    once loading has finished, and wait_ready() re-raises a failed load.
+
+    With a ResultCache, results are cached under (query, config, index
+    version). The version is re-read from the subjects' files at most every
+    `version_check_interval` seconds; when it changes the retriever is
+    rebuilt over the new files before any result is cached under the new
+    version, so re-ingesting or re-embedding a subject invalidates its
+    cached results without any explicit flush. For sharded strategies the
+    version covers the shard subjects the retriever opens. A replaced
+    retriever is closed once the queries already inside it have returned.
     """
 
-    def __init__(self, strategy_config):
-        self.retriever = RetrieverFactory.create(strategy_config)
+    def __init__(
+        self,
+        strategy_config,
+        embedder=None,
+        telemetry: Optional[TelemetryRecorder] = None,
+        cache: Optional[ResultCache] = None,
+        version_check_interval: float = 1.0,
+        load: str = "eager"
+    ):
+        if load not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode '{load}', expected one of {LOAD_MODES}")
+        self.strategy_config = strategy_config
+        self.embedder = embedder
+        self.telemetry = telemetry or TelemetryRecorder()
+        self.retriever: Optional[Retriever] = None
+        self.ready = threading.Event()
+        self.load_error: Optional[BaseException] = None
+        self._load_lock = threading.Lock()
+        self.cache = cache
+        self.version_check_interval = version_check_interval
+        self._subjects = sorted({
+            s for s in (
+                strategy_config.subject,
+                getattr(strategy_config, "dense_subject", None),
+                getattr(strategy_config, "sparse_subject", None),
+            )
+            if s
+        })
+        self._version: Tuple[str, ...] = ()
+        self._loaded_version: Tuple[str, ...] = ()
+        self._version_checked_at = -float("inf")
+        self._version_lock = threading.Lock()
+        # In-flight calls per retriever (by id), and replaced ones awaiting close
+        self._leases: Dict[int, int] = {}
+        self._retired: Set[int] = set()
+        self._lease_lock = threading.Lock()
+
+        if load == "eager":
+            self.load()
+        elif load == "background":
+            threading.Thread(target=self._load_in_background, name="retriever-load", daemon=True).start()
+
+    def load(self):
+        """
+        Builds the retriever and loads its indexes now, if not done yet.
+        """
+        with self._load_lock:
+            try:
+                if self.retriever is None:
+                    # Read before building: a rebuild racing this load only causes an extra reload
+                    self._loaded_version = self._read_version()
+                    self.retriever = self._create_retriever()
+                self.retriever.load()
+            except Exception as e:
+                self.load_error = e
+                self.ready.set()
+                raise
+            self.load_error = None
+            self.ready.set()
+
+    def _create_retriever(self) -> Retriever:
+        return RetrievalFactory.create_retriever(
+            self.strategy_config, embedder=self.embedder, telemetry=self.telemetry
+        )
+
+    def _reload(self, version: Tuple[str, ...]):
+        # Retrievers hold the corpus they acquired; a new one acquires the new files
+        with self._load_lock:
+            retriever = self._create_retriever()
+            retriever.load()
+            old, self.retriever = self.retriever, retriever
+            self._loaded_version = version
+        print(f">>> Reloaded retriever for {', '.join(self._subjects)}: index version changed")
+        with self._lease_lock:
+            # Queries already inside the old retriever finish against it
+            in_use = self._leases.get(id(old), 0) > 0
+            if in_use:
+                self._retired.add(id(old))
+        if not in_use:
+            old.close()
+
+    @contextmanager
+    def _lease(self) -> Iterator[Retriever]:
+        with self._lease_lock:
+            retriever = self.retriever
+            self._leases[id(retriever)] = self._leases.get(id(retriever), 0) + 1
+        try:
+            yield retriever
+        finally:
+            with self._lease_lock:
+                key = id(retriever)
+                self._leases[key] -= 1
+                done = self._leases[key] == 0
+                if done:
+                    del self._leases[key]
+                close = done and key in self._retired
+                if close:
+                    self._retired.discard(key)
+            if close:
+                retriever.close()
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except Exception:
+            # Kept in load_error; queries retry the load and see the error
+            pass
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        if not self.ready.wait(timeout):
+            return False
+        if self.load_error is not None:
+            raise self.load_error
+        return True
+
+    def _served_subjects(self, base_dir: Path) -> List[str]:
+        if not getattr(self.strategy_config, "sharded", False):
+            return self._subjects
+        from retrieval.sharded import shard_subjects
+
+        return [shard for s in self._subjects for shard in (shard_subjects(s, base_dir) or [s])]
+
+    def _read_version(self) -> Tuple[str, ...]:
+        # Names are part of the version, so re-sharding into a new count reloads too
+        base_dir = get_corpus_registry().base_dir
+        return tuple(f"{s}:{subject_version(base_dir / s)}" for s in self._served_subjects(base_dir))
+
+    def index_version(self) -> Tuple[str, ...]:
+        """
+        Version of the files the retriever serves; a change on disk rebuilds
+        the retriever before the new version is handed out.
+        """
+        now = time.monotonic()
+        with self._version_lock:
+            if now - self._version_checked_at >= self.version_check_interval:
+                version = self._read_version()
+                if self.retriever is not None and version != self._loaded_version:
+                    self._reload(version)
+                self._version = version
+                self._version_checked_at = now
+            return self._version
+
+    def run(
+        self,
+        query: str,
+        top_k: int,
+        filter: Optional[MetadataFilter] = None
+    ) -> List[RetrievalResult]:
+        config = RetrievalConfig(top_k=top_k, filter=filter)
+        if not self.ready.is_set() or self.load_error is not None:
+            self.load()
+        with self.telemetry.stage(TelemetryStage.RETRIEVAL):
+            if self.cache is None:
+                with self._lease() as retriever:
+                    return retriever.retrieve(query, config)
+
+            key = (query, config, self.index_version())
+            with self._lease() as retriever:
+                results, outcome, seconds = self.cache.get_or_compute(
+                    key, lambda: retriever.retrieve(query, config)
+                )
+            self.telemetry.increment(f"retrieval_cache.{outcome}")
+            if outcome != "miss":
+                self.telemetry.increment("retrieval_cache.saved_seconds", seconds)
+            # Callers own their list; the cached one stays untouched
+            return list(results)
+
+    def run_batch(
+        self,
+        queries: List[str],
+        top_k: int,
+        filter: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievalResult]]:
+        """
+        One result list per query, retrieved with a single retrieve_batch()
+        call for every query the cache cannot answer.
+        """
+        config = RetrievalConfig(top_k=top_k, filter=filter)
+        if not self.ready.is_set() or self.load_error is not None:
+            self.load()
+        with self.telemetry.stage(TelemetryStage.RETRIEVAL):
+            if self.cache is None:
+                with self._lease() as retriever:
+                    return retriever.retrieve_batch(queries, config)
+
+            version = self.index_version()
+            out: List[Optional[List[RetrievalResult]]] = [None] * len(queries)
+            missing = []
+            for i, query in enumerate(queries):
+                cached = self.cache.lookup((query, config, version))
+                if cached is None:
+                    missing.append(i)
+                    continue
+                out[i] = list(cached[0])
+                self.telemetry.increment("retrieval_cache.hit")
+                self.telemetry.increment("retrieval_cache.saved_seconds", cached[1])
 
-    def run(self, query: str, top_k: int):
-        config = RetrievalConfig(top_k=top_k)
-        return self.retriever.retrieve(query, config)
+            if missing:
+                self.telemetry.increment("retrieval_cache.miss", len(missing))
+                start = time.perf_counter()
+                with self._lease() as retriever:
+                    fresh = retriever.retrieve_batch([queries[i] for i in missing], config)
+                # Batched work has no per-query cost; charge each query an equal share
+                seconds = (time.perf_counter() - start) / len(missing)
+                for i, results in zip(missing, fresh):
+                    self.cache.put((queries[i], config, version), results, seconds)
+                    out[i] = list(results)
+            return out
 
-    
\ No newline at end of file
+    def close(self):
+        if self.retriever is not None:
+            self.retriever.close()
@@ -1,17 +1,45 @@
-from retrieval.dense import DenseRetriever
-from retrieval.hybrid import HybridRetriever
-from retrieval.sparse import BM25Retriever
-
 class RetrievalFactory:
+    """
+    Builds the retriever for a StrategyConfig.
+
+    Retriever modules are imported on first use, so importing the factory
+    (and RetrievalPipeline) does not pull in faiss or scipy, and a worker
+    only pays for the backends its strategy needs. With lazy=True the
+    retrievers also defer reading indexes until load() or the first query.
+    """
+
+    @staticmethod
+    def _dense(strategy_config, subject, embedder, telemetry, lazy):
+        if strategy_config.sharded:
+            from retrieval.sharded import ShardedRetriever
+            return ShardedRetriever.for_subject(subject, kind="dense", embedder=embedder, lazy=lazy)
+        from retrieval.dense import DenseRetriever
+        return DenseRetriever(subject, embedder=embedder, telemetry=telemetry, lazy=lazy)
+
     @staticmethod
-    def create_retriever(strategy_config):
+    def _sparse(strategy_config, subject, lazy):
+        if strategy_config.sharded:
+            from retrieval.sharded import ShardedRetriever
+            return ShardedRetriever.for_subject(subject, kind="sparse", lazy=lazy)
+        from retrieval.sparse import BM25Retriever
+        return BM25Retriever(subject, lazy=lazy)
+
+    @staticmethod
+    def create_retriever(strategy_config, embedder=None, telemetry=None, lazy: bool = False):
         if strategy_config.type == "dense":
-            return DenseRetriever(strategy_config.subject)
-        
+            return RetrievalFactory._dense(strategy_config, strategy_config.subject, embedder, telemetry, lazy)
+
+        if strategy_config.type == "sparse":
+            return RetrievalFactory._sparse(strategy_config, strategy_config.subject, lazy)
+
         if strategy_config.type == "hybrid":
+            from retrieval.hybrid import HybridRetriever
             return HybridRetriever(
-                dense=DenseRetriever(strategy_config.dense_subject),
-                sparse=BM25Retriever(strategy_config.sparse_subject),
-                alpha=strategy_config.alpha
+                dense=RetrievalFactory._dense(strategy_config, strategy_config.dense_subject, embedder, telemetry, lazy),
+                sparse=RetrievalFactory._sparse(strategy_config, strategy_config.sparse_subject, lazy),
+                alpha=strategy_config.alpha,
+                fusion=strategy_config.fusion,
+                candidate_k=strategy_config.candidate_k,
+                telemetry=telemetry
             )
-        raise ValueError(f"Invalid retrieval strategy: {strategy_config.type}")
\ No newline at end of file
+        raise ValueError(f"Invalid retrieval strategy: {strategy_config.type}")
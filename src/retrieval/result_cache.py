@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    """
+    A computation in progress that identical requests wait on.
+    """
+
+    __slots__ = ("done", "value", "error", "seconds")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.seconds = 0.0
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with TTL expiry and single-flight de-duplication.
+
+    Concurrent get_or_compute() calls for a key that is being computed wait
+    for that one computation instead of starting their own; errors are
+    shared with the waiters and never cached. Each entry remembers how long
+    it took to compute, which is the latency a hit saves.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: Optional[float] = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer")
+        if ttl_seconds is not None and ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive or None")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: Hashable, now: float) -> Optional[Tuple[Any, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, seconds = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, seconds
+
+    def _put(self, key: Hashable, value: Any, seconds: float, now: float):
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        self._entries[key] = (value, expires_at, seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        (value, compute seconds) for a fresh entry, else None. Counts as a
+        hit or a miss; callers that compute on a miss store it with put().
+        """
+        with self._lock:
+            cached = self._get(key, self._clock())
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += cached[1]
+            return cached
+
+    def put(self, key: Hashable, value: Any, seconds: float = 0.0):
+        with self._lock:
+            self._put(key, value, seconds, self._clock())
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, str, float]:
+        """
+        Returns (value, outcome, seconds). outcome is "hit", "coalesced" or
+        "miss"; seconds is the original compute time of the value, i.e. the
+        latency a hit saved.
+        """
+        with self._lock:
+            cached = self._get(key, self._clock())
+            if cached is not None:
+                self.hits += 1
+                self.saved_seconds += cached[1]
+                return cached[0], "hit", cached[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.saved_seconds += flight.seconds
+            return flight.value, "coalesced", flight.seconds
+
+        start = time.perf_counter()
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.seconds = time.perf_counter() - start
+            with self._lock:
+                if flight.error is None:
+                    self._put(key, flight.value, flight.seconds, self._clock())
+                del self._flights[key]
+            flight.done.set()
+        return flight.value, "miss", flight.seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            served = self.hits + self.coalesced
+            total = served + self.misses
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_ratio": served / total if total else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,283 @@
+import contextvars
+import heapq
+import json
+import os
+import shutil
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from itertools import islice
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from core.constants import (
+    BM25_INDEX_DIRNAME,
+    CHUNK_STORE_DIRNAME,
+    EMBEDDINGS_FILENAME,
+    EMBEDDINGS_FLOAT32_FILENAME,
+    EMBEDDING_MANIFEST_FILENAME,
+    FAISS_INDEX_FILENAME,
+    VECTOR_IDS_FILENAME
+)
+from core.models import RetrievalResult
+from embeddings.index_factory import (
+    IndexConfig,
+    build_id_mapped_index,
+    decode_vectors,
+    encode_vectors,
+    write_index_atomic
+)
+from embeddings.normalize import l2_normalize
+from ingestion.storage.local_store import ChunkStoreWriter, open_chunk_store
+from retrieval.bm25_index import (
+    corpus_stats,
+    load_or_build_bm25,
+    minmax_normalize,
+    read_manifest,
+    tokenize
+)
+from retrieval.dense import DenseRetriever
+from retrieval.interfaces import Retriever, RetrievalConfig
+from retrieval.sparse import BM25Retriever
+
+
+SHARD_SEPARATOR = "__shard"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_shard_executor() -> ThreadPoolExecutor:
+    """
+    Process-wide pool for shard fan-out, separate from the hybrid leg pool
+    so sharded hybrid retrievers cannot starve themselves.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=min(32, 2 * (os.cpu_count() or 1)),
+                    thread_name_prefix="shard",
+                )
+    return _executor
+
+
+def shard_name(subject: str, shard: int) -> str:
+    return f"{subject}{SHARD_SEPARATOR}{shard:03d}"
+
+
+def shard_subjects(subject: str, base_dir: Optional[Path] = None) -> List[str]:
+    """
+    Shard subjects previously written by shard_subject(), in shard order.
+    """
+    base_dir = Path(base_dir or "data/processed")
+    if not base_dir.exists():
+        return []
+    prefix = subject + SHARD_SEPARATOR
+    return sorted(
+        p.name for p in base_dir.iterdir()
+        if p.is_dir() and p.name.startswith(prefix) and p.name[len(prefix):].isdigit()
+    )
+
+
+def shard_subject(subject: str, num_shards: int, base_dir: Optional[Path] = None) -> List[str]:
+    """
+    Splits a processed subject into `num_shards` contiguous shard subjects,
+    each with its own chunk store and BM25 index, plus a FAISS index built
+    with the subject's index config when the subject has been embedded.
+
+    Shard BM25 indexes are column slices of the subject's index, so they
+    score with corpus-wide IDF, document count and average length, and raw
+    scores compare across shards exactly as within the unsharded subject.
+    """
+    if num_shards <= 0:
+        raise ValueError("num_shards must be a positive integer")
+
+    base_dir = Path(base_dir or "data/processed")
+    subject_dir = base_dir / subject
+    store = open_chunk_store(subject, base_dir)
+    if num_shards > len(store):
+        raise ValueError(f"Cannot split {len(store)} chunks into {num_shards} shards")
+
+    for stale in shard_subjects(subject, base_dir):
+        shutil.rmtree(base_dir / stale)
+
+    bm25 = load_or_build_bm25(store, subject_dir / BM25_INDEX_DIRNAME)
+
+    manifest = None
+    manifest_path = subject_dir / EMBEDDING_MANIFEST_FILENAME
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        # The float32 copy when the subject stores reduced precision
+        full_path = subject_dir / EMBEDDINGS_FLOAT32_FILENAME
+        vectors = np.load(full_path if full_path.exists() else subject_dir / EMBEDDINGS_FILENAME, mmap_mode="r")
+        labels = np.load(subject_dir / VECTOR_IDS_FILENAME)
+
+    bounds = np.linspace(0, len(store), num_shards + 1).astype(int)
+    names = []
+    for shard, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        name = shard_name(subject, shard)
+        shard_dir = base_dir / name
+        shard_dir.mkdir(parents=True)
+
+        with ChunkStoreWriter(shard_dir / CHUNK_STORE_DIRNAME, name) as writer:
+            for row in range(lo, hi):
+                writer.add(store.chunk(row))
+        bm25.slice_docs(lo, hi).save(
+            shard_dir / BM25_INDEX_DIRNAME, open_chunk_store(name, base_dir).content_hash, stats_subject=subject
+        )
+
+        if manifest is not None:
+            # Vectors are stored in chunk store row order
+            config = IndexConfig(**manifest["index"])
+            shard_vectors = l2_normalize(decode_vectors(np.asarray(vectors[lo:hi])))
+            index = build_id_mapped_index(shard_vectors, labels[lo:hi], config)
+            write_index_atomic(index, shard_dir / FAISS_INDEX_FILENAME)
+            np.save(shard_dir / VECTOR_IDS_FILENAME, labels[lo:hi])
+            np.save(shard_dir / EMBEDDINGS_FILENAME, encode_vectors(shard_vectors, config.storage))
+            if config.storage != "float32":
+                np.save(shard_dir / EMBEDDINGS_FLOAT32_FILENAME, shard_vectors)
+            with open(shard_dir / EMBEDDING_MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+                json.dump({**manifest, "num_vectors": int(hi - lo)}, f, indent=2)
+
+        names.append(name)
+        print(f">>> Shard {name}: rows {lo}-{hi}")
+
+    return names
+
+
+def shared_bm25_stats(subjects: List[str], base_dir: Optional[Path] = None) -> Optional[Tuple[int, int, Counter]]:
+    """
+    Corpus statistics summed over `subjects`, or None when their BM25
+    indexes already share statistics (a single subject, or the shards
+    shard_subject() cut from one subject).
+    """
+    base_dir = Path(base_dir or "data/processed")
+    owners = {
+        (read_manifest(base_dir / s / BM25_INDEX_DIRNAME) or {}).get("stats_subject") for s in subjects
+    }
+    if len(subjects) == 1 or (len(owners) == 1 and None not in owners):
+        return None
+
+    num_docs, num_tokens, doc_freq = 0, 0, Counter()
+    for subject in subjects:
+        n, t, df = corpus_stats(tokenize(text) for text in open_chunk_store(subject, base_dir).iter_texts())
+        num_docs, num_tokens = num_docs + n, num_tokens + t
+        doc_freq.update(df)
+    return num_docs, num_tokens, doc_freq
+
+
+class ShardedRetriever(Retriever):
+    """
+    Fans a query out to one retriever per shard in parallel and merges the
+    per-shard top-k lists with a heap.
+
+    Shards must return scores on a common scale: cosine similarity for
+    dense shards, raw BM25 for sparse ones (BM25Retriever(normalize=False)),
+    since per-shard min-max normalization would put every shard's best hit
+    at 1.0. Raw BM25 is only comparable when shard indexes share corpus
+    statistics: shard_subject() builds them with the whole subject's, and
+    from_subjects() rebuilds independent subjects' indexes with statistics
+    summed over all of them (see shared_bm25_stats). With normalize=True
+    the merged list is min-max normalized once, restoring the [0, 1]
+    contract of a single BM25Retriever.
+    """
+
+    def __init__(
+        self,
+        shards: List[Retriever],
+        normalize: bool = False,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        if not shards:
+            raise ValueError("ShardedRetriever requires at least one shard")
+        self.shards = shards
+        self.normalize = normalize
+        self.executor = executor
+
+    @classmethod
+    def from_subjects(
+        cls,
+        subjects: List[str],
+        kind: str = "sparse",
+        embedder=None,
+        lazy: bool = False,
+        **kwargs
+    ) -> "ShardedRetriever":
+        if kind == "sparse":
+            stats = shared_bm25_stats(subjects)
+            shards = [BM25Retriever(s, normalize=False, lazy=lazy, stats=stats) for s in subjects]
+            kwargs.setdefault("normalize", True)
+        elif kind == "dense":
+            shards = [DenseRetriever(s, embedder=embedder, lazy=lazy) for s in subjects]
+        else:
+            raise ValueError(f"Unknown shard kind '{kind}', expected 'sparse' or 'dense'")
+        return cls(shards, **kwargs)
+
+    @classmethod
+    def for_subject(
+        cls,
+        subject: str,
+        kind: str = "sparse",
+        embedder=None,
+        lazy: bool = False,
+        **kwargs
+    ) -> "ShardedRetriever":
+        """
+        Uses the subject's shards if shard_subject() has split it, else the
+        subject itself as a single shard.
+        """
+        return cls.from_subjects(shard_subjects(subject) or [subject], kind, embedder, lazy, **kwargs)
+
+    def load(self):
+        self._fan_out(lambda shard: shard.load())
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def _fan_out(self, call) -> list:
+        if len(self.shards) == 1:
+            return [call(self.shards[0])]
+        executor = self.executor or get_shard_executor()
+        futures = [
+            executor.submit(contextvars.copy_context().run, call, shard)
+            for shard in self.shards
+        ]
+        return [f.result() for f in futures]
+
+    def _merge(self, per_shard: List[List[RetrievalResult]], top_k: int) -> List[RetrievalResult]:
+        # Each shard list is sorted best first, so a k-way heap merge suffices
+        merged = list(islice(
+            heapq.merge(*per_shard, key=lambda r: r.score, reverse=True), top_k
+        ))
+        if not self.normalize or not merged:
+            return merged
+        scores = minmax_normalize(np.array([r.score for r in merged], dtype=np.float64))
+        return [replace(r, score=float(s)) for r, s in zip(merged, scores)]
+
+    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
+        if config.top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        per_shard = self._fan_out(lambda shard: shard.retrieve(query, config))
+        return self._merge(per_shard, config.top_k)
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        config: RetrievalConfig
+    ) -> List[List[RetrievalResult]]:
+        if config.top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        if not queries:
+            return []
+        per_shard = self._fan_out(lambda shard: shard.retrieve_batch(queries, config))
+        return [
+            self._merge([batch[q] for batch in per_shard], config.top_k)
+            for q in range(len(queries))
+        ]
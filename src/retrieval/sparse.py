@@ -1,70 +1,163 @@
-import json
-from pathlib import Path
-from typing import List
+import threading
+from collections import Counter
+from typing import Any, List, Optional, Tuple
 
 import numpy as np
-from rank_bm25 import BM25Okapi  # pyright: ignore[reportMissingImports]
 
+from core.constants import BM25_INDEX_DIRNAME
+from retrieval.bm25_index import (
+    SparseBM25Index,
+    load_or_build_bm25,
+    minmax_normalize_rows,
+    tokenize
+)
+from retrieval.corpus_registry import SubjectCorpus, get_corpus_registry
 from retrieval.interfaces import Retriever, RetrievalConfig
-from core.models import RetrievalResult
+from retrieval.metadata_filter import MetadataIndex
+from core.models import ResultBatch, RetrievalResult
+
+# Filters are few and repeat across queries; slicing the impact matrix is O(nnz)
+MAX_CACHED_FILTERS = 64
+
 
 class BM25Retriever(Retriever):
     """
     Sparse retrieval using BM25 over chunk text.
-    Scores normalized to [0, 1].
+    Scores normalized to [0, 1] per query, or raw BM25 with normalize=False
+    so they stay comparable with other retrievers' (e.g. across shards).
+    With lazy=True nothing is read from disk until load() or the first query.
+    Metadata filters are pushed into scoring: a filtered query is scored
+    against a cached column slice of the impact matrix holding only the
+    admitted documents. `stats` (see bm25_index.corpus_stats) builds the
+    index in memory with statistics shared across several subjects.
     """
 
-    def __init__(self, subject: str):
+    def __init__(
+        self,
+        subject: str,
+        corpus: Optional[SubjectCorpus] = None,
+        normalize: bool = True,
+        lazy: bool = False,
+        stats: Optional[Tuple[int, int, Counter]] = None
+    ):
         self.subject = subject
-        self._load_chunks()
-        self._build_bm25()
+        self.normalize = normalize
+        self.stats = stats
+        self._owns_corpus = corpus is None
+        self.corpus = corpus
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._filtered = {}
+        self._filtered_lock = threading.Lock()
+        if not lazy:
+            self.load()
+
+    def load(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            if self.corpus is None:
+                self.corpus = get_corpus_registry().acquire(self.subject)
+            self._load_chunks()
+            if self.stats is None:
+                self.bm25 = self.corpus.get("bm25", self._build_bm25)
+            else:
+                # Not shared through the corpus: other retrievers use the subject's own statistics
+                self.bm25 = SparseBM25Index.build(
+                    (self._tokenize(t) for t in self.chunks.iter_texts()), stats=self.stats
+                )
+            self._loaded = True
 
     def _load_chunks(self):
-        path = Path("data/processed") / self.subject / "chunks.json"
-        if not path.exists():
-            raise FileNotFoundError(f"chunks.json not found: {path}")
-
-        with open(path, "r", encoding="utf-8") as f:
-            self.chunks = json.load(f)
+        self.chunks = self.corpus.chunks
 
-        self.documents = [c["text"] for c in self.chunks]
+    def close(self):
+        if self._owns_corpus and self.corpus is not None:
+            get_corpus_registry().release(self.corpus)
+            self.corpus = None
 
     def _tokenize(self, text: str) -> List[str]:
-        return text.lower().split()
+        return tokenize(text)
+
+    def _build_bm25(self) -> SparseBM25Index:
+        # Persisted by ingestion; rebuilt only when missing or stale
+        return load_or_build_bm25(
+            self.chunks, self.corpus.path / BM25_INDEX_DIRNAME
+        )
+
+    def _filtered_index(self, config: RetrievalConfig) -> Optional[Tuple[np.ndarray, SparseBM25Index, Any]]:
+        """
+        (admitted rows, index over just those rows, store to build results
+        from) for a filtered config; None when the filter admits every row.
+        """
+        f = config.filter
+        if f is None or f.is_empty():
+            return None
+        cached = self._filtered.get(f)
+        if cached is not None:
+            return cached
+        # Rows come from the subject's shared MetadataIndex
+        metadata = self.corpus.get("metadata_index", lambda: MetadataIndex(self.chunks))
+        rows = metadata.rows(f)
+        if len(rows) == len(self.chunks):
+            return None
+        cached = (rows, self.bm25.select_docs(rows), metadata.results_store(f))
+        with self._filtered_lock:
+            if len(self._filtered) >= MAX_CACHED_FILTERS:
+                self._filtered.pop(next(iter(self._filtered)))
+            self._filtered[f] = cached
+        return cached
+
+    def _to_batch(self, top_indices: np.ndarray, top_scores: np.ndarray, store=None) -> ResultBatch:
+        # BM25 never pads: every query gets min(top_k, admitted rows) hits
+        norm_scores = minmax_normalize_rows(top_scores) if self.normalize else top_scores
+        return ResultBatch(top_indices, norm_scores, store if store is not None else self.chunks)
+
+    def search(self, query: str, config: RetrievalConfig) -> ResultBatch:
+        if config.top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        self.load()
+        filtered = self._filtered_index(config)
+        if filtered is not None and len(filtered[0]) == 0:
+            return ResultBatch.empty(1, self.chunks)
 
-    def _build_bm25(self):
-        tokenized_docs = [self._tokenize(doc) for doc in self.documents]
-        self.bm25 = BM25Okapi(tokenized_docs)
-
-
-    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
         query_tokens = self._tokenize(query)
-        scores = self.bm25.get_scores(query_tokens)
-
-        top_k = min(config.top_k, len(scores))
-        top_indices = np.argsort(scores)[:-top_k][::-1]
-
-        top_scores = scores[top_indices]
-        max_s,min_s=float(np.max(top_scores)),float(np.min(top_scores))
-
-        if max_s == min_s:
-            norm_scores=np.ones_like(top_scores)
+        if filtered is None:
+            top_indices, top_scores = self.bm25.top_k(query_tokens, config.top_k)
         else:
-            norm_scores=(top_scores-min_s)/(max_s-min_s)
-        
-        results:List[RetrievalResult]=[]
-
-        for score,idx in zip(norm_scores,top_indices):
-            chunk=self.chunks[idx]
-            meta=chunk["metadata"]
-
-            results.append(
-                RetrievalResult(
-                    score=float(score),
-                    id=chunk["id"],
-                    source_id=meta["source_id"],
-                    page=meta["page"],
-                    chunk_index=meta["chunk_index"]
-                )
-            )
-        return results
\ No newline at end of file
+            rows, index, store = filtered
+            top_indices, top_scores = index.top_k(query_tokens, config.top_k)
+            return self._to_batch(rows[top_indices][None, :], top_scores[None, :], store)
+        return self._to_batch(top_indices[None, :], top_scores[None, :])
+
+    def search_batch(self, queries: List[str], config: RetrievalConfig) -> ResultBatch:
+        if config.top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        self.load()
+        filtered = self._filtered_index(config)
+        if not queries or (filtered is not None and len(filtered[0]) == 0):
+            return ResultBatch.empty(len(queries), self.chunks)
+
+        # All queries scored with one (Q, V) x (V, N) sparse product
+        token_lists = [self._tokenize(q) for q in queries]
+        if filtered is None:
+            return self._to_batch(*self.bm25.top_k_batch(token_lists, config.top_k))
+        rows, index, store = filtered
+        top_indices, top_scores = index.top_k_batch(token_lists, config.top_k)
+        return self._to_batch(rows[top_indices], top_scores, store)
+
+    def retrieve(self, query: str, config: RetrievalConfig) -> List[RetrievalResult]:
+        return self.search(query, config).to_results()[0]
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        config: RetrievalConfig
+    ) -> List[List[RetrievalResult]]:
+        if config.top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        if not queries:
+            return []
+        return self.search_batch(queries, config).to_results()
@@ -0,0 +1,296 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.models import RetrievalResult
+from core.telemetry import TelemetryRecorder
+from retrieval.interfaces import MetadataFilter
+
+
+class _Request:
+    __slots__ = ("query", "top_k", "filter", "future", "enqueued_at")
+
+    def __init__(self, query: str, top_k: int, filter: Optional[MetadataFilter], future: asyncio.Future):
+        self.query = query
+        self.top_k = top_k
+        self.filter = filter
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+def _distribution(counts: Counter) -> Dict[str, Any]:
+    # Exact: batch sizes and queue depths are small integers
+    if not counts:
+        return {"count": 0}
+    values = np.array(sorted(counts), dtype=np.float64)
+    weights = np.array([counts[v] for v in sorted(counts)])
+    cdf = np.cumsum(weights) / weights.sum()
+    out: Dict[str, Any] = {
+        "count": int(weights.sum()),
+        "mean": float((values * weights).sum() / weights.sum()),
+    }
+    for q in (0.5, 0.95, 0.99):
+        out[f"p{round(q * 100)}"] = float(values[np.searchsorted(cdf, q)])
+    out["max"] = float(values[-1])
+    out["histogram"] = {int(v): counts[v] for v in sorted(counts)}
+    return out
+
+
+class MicroBatchServer:
+    """
+    Asyncio front end that coalesces concurrent queries into micro-batches.
+
+    Queries wait in a queue until `max_batch_size` are pending or the oldest
+    has waited `max_wait_ms`; the batch then goes to the pipeline's
+    run_batch() on a worker thread as one embedding call and one (Q, D)
+    FAISS search per distinct (top_k, filter). While a batch runs the next
+    one fills up, so the wait bound only applies when the server is idle.
+
+    Use it from a running event loop (start / query / stop), or call
+    start_in_thread() and query_sync() from ordinary threads.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_queue: int = 4096,
+        executor: Optional[Executor] = None,
+        telemetry: Optional[TelemetryRecorder] = None
+    ):
+        # pipeline: anything with run_batch(queries, top_k, filter), e.g. RetrievalPipeline
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be a positive integer")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be non-negative")
+
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+        self.telemetry = telemetry or getattr(pipeline, "telemetry", None) or TelemetryRecorder()
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        # Requests taken off the queue by the batch being collected or run
+        self._inflight: List[_Request] = []
+        self._stats_lock = threading.Lock()
+        self.batch_sizes: Counter = Counter()
+        self.queue_depths: Counter = Counter()
+        self.requests = 0
+        self.errors = 0
+
+    # ---- asyncio API ----
+
+    async def start(self):
+        if self._worker is not None:
+            raise RuntimeError("MicroBatchServer is already running")
+        if self._executor is None:
+            # One batch runs at a time; a single thread keeps BLAS uncontended
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microbatch")
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        stranded = self._inflight
+        while not self._queue.empty():
+            stranded.append(self._queue.get_nowait())
+        for request in stranded:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("MicroBatchServer stopped"))
+        self._inflight = []
+        self._worker = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "MicroBatchServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def query(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[MetadataFilter] = None
+    ) -> List[RetrievalResult]:
+        if self._worker is None:
+            raise RuntimeError("MicroBatchServer is not running; call start() first")
+        # Rejected here, so a bad request cannot fail the batch it would join
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("query must be a non-empty string")
+        if top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        request = _Request(query, top_k, filter, self._loop.create_future())
+        await self._queue.put(request)
+        try:
+            return await request.future
+        finally:
+            self.telemetry.record("serving.request", time.perf_counter() - request.enqueued_at)
+
+    async def _collect(self) -> List[_Request]:
+        batch = self._inflight = [await self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            with self._stats_lock:
+                self.queue_depths[self._queue.qsize()] += 1
+                self.batch_sizes[len(batch)] += 1
+                self.requests += len(batch)
+
+            started = time.perf_counter()
+            for request in batch:
+                self.telemetry.record("serving.queue_wait", started - request.enqueued_at)
+
+            groups: Dict[Tuple[int, Optional[MetadataFilter]], List[_Request]] = {}
+            for request in batch:
+                groups.setdefault((request.top_k, request.filter), []).append(request)
+
+            for (top_k, filter), requests in groups.items():
+                await self._dispatch(top_k, filter, requests)
+            self.telemetry.record("serving.batch", time.perf_counter() - started)
+
+    async def _dispatch(self, top_k: int, filter: Optional[MetadataFilter], requests: List[_Request]):
+        queries = [r.query for r in requests]
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor, self.pipeline.run_batch, queries, top_k, filter
+            )
+        except Exception as e:
+            if len(requests) == 1:
+                self._fail(requests[0], e)
+                return
+            # Retry one by one so only the request that caused it sees the error
+            for request in requests:
+                await self._dispatch(top_k, filter, [request])
+            return
+        for request, result in zip(requests, results):
+            # A caller that gave up has a cancelled future
+            if not request.future.done():
+                request.future.set_result(result)
+
+    def _fail(self, request: _Request, error: Exception):
+        with self._stats_lock:
+            self.errors += 1
+        if not request.future.done():
+            request.future.set_exception(error)
+
+    # ---- thread API ----
+
+    def start_in_thread(self) -> "MicroBatchServer":
+        """
+        Runs the server on its own event loop in a daemon thread.
+        """
+        if self._thread is not None:
+            raise RuntimeError("MicroBatchServer is already running")
+        ready = threading.Event()
+        startup_error: List[BaseException] = []
+        loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except BaseException as e:
+                startup_error.append(e)
+                loop.close()
+                return
+            finally:
+                # Set even when start() fails, so the caller never waits forever
+                ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self.stop())
+            loop.close()
+
+        self._thread = threading.Thread(target=serve, name="microbatch-loop", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if startup_error:
+            self._thread.join()
+            self._thread = None
+            raise startup_error[0]
+        return self
+
+    def query_sync(
+        self,
+        query: str,
+        top_k: int = 5,
+        timeout: Optional[float] = None,
+        filter: Optional[MetadataFilter] = None
+    ) -> List[RetrievalResult]:
+        if self._thread is None:
+            raise RuntimeError("MicroBatchServer is not running in a thread; call start_in_thread() first")
+        return asyncio.run_coroutine_threadsafe(self.query(query, top_k, filter), self._loop).result(timeout)
+
+    def stop_thread(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    # ---- metrics ----
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current queue depth, queue depth seen at each batch, batch size
+        distribution, and request latency quantiles in seconds.
+        """
+        with self._stats_lock:
+            out: Dict[str, Any] = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "queue_depth": self.queue_depth(),
+                "queue_depth_at_batch": _distribution(self.queue_depths),
+                "batch_size": _distribution(self.batch_sizes),
+            }
+        summary = self.telemetry.summary()
+        for name in ("serving.request", "serving.queue_wait", "serving.batch"):
+            if name in summary:
+                out[name] = summary[name]
+        return out
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.batch_sizes.clear()
+            self.queue_depths.clear()
+            self.requests = 0
+            self.errors = 0
+
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from retrieval import corpus_registry
+from tests.helpers import SUBJECT, TEXTS, embed_text, make_chunks
+
+
+@pytest.fixture
+def tiny_subject(tmp_path, monkeypatch):
+    """
+    A processed subject with a legacy chunks.json under tmp_path/data/processed.
+    """
+    subject_dir = tmp_path / "data" / "processed" / SUBJECT
+    subject_dir.mkdir(parents=True)
+    with open(subject_dir / "chunks.json", "w", encoding="utf-8") as f:
+        json.dump(make_chunks(), f)
+
+    monkeypatch.chdir(tmp_path)
+    # Fresh process-wide registry so handles never leak between tests
+    monkeypatch.setattr(corpus_registry, "_default_registry", corpus_registry.CorpusRegistry())
+    return SUBJECT
+
+
+@pytest.fixture
+def tiny_dense_subject(tiny_subject):
+    """
+    tiny_subject plus a flat inner-product FAISS index over FakeEmbedder vectors.
+    """
+    faiss = pytest.importorskip("faiss")
+    import numpy as np
+
+    from embeddings.normalize import l2_normalize
+
+    vectors = l2_normalize(np.vstack([embed_text(t) for t in TEXTS]))
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    faiss.write_index(index, f"data/processed/{tiny_subject}/faiss.index")
+    return tiny_subject
@@ -0,0 +1,121 @@
+import re
+
+from embeddings.fake_embedder import HashEmbedder
+
+SUBJECT = "tiny_docs_v1"
+
+TEXTS = [
+    "AWS Well-Architected Framework helps cloud architects build secure infrastructure.",
+    "The reliability pillar covers recovery planning and how to handle change.",
+    "Security best practices include least privilege and encryption at rest.",
+    "Operational excellence focuses on running and monitoring systems.",
+    "Cost optimization avoids unnecessary costs across the workload lifecycle.",
+    "Performance efficiency uses computing resources efficiently – ünïcode ok.",
+]
+
+
+def make_chunks(subject=SUBJECT, texts=TEXTS):
+    chunks = []
+    for i, text in enumerate(texts):
+        source_id = "well_architected" if i % 2 == 0 else "security_best_practices"
+        chunks.append({
+            "id": f"{subject}_{source_id}_p{i // 2 + 1}_c{i % 2}",
+            "text": text,
+            "metadata": {
+                "subject": subject,
+                "source_id": source_id,
+                "source_title": source_id.replace("_", " ").title(),
+                "page": i // 2 + 1,
+                "chunk_index": i % 2,
+                "start_char": 0,
+                "end_char": len(text),
+            },
+        })
+    return chunks
+
+
+DIM = 16
+
+
+def embed_text(text):
+    """
+    The shipped HashEmbedder's vector for one text, so related texts score higher.
+    """
+    return HashEmbedder(DIM).embed_documents([text])[0]
+
+
+class FakeEmbedder(HashEmbedder):
+    """
+    HashEmbedder at DIM dimensions that counts calls and records texts.
+    """
+
+    def __init__(self):
+        super().__init__(DIM)
+        self.model = "fake-hash"
+        self.calls = 0
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+def write_text_pdf(path, pages):
+    """
+    Minimal single-font PDF with one line of text per page.
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 12 Tf 72 720 Td ({escaped}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+
+class WordEncoding:
+    """
+    Offline stand-in for a tiktoken encoding: one token per word, leading
+    whitespace attached, exposing the methods the chunkers use.
+    """
+
+    def encode(self, text, disallowed_special=()):
+        return re.findall(r"\s*\S+|\s+", text)
+
+    def encode_batch(self, texts, disallowed_special=()):
+        return [self.encode(t) for t in texts]
+
+    def decode_with_offsets(self, tokens):
+        offsets, pos = [], 0
+        for token in tokens:
+            offsets.append(pos)
+            pos += len(token)
+        return "".join(tokens), offsets
@@ -0,0 +1,48 @@
+from retrieval.dense import DenseRetriever
+from retrieval.hybrid import HybridRetriever
+from retrieval.interfaces import RetrievalConfig
+from retrieval.sparse import BM25Retriever
+from tests.helpers import FakeEmbedder
+
+QUERIES = [
+    "AWS Well-Architected Framework",
+    "security encryption at rest",
+    "monitoring systems",
+]
+
+
+def test_dense_batch_matches_single_queries(tiny_dense_subject):
+    embedder = FakeEmbedder()
+    retriever = DenseRetriever(tiny_dense_subject, embedder=embedder)
+    config = RetrievalConfig(top_k=3)
+
+    batch = retriever.retrieve_batch(QUERIES, config)
+
+    assert embedder.calls == 1
+    assert batch == [retriever.retrieve(q, config) for q in QUERIES]
+
+
+def test_bm25_batch_matches_single_queries(tiny_subject):
+    retriever = BM25Retriever(tiny_subject)
+    config = RetrievalConfig(top_k=3)
+
+    batch = retriever.retrieve_batch(QUERIES + ["no known terms"], config)
+
+    assert batch == [retriever.retrieve(q, config) for q in QUERIES + ["no known terms"]]
+
+
+def test_hybrid_fuses_overlapping_results(tiny_dense_subject):
+    retriever = HybridRetriever(
+        dense=DenseRetriever(tiny_dense_subject, embedder=FakeEmbedder()),
+        sparse=BM25Retriever(tiny_dense_subject),
+        alpha=0.6,
+    )
+    config = RetrievalConfig(top_k=4)
+
+    batch = retriever.retrieve_batch(QUERIES, config)
+
+    assert batch == [retriever.retrieve(q, config) for q in QUERIES]
+    for results in batch:
+        ids = [r.id for r in results]
+        assert len(ids) == len(set(ids)) <= 4
+        assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
@@ -0,0 +1,58 @@
+import time
+
+from benchmarks.cli import main
+from benchmarks.load import closed_loop, open_loop
+from tests.helpers import TEXTS
+
+
+def test_closed_loop_counts_every_request():
+    result = closed_loop(lambda q: time.sleep(0.001), ["a", "b"], concurrency=4, num_requests=40)
+
+    assert result.requests == 40 and result.errors == 0
+    assert result.latency_ms["p50"] >= 1.0
+    assert result.throughput_qps > 0
+
+
+def test_open_loop_counts_queueing_delay():
+    # One worker and arrivals far faster than service: later requests queue
+    result = open_loop(lambda q: time.sleep(0.01), ["a"], qps=1000, num_requests=20, max_workers=1)
+
+    assert result.requests == 20
+    assert result.latency_ms["max"] > 100
+
+
+def test_failures_are_reported_by_type_and_first_message():
+    def fn(q):
+        if q == "bad":
+            raise ValueError("query must be a non-empty string")
+
+    closed = closed_loop(fn, ["bad", "ok", "bad"], num_requests=6)
+    opened = open_loop(fn, ["bad"], qps=1000, num_requests=3)
+
+    assert closed.errors == 4 and closed.requests == 6
+    assert closed.error_types == {"ValueError": 4}
+    assert closed.first_error == "ValueError: query must be a non-empty string"
+    assert opened.to_dict()["error_types"] == {"ValueError": 3}
+
+
+def test_cli_runs_every_strategy_and_top_k(tiny_dense_subject, tmp_path):
+    queries = tmp_path / "queries.txt"
+    queries.write_text("\n".join(TEXTS[:3]), encoding="utf-8")
+
+    reports = main([
+        "--subject", tiny_dense_subject,
+        "--queries", str(queries),
+        "--strategy", "dense", "sparse", "hybrid_rrf",
+        "--top-k", "1", "3",
+        "--requests", "12",
+        "--warmup", "2",
+        "--concurrency", "2",
+        "--out", str(tmp_path / "report.json"),
+    ])
+
+    assert [(r["strategy"], r["top_k"]) for r in reports] == [
+        (s, k) for s in ("dense", "sparse", "hybrid_rrf") for k in (1, 3)
+    ]
+    assert all(r["errors"] == 0 and r["requests"] == 12 and r["first_error"] is None for r in reports)
+    assert reports[0]["stages"]["retrieval"]["count"] == 12
+    assert (tmp_path / "report.json").exists()
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ingestion.storage.local_store import open_chunk_store, write_chunk_store
+from retrieval.bm25_index import (
+    SparseBM25Index,
+    build_bm25_index,
+    is_fresh,
+    load_or_build_bm25,
+    tokenize,
+)
+from retrieval.topk import top_k_indices
+from retrieval.interfaces import RetrievalConfig
+from retrieval.sparse import BM25Retriever
+from tests.helpers import TEXTS, make_chunks
+
+
+def test_scores_match_rank_bm25():
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    docs = [tokenize(t) for t in TEXTS]
+
+    index = SparseBM25Index.build(docs)
+    okapi = rank_bm25.BM25Okapi(docs)
+
+    for query in ["security encryption", "the the reliability", "unknown words", "aws"]:
+        tokens = tokenize(query)
+        np.testing.assert_allclose(
+            index.get_scores(tokens), okapi.get_scores(tokens), rtol=1e-5, atol=1e-6
+        )
+
+
+def test_top_k_indices_are_sorted_and_bounded():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.0])
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0, 4]
+
+
+def test_bm25_retriever_returns_top_k(tiny_subject):
+    retriever = BM25Retriever(tiny_subject)
+
+    results = retriever.retrieve("security encryption", RetrievalConfig(top_k=2))
+
+    assert len(results) == 2
+    assert results[0].id.endswith("_p2_c0")
+    assert results[0].score == 1.0
+
+
+def test_persisted_index_round_trip(tiny_subject):
+    built = build_bm25_index(tiny_subject)
+    index_dir = Path("data/processed", tiny_subject, "bm25")
+
+    loaded = SparseBM25Index.load(index_dir)
+
+    assert is_fresh(index_dir, open_chunk_store(tiny_subject))
+    for query in ["security encryption", "cloud the"]:
+        tokens = tokenize(query)
+        np.testing.assert_allclose(loaded.get_scores(tokens), built.get_scores(tokens))
+
+
+def test_stale_index_is_rebuilt(tiny_subject):
+    build_bm25_index(tiny_subject)
+    index_dir = Path("data/processed", tiny_subject, "bm25")
+
+    chunks = make_chunks(texts=TEXTS[:3])
+    write_chunk_store(Path("data/processed", tiny_subject, "chunk_store"), tiny_subject, chunks)
+    store = open_chunk_store(tiny_subject)
+    assert not is_fresh(index_dir, store)
+
+    index = load_or_build_bm25(store, index_dir)
+
+    assert index.num_docs == 3
+    assert is_fresh(index_dir, store)
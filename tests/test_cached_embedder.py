@@ -0,0 +1,76 @@
+import numpy as np
+
+from embeddings.cached_embedder import CachedEmbedder
+from embeddings.local_embedder import LocalEmbedder
+from tests.helpers import FakeEmbedder, embed_text
+from tests.test_local_embedder import FakeSentenceTransformer
+
+
+def test_memory_cache_hits_and_order():
+    inner = FakeEmbedder()
+    embedder = CachedEmbedder(inner, max_entries=10)
+
+    first = embedder.embed_queries(["aws security", "cost  optimization", "aws security"])
+    second = embedder.embed_queries(["cost optimization", "aws security"])
+
+    assert inner.calls == 1
+    np.testing.assert_array_equal(first[0], embed_text("aws security"))
+    np.testing.assert_array_equal(second[0], first[1])
+    assert embedder.stats()["misses"] == 3
+    assert embedder.stats()["memory_hits"] == 2
+
+
+def test_lru_is_bounded():
+    embedder = CachedEmbedder(FakeEmbedder(), max_entries=2)
+
+    embedder.embed_documents(["a", "b", "c"])
+
+    assert embedder.stats()["memory_entries"] == 2
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    embedder = CachedEmbedder(FakeEmbedder(), cache_path=path)
+    expected = embedder.embed_query("reliability pillar")
+    embedder.close()
+
+    inner = FakeEmbedder()
+    restarted = CachedEmbedder(inner, cache_path=path)
+    vector = restarted.embed_query("reliability pillar")
+
+    assert inner.calls == 0
+    np.testing.assert_array_equal(vector, expected)
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_model_name_is_part_of_the_key():
+    a = CachedEmbedder(FakeEmbedder(), model="model-a")
+    b = CachedEmbedder(FakeEmbedder(), model="model-b")
+
+    assert a.cache_key("same text") != b.cache_key("same text")
+    assert a.cache_key("same   text") == a.cache_key("same text")
+
+
+def test_query_and_document_vectors_are_cached_apart(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    text = "reliability pillar"
+
+    def prompted():
+        return LocalEmbedder(query_prompt="query: ", encoder=FakeSentenceTransformer())
+
+    embedder = CachedEmbedder(prompted(), cache_path=path)
+    document = embedder.embed_documents([text])[0]
+    query = embedder.embed_query(text)[0]
+    embedder.close()
+
+    np.testing.assert_array_equal(document, embed_text(text))
+    np.testing.assert_array_equal(query, embed_text("query: " + text))
+    assert embedder.stats()["misses"] == 2
+
+    restarted = CachedEmbedder(prompted(), cache_path=path)
+    np.testing.assert_array_equal(restarted.embed_queries([text])[0], query)
+    np.testing.assert_array_equal(restarted.embed_documents([text])[0], document)
+    assert restarted.stats()["disk_hits"] == 2
+    assert embedder.cache_key(text, as_query=True) != CachedEmbedder(
+        LocalEmbedder(query_prompt="search: ", encoder=FakeSentenceTransformer())
+    ).cache_key(text, as_query=True)
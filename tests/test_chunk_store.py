@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from ingestion.storage import local_store
+from ingestion.storage.local_store import (
+    ChunkStore,
+    ChunkStoreWriter,
+    open_chunk_store,
+    write_chunk_store,
+)
+from tests.helpers import make_chunks
+
+
+def test_chunk_store_round_trip(tmp_path):
+    chunks = make_chunks()
+    count = write_chunk_store(tmp_path / "store", "tiny_docs_v1", chunks)
+
+    store = ChunkStore(tmp_path / "store")
+
+    assert count == len(store) == len(chunks)
+    for row, chunk in enumerate(chunks):
+        assert store.chunk(row) == chunk
+
+    result = store.to_result(2, 0.5)
+    assert result.id == chunks[2]["id"]
+    assert result.source_id == chunks[2]["metadata"]["source_id"]
+    assert result.page == chunks[2]["metadata"]["page"]
+
+
+def test_row_of_finds_ids_despite_hash_collisions(tmp_path, monkeypatch):
+    chunks = make_chunks()
+    write_chunk_store(tmp_path / "store", "tiny_docs_v1", chunks)
+    # Every id collides, so lookups must fall back to comparing stored ids
+    monkeypatch.setattr(local_store, "_id_hash", lambda chunk_id: 7)
+    store = ChunkStore(tmp_path / "store")
+
+    assert [store.row_of(c["id"]) for c in chunks] == list(range(len(chunks)))
+    with pytest.raises(KeyError):
+        store.row_of("missing")
+
+
+def test_empty_chunk_store(tmp_path):
+    write_chunk_store(tmp_path / "store", "empty", [])
+
+    store = ChunkStore(tmp_path / "store")
+
+    assert len(store) == 0
+    assert list(store.iter_chunks()) == []
+
+
+def test_open_chunk_store_migrates_legacy_json(tiny_subject):
+    store = open_chunk_store(tiny_subject)
+
+    assert Path("data/processed", tiny_subject, "chunk_store", "manifest.json").exists()
+    assert list(store.iter_chunks()) == make_chunks()
+
+
+def test_outdated_store_without_json_asks_for_reingestion(tiny_subject):
+    open_chunk_store(tiny_subject)
+    subject_dir = Path("data/processed", tiny_subject)
+    (subject_dir / "chunks.json").unlink()
+    manifest_path = subject_dir / "chunk_store" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest_path.write_text(json.dumps({**manifest, "format_version": 1}), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="re-run ingestion"):
+        open_chunk_store(tiny_subject)
+
+
+def test_writer_flushes_in_batches_and_records_checksums(tmp_path):
+    chunks = make_chunks()
+    write_chunk_store(tmp_path / "store", "tiny_docs_v1", chunks)
+    with ChunkStoreWriter(tmp_path / "batched", "tiny_docs_v1", flush_rows=4) as writer:
+        writer.extend(iter(chunks))
+
+    store = ChunkStore(tmp_path / "batched")
+    store.verify()
+    assert list(store.iter_chunks()) == chunks
+    assert store.manifest["files"] == ChunkStore(tmp_path / "store").manifest["files"]
+
+    with open(tmp_path / "batched" / "page.bin", "r+b") as f:
+        f.write(b"\xff")
+    with pytest.raises(ValueError):
+        store.verify()
@@ -0,0 +1,53 @@
+import json
+import os
+
+from retrieval.corpus_registry import get_corpus_registry
+from retrieval.sparse import BM25Retriever
+from tests.helpers import make_chunks
+
+
+def test_retrievers_share_one_corpus(tiny_subject):
+    first = BM25Retriever(tiny_subject)
+    second = BM25Retriever(tiny_subject)
+
+    assert first.corpus is second.corpus
+    assert first.bm25 is second.bm25
+    assert first.chunks is second.chunks
+    assert get_corpus_registry().stats()[tiny_subject]["refcount"] == 2
+
+    first.close()
+    second.close()
+    assert get_corpus_registry().stats()[tiny_subject]["refcount"] == 0
+
+
+def test_changed_subject_gets_new_handle(tiny_subject):
+    registry = get_corpus_registry()
+    old = registry.acquire(tiny_subject)
+    old_chunks = old.chunks
+
+    manifest = f"data/processed/{tiny_subject}/chunk_store/manifest.json"
+    with open(manifest, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.utime(manifest, ns=(1, 1))
+
+    new = registry.acquire(tiny_subject)
+
+    assert new is not old
+    assert old.chunks is old_chunks
+    assert len(new.chunks) == len(make_chunks())
+
+    registry.release(old)
+    assert old.loaded() == []
+
+
+def test_evict_keeps_referenced_subjects(tiny_subject):
+    registry = get_corpus_registry()
+    corpus = registry.acquire(tiny_subject)
+
+    assert not registry.evict(tiny_subject)
+
+    registry.release(corpus)
+    assert registry.evict(tiny_subject)
+    assert tiny_subject not in registry.stats()
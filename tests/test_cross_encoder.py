@@ -0,0 +1,76 @@
+from dataclasses import replace
+from pathlib import Path
+
+from ingestion.storage.local_store import open_chunk_store, write_chunk_store
+from reranking.cross_encoder import CrossEncoderReranker
+from retrieval.sparse import BM25Retriever
+from retrieval.interfaces import RetrievalConfig
+from tests.helpers import TEXTS, make_chunks
+
+
+class OverlapModel:
+    """
+    Scores a pair by shared words; records what it was asked to score.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(pairs))
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+
+
+def test_rerank_scores_sorted_pairs_once_and_caches(tiny_subject):
+    results = BM25Retriever(tiny_subject).retrieve("security and monitoring", RetrievalConfig(top_k=6))
+    model = OverlapModel()
+    reranker = CrossEncoderReranker(open_chunk_store(tiny_subject), max_candidates=4, model=model)
+
+    reranked = reranker.rerank("security encryption at rest", results)
+
+    assert len(model.calls) == 1
+    lengths = [len(q) + len(t) for q, t in model.calls[0]]
+    assert lengths == sorted(lengths)
+    assert {r.id for r in reranked} == {r.id for r in results[:4]}
+    assert [r.score for r in reranked] == sorted((r.score for r in reranked), reverse=True)
+    assert reranked[0].id == make_chunks()[2]["id"]
+
+    again = reranker.rerank("security encryption at rest", results)
+
+    assert again == reranked
+    assert len(model.calls) == 1
+    assert reranker.cache_hits == 4 and reranker.pairs_scored == 4
+
+
+def test_rerank_resolves_results_across_stores(tiny_subject):
+    write_chunk_store(Path("data/processed/other/chunk_store"), "other", make_chunks("other", ["encryption at rest"]))
+    query = "encryption at rest"
+    results = BM25Retriever(tiny_subject).retrieve(query, RetrievalConfig(top_k=2))
+    results += BM25Retriever("other").retrieve(query, RetrievalConfig(top_k=1))
+    unknown = replace(results[0], id="gone_p9_c9", score=0.5)
+    reranker = CrossEncoderReranker(
+        [open_chunk_store(tiny_subject), open_chunk_store("other")], model=OverlapModel()
+    )
+
+    reranked = reranker.rerank(query, results + [unknown])
+
+    assert reranked[0].id == make_chunks("other")[0]["id"] and reranked[0].score == 3
+    assert {r.id for r in reranked[:3]} == {r.id for r in results}
+    assert reranked[3] == unknown
+
+
+def test_cached_scores_follow_reingested_text(tiny_subject):
+    query = "encryption at rest"
+    results = BM25Retriever(tiny_subject).retrieve(query, RetrievalConfig(top_k=1))
+    model = OverlapModel()
+    reranker = CrossEncoderReranker(open_chunk_store(tiny_subject), model=model)
+    assert reranker.rerank(query, results)[0].score == 2
+
+    # Same chunk ids, different text
+    texts = list(TEXTS)
+    texts[2] = "Least privilege only."
+    write_chunk_store(Path("data/processed", tiny_subject, "chunk_store"), tiny_subject, make_chunks(tiny_subject, texts))
+    reranker.stores = [open_chunk_store(tiny_subject)]
+
+    assert reranker.rerank(query, results)[0].score == 0
+    assert len(model.calls) == 2 and reranker.cache_hits == 0
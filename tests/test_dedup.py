@@ -0,0 +1,130 @@
+from pathlib import Path
+
+import pytest
+
+from embeddings.embedding_pipeline import run_embeddings
+from ingestion.dedup import ChunkDeduplicator, read_aliases
+from ingestion.storage.local_store import write_chunk_store
+from retrieval.interfaces import MetadataFilter, RetrievalConfig
+from retrieval.dense import DenseRetriever
+from retrieval.sparse import BM25Retriever
+from tests.helpers import TEXTS, FakeEmbedder, make_chunks
+
+BOILERPLATE = (
+    "This document is provided for informational purposes only. It represents current "
+    "product offerings and practices, which are subject to change without notice. Customers "
+    "are responsible for making their own independent assessment of the information in this "
+    "document and any use of products or services, each of which is provided as is without "
+    "warranty of any kind, whether express or implied."
+)
+
+
+def chunk(chunk_id, text, source="well_architected", page=1):
+    return {"id": chunk_id, "text": text, "metadata": {"source_id": source, "page": page, "chunk_index": 0}}
+
+
+def test_exact_and_near_duplicates_alias_the_first_chunk():
+    dedup = ChunkDeduplicator(threshold=0.8, scope="subject")
+    chunks = [
+        chunk("legal_p1", BOILERPLATE),
+        chunk("unique", TEXTS[0]),
+        chunk("legal_p2", "  " + BOILERPLATE.upper(), page=2),
+        chunk("legal_p3", BOILERPLATE.replace("without notice", "without prior notice"), page=3),
+        chunk("other", TEXTS[1], source="security_best_practices"),
+        chunk("legal_other_source", BOILERPLATE, source="security_best_practices"),
+    ]
+
+    kept = [c["id"] for c in dedup.filter(chunks)]
+
+    assert kept == ["legal_p1", "unique", "other"]
+    aliases = {a["id"]: a for a in dedup.aliases["legal_p1"]}
+    assert set(aliases) == {"legal_p2", "legal_p3", "legal_other_source"}
+    assert aliases["legal_p2"]["kind"] == "exact" and aliases["legal_p3"]["kind"] == "near"
+    assert 0.8 <= aliases["legal_p3"]["similarity"] < 1.0
+    assert aliases["legal_p2"]["metadata"]["page"] == 2
+
+    report = dedup.report()
+    assert report["chunks_seen"] == 6 and report["canonical_chunks"] == 3
+    assert report["exact_duplicates"] == 2 and report["near_duplicates"] == 1
+    assert report["embeddings_saved"] == report["index_entries_saved"] == 3
+
+
+def test_source_scope_and_distinct_chunks_are_kept():
+    chunks = make_chunks() + [chunk("legal_a", BOILERPLATE), chunk("legal_b", BOILERPLATE, "security_best_practices")]
+
+    kept = [c["id"] for c in ChunkDeduplicator().filter(chunks)]
+
+    assert kept == [c["id"] for c in chunks]
+
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(num_perm=100, bands=32)
+
+
+def test_deduplicated_store_keeps_top_hit_and_stops_crowding(tiny_subject, tmp_path):
+    config = RetrievalConfig(top_k=3)
+    chunks = make_chunks()
+    copies = [dict(c, id=c["id"] + "_copy") for c in chunks]
+    dedup = ChunkDeduplicator()
+    write_chunk_store(tmp_path / "data" / "processed" / "dup" / "chunk_store", "dup", chunks + copies)
+    write_chunk_store(tmp_path / "data" / "processed" / "deduped" / "chunk_store", "deduped", dedup.filter(chunks + copies))
+    dedup.save(tmp_path / "aliases.json")
+
+    query = "security encryption at rest"
+    with_dups = BM25Retriever("dup").retrieve(query, config)
+    deduped = BM25Retriever("deduped").retrieve(query, config)
+
+    # Without dedup a chunk and its copy fill two of the three slots; with it
+    # the top hit is the same chunk and the rest of the top-k is new content
+    top = deduped[0].id
+    assert {r.id for r in with_dups[:2]} == {top, top + "_copy"}
+    assert len({r.id for r in deduped}) == 3 and not any(r.id.endswith("_copy") for r in deduped)
+    assert [a["id"] for a in read_aliases(tmp_path / "aliases.json")[deduped[0].id]] == [deduped[0].id + "_copy"]
+
+
+@pytest.mark.parametrize("scope", ["source", "subject"])
+def test_filters_match_deduplicated_chunks_through_aliases(tiny_subject, scope):
+    chunks = make_chunks() + [
+        chunk("legal_wa_p1", BOILERPLATE, page=1),
+        chunk("legal_wa_p5", BOILERPLATE, page=5),
+        chunk("legal_sec_p7", BOILERPLATE, source="security_best_practices", page=7),
+    ]
+    subject_dir = Path("data/processed/deduped")
+    dedup = ChunkDeduplicator(scope=scope)
+    write_chunk_store(subject_dir / "chunk_store", "deduped", dedup.filter(chunks))
+    dedup.save(subject_dir / "dedup_aliases.json")
+
+    config = RetrievalConfig(top_k=3)
+    retriever = BM25Retriever("deduped")
+    query = "informational purposes independent assessment"
+
+    # Only aliases live on pages 5 and 7, yet filters on them still find the text
+    for f in [MetadataFilter(page_min=5, page_max=5), MetadataFilter("security_best_practices", page_min=7)]:
+        found = retriever.retrieve(query, RetrievalConfig(top_k=3, filter=f))
+        assert found and found[0].id in {"legal_wa_p1", "legal_sec_p7"}
+    assert retriever.retrieve(query, RetrievalConfig(top_k=3, filter=MetadataFilter(page_min=6, page_max=6))) == []
+    assert retriever.retrieve(query, config)[0].id == "legal_wa_p1"
+
+
+def test_alias_matches_report_the_alias_metadata(tiny_subject):
+    chunks = make_chunks() + [
+        chunk("legal_wa_p1", BOILERPLATE, page=1),
+        chunk("legal_wa_p5", BOILERPLATE, page=5),
+    ]
+    subject_dir = Path("data/processed/deduped")
+    dedup = ChunkDeduplicator()
+    write_chunk_store(subject_dir / "chunk_store", "deduped", dedup.filter(chunks))
+    dedup.save(subject_dir / "dedup_aliases.json")
+    run_embeddings("deduped", embedder=FakeEmbedder())
+
+    query = "informational purposes independent assessment"
+    f = MetadataFilter("well_architected", page_min=5, page_max=5)
+    for retriever in [BM25Retriever("deduped"), DenseRetriever("deduped", embedder=FakeEmbedder())]:
+        found = retriever.retrieve(query, RetrievalConfig(top_k=3, filter=f))
+        batch = retriever.search_batch([query], RetrievalConfig(top_k=3, filter=f))
+
+        assert [r.id for r in found] == ["legal_wa_p1"]
+        assert (found[0].source_id, found[0].page) == ("well_architected", 5)
+        assert batch.to_results() == [found] and batch.column("page").tolist() == [[5]]
+        # Unfiltered, the canonical chunk keeps its own page
+        unfiltered = {r.id: r for r in retriever.retrieve(query, RetrievalConfig(top_k=7))}
+        assert unfiltered["legal_wa_p1"].page == 1
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import numpy as np
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from embeddings import embedding_pipeline  # noqa: E402
+from embeddings.embedding_pipeline import run_embeddings  # noqa: E402
+from embeddings.index_factory import IndexConfig  # noqa: E402
+from embeddings.normalize import l2_normalize  # noqa: E402
+from ingestion.storage.local_store import write_chunk_store  # noqa: E402
+from retrieval.dense import DenseRetriever  # noqa: E402
+from retrieval.interfaces import RetrievalConfig  # noqa: E402
+from tests.helpers import TEXTS, FakeEmbedder, embed_text, make_chunks  # noqa: E402
+
+
+def _write_chunks(subject, texts):
+    write_chunk_store(Path("data/processed", subject, "chunk_store"), subject, make_chunks(subject, texts))
+
+
+class FailingEmbedder(FakeEmbedder):
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def embed_documents(self, texts):
+        if self.calls >= self.fail_after:
+            raise RuntimeError("network down")
+        return super().embed_documents(texts)
+
+
+def test_rerun_only_embeds_changed_chunks(tiny_subject):
+    run_embeddings(tiny_subject, embedder=FakeEmbedder())
+
+    texts = list(TEXTS)
+    texts[1] = "The reliability pillar was rewritten."
+    texts.append("A brand new chunk about sustainability.")
+    _write_chunks(tiny_subject, texts)
+
+    embedder = FakeEmbedder()
+    run_embeddings(tiny_subject, embedder=embedder)
+
+    assert sorted(embedder.texts) == sorted([texts[1], texts[-1]])
+
+    retriever = DenseRetriever(tiny_subject, embedder=FakeEmbedder())
+    results = retriever.retrieve(texts[-1], RetrievalConfig(top_k=1))
+    assert results[0].id == make_chunks(tiny_subject, texts)[-1]["id"]
+
+
+def test_interrupted_run_resumes_from_checkpoint(tiny_subject):
+    with pytest.raises(RuntimeError):
+        run_embeddings(tiny_subject, embedder=FailingEmbedder(fail_after=2), batch_size=2)
+
+    embedder = FakeEmbedder()
+    run_embeddings(tiny_subject, embedder=embedder, batch_size=2)
+
+    assert sorted(embedder.texts) == sorted(TEXTS[4:])
+    assert not Path("data/processed", tiny_subject, "embedding_checkpoint").exists()
+
+
+def test_int8_storage_is_reused_across_runs(tiny_subject):
+    config = IndexConfig(storage="int8")
+    run_embeddings(tiny_subject, index_config=config, embedder=FakeEmbedder())
+
+    stored = np.load(Path("data/processed", tiny_subject, "embeddings.npy"), mmap_mode="r")
+    assert stored.dtype == np.int8
+
+    embedder = FakeEmbedder()
+    run_embeddings(tiny_subject, index_config=config, embedder=embedder)
+    assert embedder.texts == []
+
+    results = DenseRetriever(tiny_subject, embedder=FakeEmbedder()).retrieve(TEXTS[2], RetrievalConfig(top_k=1))
+    assert results[0].id == make_chunks()[2]["id"]
+
+
+def test_rebuild_after_int8_run_reuses_full_precision_vectors(tiny_subject):
+    run_embeddings(tiny_subject, index_config=IndexConfig(storage="int8"), embedder=FakeEmbedder())
+
+    embedder = FakeEmbedder()
+    run_embeddings(tiny_subject, index_config=IndexConfig(type="flat"), embedder=embedder)
+
+    assert embedder.texts == []
+    stored = np.load(Path("data/processed", tiny_subject, "embeddings.npy"))
+    fresh = l2_normalize(np.vstack([embed_text(t) for t in TEXTS]))
+    np.testing.assert_allclose(stored, fresh, rtol=0, atol=1e-6)
+    assert not Path("data/processed", tiny_subject, "embeddings_float32.npy").exists()
+
+
+def test_failed_write_leaves_the_previous_run_intact(tiny_subject, monkeypatch):
+    run_embeddings(tiny_subject, embedder=FakeEmbedder())
+    out_dir = Path("data/processed", tiny_subject)
+    names = ["embeddings.npy", "vector_ids.npy", "vector_metadata.json", "embedding_manifest.json", "faiss.index"]
+    before = {name: (out_dir / name).read_bytes() for name in names}
+
+    _write_chunks(tiny_subject, TEXTS + ["A brand new chunk about sustainability."])
+
+    def disk_full(path, obj):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(embedding_pipeline, "stage_json", disk_full)
+    with pytest.raises(OSError):
+        run_embeddings(tiny_subject, embedder=FakeEmbedder())
+
+    assert {name: (out_dir / name).read_bytes() for name in names} == before
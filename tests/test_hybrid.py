@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+
+from config.strategy import strategy_config
+from core.models import RetrievalResult
+from core.telemetry import TelemetryRecorder
+from retrieval.fusion import rrf_fusion, weighted_fusion
+from retrieval.hybrid import HybridRetriever
+from retrieval.interfaces import Retriever, RetrievalConfig
+from retrieval.pipeline import RetrievalPipeline
+from tests.helpers import FakeEmbedder
+
+
+class StaticRetriever(Retriever):
+    def __init__(self, ids, barrier=None):
+        self.ids = ids
+        self.barrier = barrier
+        self.top_ks = []
+
+    def retrieve(self, query, config):
+        self.top_ks.append(config.top_k)
+        if self.barrier is not None:
+            # Only passes once both legs are inside retrieve() at the same time
+            self.barrier.wait()
+        return [
+            RetrievalResult(score=1.0 - i / 10, id=i_d, source_id="doc", page=1, chunk_index=i)
+            for i, i_d in enumerate(self.ids[:config.top_k])
+        ]
+
+
+def test_weighted_fusion_sums_overlapping_ids():
+    positions, scores = weighted_fusion(
+        [np.array(["a", "b"], dtype=object), np.array(["b", "c"], dtype=object)],
+        [np.array([1.0, 0.5]), np.array([1.0, 0.2])],
+        [0.5, 0.5],
+        top_k=3,
+    )
+
+    assert positions.tolist() == [1, 0, 3]
+    assert np.allclose(scores, [0.75, 0.5, 0.1])
+
+
+def test_rrf_rewards_agreement_between_legs():
+    positions, scores = rrf_fusion(
+        [np.array(["a", "b", "c"], dtype=object), np.array(["c", "d"], dtype=object)],
+        top_k=2,
+        k=60,
+    )
+
+    assert positions.tolist() == [2, 0]
+    assert np.isclose(scores[0], 1 / 63 + 1 / 61)
+
+
+def test_legs_run_concurrently_with_candidate_depth():
+    barrier = threading.Barrier(2, timeout=10)
+    dense = StaticRetriever(list("abcdefgh"), barrier)
+    sparse = StaticRetriever(list("hgfedcba"), barrier)
+    telemetry = TelemetryRecorder()
+    retriever = HybridRetriever(dense, sparse, fusion="rrf", candidate_k=6, telemetry=telemetry)
+
+    # Sequential legs would leave the first one waiting alone and break the barrier
+    results = retriever.retrieve("q", RetrievalConfig(top_k=2))
+
+    assert not barrier.broken
+    assert dense.top_ks == sparse.top_ks == [6]
+    assert len(results) == 2
+    timings = telemetry.get_timings()
+    assert {"hybrid.dense", "hybrid.sparse", "hybrid.fusion"} <= set(timings)
+    assert HybridRetriever(dense, sparse).telemetry.enabled is False
+
+
+def test_pipeline_passes_its_recorder_to_the_hybrid_retriever(tiny_dense_subject):
+    pipeline = RetrievalPipeline(strategy_config("hybrid_rrf", tiny_dense_subject), embedder=FakeEmbedder())
+    try:
+        pipeline.run("encryption at rest", top_k=2)
+    finally:
+        pipeline.close()
+
+    assert pipeline.retriever.telemetry is pipeline.telemetry
+    assert {"hybrid.dense", "hybrid.sparse", "hybrid.fusion"} <= set(pipeline.telemetry.get_timings())
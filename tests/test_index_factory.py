@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from embeddings.index_factory import (  # noqa: E402
+    IndexConfig,
+    build_faiss_index,
+    decode_vectors,
+    encode_vectors,
+    id_selector,
+    read_index_mmap,
+    recall_report,
+    search_parameters,
+    write_index_atomic,
+)
+from embeddings.normalize import l2_normalize  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(0)
+    return l2_normalize(rng.standard_normal((2000, 16)).astype("float32"))
+
+
+@pytest.mark.parametrize("config", [
+    IndexConfig(type="flat"),
+    IndexConfig(type="ivf_flat", nlist=16),
+    IndexConfig(type="ivf_pq", nlist=8, pq_m=4),
+    IndexConfig(type="hnsw", hnsw_m=8),
+    IndexConfig(type="sq", sq_type="fp16"),
+    IndexConfig(type="flat", storage="float16"),
+    IndexConfig(type="hnsw", hnsw_m=8, storage="int8"),
+    IndexConfig(type="ivf_flat", nlist=16, storage="int8"),
+])
+def test_index_types_build_and_report_recall(vectors, config):
+    index = build_faiss_index(vectors, config)
+
+    report = recall_report(index, vectors, config, k=10, num_queries=50)
+
+    assert index.ntotal == len(vectors)
+    assert report["operating_points"]
+    best = max(p["recall@10"] for p in report["operating_points"])
+    assert 0.0 < best <= 1.0
+    if config.type in ("flat", "ivf_flat", "sq"):
+        assert best > 0.95
+
+
+def test_search_parameters_match_index_type(vectors):
+    ivf = build_faiss_index(vectors, IndexConfig(type="ivf_flat", nlist=16))
+    hnsw = build_faiss_index(vectors, IndexConfig(type="hnsw", hnsw_m=8))
+    flat = build_faiss_index(vectors)
+
+    assert search_parameters(ivf, nprobe=4).nprobe == 4
+    assert search_parameters(hnsw, ef_search=64).efSearch == 64
+    assert search_parameters(flat, nprobe=4, ef_search=64) is None
+    assert search_parameters(ivf, ef_search=64) is None
+
+
+def test_selector_keeps_index_search_settings(vectors):
+    ivf = build_faiss_index(vectors, IndexConfig(type="ivf_flat", nlist=16))
+    ivf.nprobe = 8
+    all_ids = np.arange(len(vectors))
+
+    for ids in (np.arange(0, 2000, 10), np.arange(100, 2000)):  # small set, then negated
+        params = search_parameters(ivf, selector=id_selector(ids, all_ids))
+        assert params.nprobe == 8
+        _, found = ivf.search(vectors[:5], 10, params=params)
+        assert np.isin(found[found >= 0], ids).all()
+
+
+def test_invalid_index_type():
+    with pytest.raises(ValueError):
+        IndexConfig(type="annoy")
+    with pytest.raises(ValueError, match="pq_nbits"):
+        build_faiss_index(np.eye(16, dtype="float32"), IndexConfig(type="ivf_pq", nlist=1, pq_m=4))
+    for index_type in ("ivf_pq", "sq"):
+        with pytest.raises(ValueError):
+            IndexConfig(type=index_type, storage="float16")
+
+
+@pytest.mark.parametrize("storage,dtype,tol", [
+    ("float32", np.float32, 0.0),
+    ("float16", np.float16, 1e-3),
+    ("int8", np.int8, 1 / 254 + 1e-6),
+])
+def test_vector_storage_round_trip(vectors, storage, dtype, tol):
+    stored = encode_vectors(vectors, storage)
+
+    assert stored.dtype == dtype
+    assert np.abs(decode_vectors(stored) - vectors).max() <= tol
+
+
+def test_reduced_precision_index_loads_with_mmap(vectors, tmp_path):
+    index = build_faiss_index(vectors, IndexConfig(type="flat", storage="int8"))
+    faiss.write_index(index, str(tmp_path / "faiss.index"))
+
+    mapped = read_index_mmap(tmp_path / "faiss.index")
+
+    _, expected = index.search(vectors[:5], 3)
+    _, found = mapped.search(vectors[:5], 3)
+    assert (found == expected).all()
+    assert (tmp_path / "faiss.index").stat().st_size < vectors.nbytes / 3
+
+
+def test_rewriting_index_keeps_mapped_readers_valid(vectors, tmp_path):
+    path = tmp_path / "faiss.index"
+    write_index_atomic(build_faiss_index(vectors, IndexConfig(type="flat")), path)
+    mapped = read_index_mmap(path)
+    _, expected = mapped.search(vectors[:5], 3)
+
+    # A smaller index replaces the file; truncating it in place would SIGBUS the reader
+    write_index_atomic(build_faiss_index(vectors[:10], IndexConfig(type="flat")), path)
+
+    _, found = mapped.search(vectors[:5], 3)
+    assert (found == expected).all()
+    assert read_index_mmap(path).ntotal == 10
+    assert not path.with_name("faiss.index.tmp").exists()
@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from ingestion.dedup import ChunkDeduplicator, read_aliases  # noqa: E402
+from ingestion.ingestion_pipeline import run_ingestion  # noqa: E402
+from ingestion.storage.local_store import ChunkStore  # noqa: E402
+from tests.helpers import write_text_pdf  # noqa: E402
+
+
+@pytest.fixture
+def pdf_corpus(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw = tmp_path / "data" / "raw"
+    raw.mkdir(parents=True)
+
+    sources = []
+    for s in range(2):
+        path = raw / f"doc{s}.pdf"
+        write_text_pdf(path, [f"Document {s} page {p} about cloud security." * 20 for p in range(1, 8)])
+        sources.append({"id": f"doc{s}", "title": f"Doc {s}", "path": str(path)})
+
+    with open(tmp_path / "data" / "corpus_registry.json", "w", encoding="utf-8") as f:
+        json.dump({"pdf_subject": {"description": "test", "sources": sources}}, f)
+    return "pdf_subject"
+
+
+def _chunks(subject):
+    store = ChunkStore(Path("data/processed", subject, "chunk_store"))
+    store.verify()
+    return list(store.iter_chunks())
+
+
+def test_parallel_ingestion_matches_serial(pdf_corpus):
+    serial_timings = run_ingestion(pdf_corpus, workers=1)
+    serial = _chunks(pdf_corpus)
+
+    parallel_timings = run_ingestion(pdf_corpus, workers=2, pages_per_task=3)
+    parallel = _chunks(pdf_corpus)
+
+    assert serial
+    assert parallel == serial
+    assert set(serial_timings) == set(parallel_timings) == {"doc0", "doc1"}
+    assert parallel_timings["doc0"]["chunks"] == serial_timings["doc0"]["chunks"]
+    assert not Path("data/processed", pdf_corpus, "chunks.json").exists()
+
+
+def test_dedup_drops_repeated_chunks_and_records_aliases(pdf_corpus):
+    run_ingestion(pdf_corpus, workers=1)
+    full = _chunks(pdf_corpus)
+
+    dedup = ChunkDeduplicator()
+    run_ingestion(pdf_corpus, workers=2, pages_per_task=3, dedup=dedup)
+    kept = _chunks(pdf_corpus)
+    aliases = read_aliases(Path("data/processed", pdf_corpus, "dedup_aliases.json"))
+
+    # Pages repeat one sentence, so most chunks on a page are the same text
+    assert 0 < len(kept) < len(full)
+    assert dedup.report()["embeddings_saved"] == len(full) - len(kept)
+    assert {c["id"] for c in kept} | {a["id"] for group in aliases.values() for a in group} == {c["id"] for c in full}
+    assert set(aliases) <= {c["id"] for c in kept}
+
+    run_ingestion(pdf_corpus, workers=1)
+    assert not Path("data/processed", pdf_corpus, "dedup_aliases.json").exists()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from embeddings.embedding_pipeline import run_embeddings
+from embeddings.local_embedder import LocalEmbedder
+from retrieval.dense import DenseRetriever
+from retrieval.interfaces import RetrievalConfig
+from tests.helpers import TEXTS, embed_text, make_chunks
+
+
+class FakeSentenceTransformer:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        self.batches.append(list(texts))
+        return np.vstack([embed_text(t) for t in texts])
+
+
+def test_batches_are_length_sorted_and_within_token_budget():
+    embedder = LocalEmbedder(max_batch_tokens=40, chars_per_token=1.0, encoder=FakeSentenceTransformer())
+    texts = ["x" * n for n in (30, 5, 12, 6, 20, 7)]
+
+    batches = embedder.batches(texts)
+
+    flat = [len(texts[i]) for rows in batches for i in rows]
+    assert flat == sorted(flat)
+    for rows in batches:
+        assert len(rows) * max(len(texts[i]) for i in rows) <= 40 or len(rows) == 1
+    assert sorted(i for rows in batches for i in rows) == list(range(len(texts)))
+
+
+def test_vectors_keep_input_order_and_feed_run_embeddings(tiny_subject):
+    encoder = FakeSentenceTransformer()
+    embedder = LocalEmbedder(max_batch_tokens=32, encoder=encoder)
+
+    vectors = embedder.embed_documents(TEXTS)
+
+    assert len(encoder.batches) > 1
+    assert np.allclose(vectors, np.vstack([embed_text(t) for t in TEXTS]))
+
+    run_embeddings(tiny_subject, embedder=embedder)
+    retriever = DenseRetriever(tiny_subject, embedder=embedder)
+    results = retriever.retrieve(TEXTS[3], RetrievalConfig(top_k=1))
+    assert results[0].id == make_chunks()[3]["id"]
+
+
+def test_quantize_requires_onnx():
+    with pytest.raises(ValueError):
+        LocalEmbedder(quantize=True)
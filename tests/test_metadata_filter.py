@@ -0,0 +1,94 @@
+import pytest
+
+from config.strategy import StrategyConfig
+from embeddings.embedding_pipeline import run_embeddings
+from embeddings.index_factory import IndexConfig
+from ingestion.storage.local_store import open_chunk_store
+from retrieval.dense import DenseRetriever
+from retrieval.interfaces import MetadataFilter, RetrievalConfig
+from retrieval.metadata_filter import MetadataIndex
+from retrieval.pipeline import RetrievalPipeline
+from retrieval.sparse import BM25Retriever
+from tests.helpers import TEXTS, FakeEmbedder
+
+# make_chunks alternates sources and puts rows 2i and 2i + 1 on page i + 1
+SECURITY = "security_best_practices"
+FILTERS = [
+    MetadataFilter(SECURITY),
+    MetadataFilter(page_min=2, page_max=3),
+    MetadataFilter(["well_architected", SECURITY], page_max=1),
+    MetadataFilter(page_min=1),  # every row
+]
+
+
+def matches(chunk_meta, f):
+    return (
+        (f.source_ids is None or chunk_meta["source_id"] in f.source_ids)
+        and (f.page_min is None or chunk_meta["page"] >= f.page_min)
+        and (f.page_max is None or chunk_meta["page"] <= f.page_max)
+    )
+
+
+def post_filtered(retriever, query, f, top_k):
+    # Reference: full ranking, filtered afterwards
+    store = retriever.chunks
+    everything = retriever.retrieve(query, RetrievalConfig(top_k=len(store)))
+    return [r for r in everything if matches(store.metadata(store.row_of(r.id)), f)][:top_k]
+
+
+def test_metadata_index_resolves_rows(tiny_subject):
+    BM25Retriever(tiny_subject).close()  # migrates the legacy chunks.json
+    index = MetadataIndex(open_chunk_store(tiny_subject))
+
+    assert index.rows(MetadataFilter(SECURITY)).tolist() == [1, 3, 5]
+    assert index.rows(MetadataFilter(page_min=2, page_max=2)).tolist() == [2, 3]
+    assert index.rows(MetadataFilter(SECURITY, page_min=3)).tolist() == [5]
+    assert index.rows(MetadataFilter("unknown_source")).tolist() == []
+    assert index.rows(MetadataFilter(page_max=1)).tolist() == [0, 1]
+
+    with pytest.raises(ValueError):
+        MetadataFilter(page_min=3, page_max=1)
+
+
+@pytest.mark.parametrize("f", FILTERS)
+def test_bm25_filter_matches_post_filtering(tiny_subject, f):
+    retriever = BM25Retriever(tiny_subject, normalize=False)
+    config = RetrievalConfig(top_k=2, filter=f)
+
+    for query in ["security encryption at rest", "reliability recovery", "cost"]:
+        found = retriever.retrieve(query, config)
+        assert [r.id for r in found] == [r.id for r in post_filtered(retriever, query, f, 2)]
+    assert retriever.retrieve_batch(TEXTS[:3], config) == [retriever.retrieve(q, config) for q in TEXTS[:3]]
+
+    # Scoring only touches the admitted documents' columns
+    filtered = retriever._filtered_index(config)
+    if filtered is not None:
+        rows, index, _ = filtered
+        assert index.num_docs == len(rows) < len(retriever.chunks)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+def test_dense_filter_is_pushed_into_faiss(tiny_subject, index_type):
+    run_embeddings(tiny_subject, embedder=FakeEmbedder(), index_config=IndexConfig(type=index_type, nlist=1))
+    retriever = DenseRetriever(tiny_subject, embedder=FakeEmbedder())
+
+    for f in FILTERS:
+        config = RetrievalConfig(top_k=2, filter=f)
+        for query in TEXTS[:3]:
+            found = retriever.retrieve(query, config)
+            assert [r.id for r in found] == [r.id for r in post_filtered(retriever, query, f, 2)]
+
+    nothing = RetrievalConfig(top_k=2, filter=MetadataFilter("unknown_source"))
+    assert retriever.retrieve_batch(TEXTS[:2], nothing) == [[], []]
+
+
+def test_pipeline_applies_filter_to_both_hybrid_legs(tiny_dense_subject):
+    config = StrategyConfig(type="hybrid", dense_subject=tiny_dense_subject, sparse_subject=tiny_dense_subject)
+    pipeline = RetrievalPipeline(config, embedder=FakeEmbedder())
+    try:
+        results = pipeline.run("security encryption", top_k=3, filter=MetadataFilter(SECURITY))
+    finally:
+        pipeline.close()
+
+    assert len(results) == 3
+    assert {r.source_id for r in results} == {SECURITY}
@@ -0,0 +1,141 @@
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from embeddings.openai_embedder import OpenAIEmbedder  # noqa: E402
+from embeddings.rate_limit import TokenBucket  # noqa: E402
+from tests.helpers import WordEncoding, embed_text  # noqa: E402
+
+
+class FakeEmbeddingsServer(ThreadingHTTPServer):
+    """
+    Local stand-in for POST /v1/embeddings. The first request for every
+    batch is answered with 429 (and a 500 for one batch) before succeeding.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0.01")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = request["input"]
+        server = self.server
+        with server.lock:
+            attempt = server.seen.get(texts[0], 0)
+            server.seen[texts[0]] = attempt + 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if attempt == 0:
+                return self._reply(429, {"error": {"message": "slow down", "type": "rate_limit"}})
+            if attempt == 1 and texts[0] == "text 0":
+                return self._reply(500, {"error": {"message": "boom", "type": "server_error"}})
+
+            time.sleep(0.02)  # long enough for concurrent batches to overlap
+            data = []
+            for i, text in enumerate(texts):
+                vector = embed_text(text)
+                if request.get("encoding_format") == "base64":
+                    vector = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+                else:
+                    vector = vector.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": vector})
+            self._reply(200, {
+                "object": "list",
+                "data": data,
+                "model": request["model"],
+                "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeEmbeddingsServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_batches_retry_and_keep_order(fake_server):
+    client = openai.OpenAI(base_url=fake_server.base_url, api_key="test", max_retries=0)
+    embedder = OpenAIEmbedder(
+        client=client, batch_size=3, max_in_flight=4, backoff_base=0.01, backoff_max=0.05
+    )
+    texts = [f"text {i}" for i in range(20)]
+
+    vectors = embedder.embed_documents(texts)
+
+    np.testing.assert_allclose(vectors, np.vstack([embed_text(t) for t in texts]))
+    assert fake_server.seen["text 0"] == 3
+    assert fake_server.max_in_flight > 1
+
+
+def test_gives_up_after_max_retries(fake_server):
+    client = openai.OpenAI(base_url=fake_server.base_url, api_key="test", max_retries=0)
+    embedder = OpenAIEmbedder(client=client, max_retries=0)
+
+    with pytest.raises(RuntimeError, match="attempts=1"):
+        embedder.embed_documents(["text 0"])
+
+
+def test_batches_respect_the_token_budget(fake_server):
+    client = openai.OpenAI(base_url=fake_server.base_url, api_key="test", max_retries=0)
+    embedder = OpenAIEmbedder(client=client, batch_size=4, max_batch_tokens=6, backoff_base=0.01)
+    embedder._encoding = WordEncoding()
+    texts = ["a b", "c d e", "f", "g h i j k l m n", "o", "p", "q", "r", "s"]
+
+    batches = embedder._batches(texts)
+
+    assert [(start, tokens) for start, _, tokens in batches] == [(0, 6), (3, 8), (4, 4), (8, 1)]
+    assert [t for _, batch, _ in batches for t in batch] == texts
+    np.testing.assert_allclose(embedder.embed_documents(texts), np.vstack([embed_text(t) for t in texts]))
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    assert sum(sleeps) == pytest.approx(2.0)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from core.models import ResultBatch, RetrievalResult
+from ingestion.storage.local_store import open_chunk_store
+from reranking.cross_encoder import CrossEncoderReranker
+from retrieval.dense import DenseRetriever
+from retrieval.fusion import fuse_batches, fuse_results
+from retrieval.interfaces import RetrievalConfig
+from retrieval.sparse import BM25Retriever
+from tests.helpers import TEXTS, FakeEmbedder
+from tests.test_cross_encoder import OverlapModel
+
+
+def result(chunk_id, score, page=1):
+    return RetrievalResult(score=score, id=chunk_id, source_id="s", page=page, chunk_index=0)
+
+
+def test_select_packs_hits_and_results_round_trip():
+    results = [[result("a", 0.9), result("b", 0.5, page=2)], [], [result("c", 0.7, page=3)]]
+    batch = ResultBatch.from_results(results)
+
+    assert batch.rows.shape == (3, 2) and batch.counts().tolist() == [2, 0, 1]
+    assert batch.to_results() == results
+    assert batch.column("page").tolist() == [[1, 2], [-1, -1], [3, -1]]
+
+    kept = batch.select(batch.column("page") >= 2)
+    assert kept.rows.shape == (3, 1)
+    assert [[r.id for r in rs] for rs in kept.to_results()] == [["b"], [], ["c"]]
+    assert batch.truncate(1).ids(0) == ["a"]
+
+    with pytest.raises(ValueError):
+        ResultBatch(np.zeros((2, 2)), np.zeros((2, 3)), None)
+
+
+def test_retrievers_return_store_rows(tiny_dense_subject):
+    config = RetrievalConfig(top_k=3)
+    for retriever in [BM25Retriever(tiny_dense_subject), DenseRetriever(tiny_dense_subject, embedder=FakeEmbedder())]:
+        batch = retriever.search_batch(TEXTS[:3], config)
+
+        assert batch.store is retriever.chunks
+        assert batch.to_results() == retriever.retrieve_batch(TEXTS[:3], config)
+        assert batch.ids(0) == [retriever.chunks.chunk_id(int(row)) for row in batch.hits(0)[0]]
+
+
+@pytest.mark.parametrize("method", ["weighted", "rrf"])
+def test_row_fusion_matches_id_fusion(tiny_dense_subject, method):
+    dense = DenseRetriever(tiny_dense_subject, embedder=FakeEmbedder())
+    sparse = BM25Retriever(tiny_dense_subject)
+    config = RetrievalConfig(top_k=4)
+    weights = [0.6, 0.4] if method == "weighted" else None
+
+    legs = [dense.search_batch(TEXTS, config), sparse.search_batch(TEXTS, config)]
+    # Deep enough to keep every candidate, so ties at the cut cannot differ
+    fused = fuse_batches(legs, 8, method, weights)
+    # Materialized legs no longer share a store, so this takes the id path
+    by_id = fuse_batches([ResultBatch.from_results(b.to_results()) for b in legs], 8, method, weights)
+
+    for q, (rows_fused, ids_fused) in enumerate(zip(fused.to_results(), by_id.to_results())):
+        assert {r.id: r.score for r in rows_fused} == pytest.approx({r.id: r.score for r in ids_fused})
+        assert ids_fused == fuse_results([leg.to_results()[q] for leg in legs], 8, method, weights)
+        assert [r.score for r in rows_fused] == sorted((r.score for r in rows_fused), reverse=True)
+
+
+def test_rerank_batch_scores_all_queries_in_one_call(tiny_subject):
+    retriever = BM25Retriever(tiny_subject)
+    queries = ["security encryption at rest", "reliability recovery"]
+    batch = retriever.search_batch(queries, RetrievalConfig(top_k=4))
+    model = OverlapModel()
+    reranker = CrossEncoderReranker(open_chunk_store(tiny_subject), max_candidates=3, model=model)
+
+    reranked = reranker.rerank_batch(queries, batch)
+
+    assert len(model.calls) == 1 and len(model.calls[0]) == 6
+    assert reranked.rows.shape == (2, 3)
+    assert reranked.to_results() == [
+        reranker.rerank(q, results) for q, results in zip(queries, batch.to_results())
+    ]
+    assert len(model.calls) == 1 and reranker.cache_hits == 6
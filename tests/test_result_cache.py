@@ -0,0 +1,200 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from config.strategy import StrategyConfig
+from core.telemetry import TelemetryRecorder
+from ingestion.storage.local_store import write_chunk_store
+from retrieval.interfaces import Retriever
+from retrieval.pipeline import RetrievalPipeline
+from retrieval.result_cache import ResultCache
+from retrieval.sharded import ShardedRetriever, shard_subject
+from tests.helpers import make_chunks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 1)  # a is now most recent
+    cache.get_or_compute("c", lambda: 3)
+
+    assert cache.get_or_compute("a", lambda: -1)[1] == "hit"
+    assert cache.get_or_compute("b", lambda: -2)[:2] == (-2, "miss")
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl_seconds=10, clock=clock)
+    cache.get_or_compute("q", lambda: "old")
+
+    clock.now = 9.9
+    assert cache.get_or_compute("q", lambda: "new")[0] == "old"
+    clock.now = 10.0
+    assert cache.get_or_compute("q", lambda: "new")[:2] == ("new", "miss")
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = ResultCache()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    outcomes = []
+    threads = [
+        threading.Thread(target=lambda: outcomes.append(cache.get_or_compute("q", slow)[1]))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    while cache.stats()["coalesced"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(outcomes) == ["coalesced"] * 7 + ["miss"]
+
+
+def test_errors_are_shared_but_not_cached():
+    cache = ResultCache()
+
+    def boom():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("q", boom)
+    assert cache.get_or_compute("q", lambda: "ok")[:2] == ("ok", "miss")
+
+
+def test_pipeline_reports_hits_and_invalidates_on_new_version(tiny_subject):
+    telemetry = TelemetryRecorder()
+    pipeline = RetrievalPipeline(
+        StrategyConfig(type="sparse", subject=tiny_subject),
+        telemetry=telemetry,
+        cache=ResultCache(),
+        version_check_interval=0.0,
+    )
+    try:
+        first = pipeline.run("kubernetes pods", top_k=2)
+        assert pipeline.run("kubernetes pods", top_k=2) == first
+        pipeline.run("kubernetes pods", top_k=3)
+
+        # Any new file under the subject bumps its version
+        Path("data/processed", tiny_subject, "extra.txt").write_text("x", encoding="utf-8")
+        pipeline.run("kubernetes pods", top_k=2)
+    finally:
+        pipeline.close()
+
+    counters = telemetry.get_counters()
+    assert counters["retrieval_cache.hit"] == 1
+    assert counters["retrieval_cache.miss"] == 3
+    assert counters["retrieval_cache.saved_seconds"] > 0
+    assert "keystone_retrieval_cache_hit_total 1" in telemetry.to_prometheus()
+
+
+def test_run_batch_only_retrieves_cache_misses(tiny_subject):
+    telemetry = TelemetryRecorder()
+    pipeline = RetrievalPipeline(
+        StrategyConfig(type="sparse", subject=tiny_subject),
+        telemetry=telemetry,
+        cache=ResultCache(),
+    )
+    try:
+        single = pipeline.run("kubernetes pods", top_k=2)
+        batch = pipeline.run_batch(["kubernetes pods", "docker images"], top_k=2)
+    finally:
+        pipeline.close()
+
+    assert batch[0] == single
+    assert telemetry.get_counters()["retrieval_cache.hit"] == 1
+    assert telemetry.get_counters()["retrieval_cache.miss"] == 2
+
+
+def test_pipeline_serves_reingested_subject_after_version_change(tiny_subject):
+    pipeline = RetrievalPipeline(
+        StrategyConfig(type="sparse", subject=tiny_subject),
+        cache=ResultCache(),
+        version_check_interval=0.0,
+    )
+    try:
+        assert pipeline.run("kubernetes pods", top_k=1)[0].id != "fresh_chunk"
+
+        chunks = make_chunks()
+        chunks[0] = dict(chunks[0], id="fresh_chunk", text="kubernetes pods and services")
+        write_chunk_store(Path("data/processed", tiny_subject, "chunk_store"), tiny_subject, chunks)
+
+        # The miss is computed from the new files, not the corpus loaded at startup
+        assert pipeline.run("kubernetes pods", top_k=1)[0].id == "fresh_chunk"
+        assert pipeline.run("kubernetes pods", top_k=1)[0].id == "fresh_chunk"
+    finally:
+        pipeline.close()
+
+
+class GatedRetriever(Retriever):
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.closed = False
+
+    def retrieve(self, query, config):
+        self.entered.set()
+        self.release.wait(5)
+        return ["closed" if self.closed else "open"]
+
+    def close(self):
+        self.closed = True
+
+
+def test_reload_closes_the_old_retriever_after_in_flight_queries(tiny_subject):
+    retrievers = [GatedRetriever(), GatedRetriever()]
+    pipeline = RetrievalPipeline(StrategyConfig(type="sparse", subject=tiny_subject), load="lazy")
+    pipeline._create_retriever = lambda: retrievers.pop(0)
+    pipeline.load()
+    old = pipeline.retriever
+    results = []
+
+    thread = threading.Thread(target=lambda: results.append(pipeline.run("q", top_k=1)))
+    thread.start()
+    assert old.entered.wait(5)
+    pipeline._reload(("new",))
+
+    assert pipeline.retriever is not old and not old.closed
+    old.release.set()
+    thread.join(5)
+    assert results == [["open"]] and old.closed
+
+
+def test_sharded_pipeline_reloads_when_shards_are_rebuilt(tiny_subject):
+    shard_subject(tiny_subject, 2)
+    pipeline = RetrievalPipeline(
+        StrategyConfig(type="sparse", subject=tiny_subject, sharded=True),
+        cache=ResultCache(),
+        version_check_interval=0.0,
+    )
+    try:
+        pipeline.run("encryption at rest", top_k=1)
+        assert isinstance(pipeline.retriever, ShardedRetriever) and len(pipeline.retriever.shards) == 2
+
+        # The base subject is untouched; only its shards change
+        shard_subject(tiny_subject, 3)
+        pipeline.run("encryption at rest", top_k=1)
+
+        assert len(pipeline.retriever.shards) == 3
+    finally:
+        pipeline.close()
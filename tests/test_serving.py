@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.serving import run_batch_size
+from config.strategy import StrategyConfig
+from retrieval.pipeline import RetrievalPipeline
+from serving.batching import MicroBatchServer
+from tests.helpers import TEXTS, FakeEmbedder
+
+
+class EchoPipeline:
+    """
+    Returns each query top_k times and records the batches it was given.
+    """
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def run_batch(self, queries, top_k, filter=None):
+        self.batches.append((list(queries), top_k))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return [[q] * top_k for q in queries]
+
+
+def test_concurrent_queries_share_batches():
+    pipeline = EchoPipeline(delay=0.01)
+
+    async def main():
+        async with MicroBatchServer(pipeline, max_batch_size=8, max_wait_ms=50) as server:
+            results = await asyncio.gather(*(server.query(f"q{i}", top_k=2) for i in range(20)))
+            return results, server.stats()
+
+    results, stats = asyncio.run(main())
+
+    assert results == [[f"q{i}"] * 2 for i in range(20)]
+    assert all(len(queries) <= 8 for queries, _ in pipeline.batches)
+    assert len(pipeline.batches) == 3
+    assert stats["batch_size"]["histogram"] == {8: 2, 4: 1}
+    assert stats["requests"] == 20 and stats["serving.request"]["count"] == 20
+
+
+def test_lone_query_is_flushed_after_max_wait():
+    pipeline = EchoPipeline()
+
+    async def main():
+        async with MicroBatchServer(pipeline, max_batch_size=64, max_wait_ms=5) as server:
+            return await asyncio.wait_for(server.query("solo", top_k=1), timeout=2)
+
+    assert asyncio.run(main()) == ["solo"]
+
+
+def test_mixed_top_k_are_split_and_errors_reach_every_caller():
+    pipeline = EchoPipeline(fail=True)
+
+    async def main():
+        async with MicroBatchServer(pipeline, max_batch_size=8, max_wait_ms=20) as server:
+            return await asyncio.gather(
+                server.query("a", top_k=1), server.query("b", top_k=3), server.query("c", top_k=1),
+                return_exceptions=True,
+            )
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # The failed (a, c) batch is retried one request at a time
+    assert sorted(pipeline.batches) == [(["a"], 1), (["a", "c"], 1), (["b"], 3), (["c"], 1)]
+
+
+def test_bad_request_fails_alone_in_its_batch():
+    class PickyPipeline(EchoPipeline):
+        def run_batch(self, queries, top_k, filter=None):
+            self.batches.append((list(queries), top_k))
+            if "poison" in queries:
+                raise ValueError("cannot embed poison")
+            return [[q] * top_k for q in queries]
+
+    pipeline = PickyPipeline()
+
+    async def main():
+        async with MicroBatchServer(pipeline, max_batch_size=8, max_wait_ms=20) as server:
+            results = await asyncio.gather(
+                server.query("good"), server.query(""), server.query("x", top_k=0),
+                server.query("poison"), server.query("fine"),
+                return_exceptions=True,
+            )
+            return results, server.stats()
+
+    (good, empty, no_k, poison, fine), stats = asyncio.run(main())
+
+    assert good == ["good"] * 5 and fine == ["fine"] * 5
+    assert isinstance(empty, ValueError) and isinstance(no_k, ValueError)
+    assert isinstance(poison, ValueError) and "poison" in str(poison)
+    assert pipeline.batches[0] == (["good", "poison", "fine"], 5)
+    assert stats["errors"] == 1
+
+
+def test_threaded_server_matches_pipeline(tiny_dense_subject):
+    pipeline = RetrievalPipeline(StrategyConfig(type="dense", subject=tiny_dense_subject), embedder=FakeEmbedder())
+    server = MicroBatchServer(pipeline, max_batch_size=4, max_wait_ms=1).start_in_thread()
+    try:
+        for text in TEXTS:
+            assert server.query_sync(text, 2, 5.0) == pipeline.run(text, top_k=2)
+    finally:
+        server.stop_thread()
+        pipeline.close()
+
+    with pytest.raises(RuntimeError):
+        server.query_sync("late")
+
+
+def test_threaded_startup_error_reaches_the_caller():
+    server = MicroBatchServer(EchoPipeline())
+
+    async def failing_start():
+        raise RuntimeError("no executor")
+
+    server.start = failing_start
+    with pytest.raises(RuntimeError, match="no executor"):
+        server.start_in_thread()
+
+    del server.start
+    server.start_in_thread()
+    try:
+        assert server.query_sync("q", 2, 5.0) == ["q", "q"]
+    finally:
+        server.stop_thread()
+
+
+def test_serving_benchmark_runs(tiny_dense_subject):
+    report = run_batch_size(
+        tiny_dense_subject, TEXTS, batch_size=4, concurrency=8,
+        num_requests=40, top_k=2, warmup=2,
+    )
+
+    assert report["requests"] == 40 and report["errors"] == 0
+    assert report["server"]["batch_size"]["max"] <= 4
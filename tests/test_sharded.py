@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from core.models import RetrievalResult
+from config.strategy import StrategyConfig
+from embeddings.embedding_pipeline import run_embeddings
+from ingestion.storage.local_store import write_chunk_store
+from retrieval.dense import DenseRetriever
+from retrieval.interfaces import Retriever, RetrievalConfig
+from retrieval.registry import RetrievalFactory
+from retrieval.sharded import ShardedRetriever, shard_subject, shard_subjects
+from retrieval.sparse import BM25Retriever
+from tests.helpers import TEXTS, FakeEmbedder, make_chunks
+
+
+class ScoredRetriever(Retriever):
+    def __init__(self, scored):
+        self.scored = scored
+
+    def retrieve(self, query, config):
+        return [
+            RetrievalResult(score=s, id=i, source_id="doc", page=1, chunk_index=0)
+            for i, s in self.scored[:config.top_k]
+        ]
+
+
+def test_merge_keeps_raw_scores_comparable():
+    retriever = ShardedRetriever(
+        [ScoredRetriever([("a1", 10.0), ("a2", 9.0)]), ScoredRetriever([("b1", 2.0), ("b2", 1.0)])],
+        normalize=True,
+    )
+
+    results = retriever.retrieve("q", RetrievalConfig(top_k=3))
+
+    assert [r.id for r in results] == ["a1", "a2", "b1"]
+    assert [r.score for r in results] == [1.0, 0.875, 0.0]
+
+
+def test_dense_shards_match_unsharded_subject(tiny_subject):
+    run_embeddings(tiny_subject, embedder=FakeEmbedder())
+    names = shard_subject(tiny_subject, 3)
+
+    assert shard_subjects(tiny_subject) == names
+    assert Path("data/processed", names[0], "faiss.index").exists()
+
+    config = RetrievalConfig(top_k=4)
+    single = DenseRetriever(tiny_subject, embedder=FakeEmbedder())
+    sharded = ShardedRetriever.for_subject(tiny_subject, kind="dense", embedder=FakeEmbedder())
+
+    for query in TEXTS[:3]:
+        expected = single.retrieve(query, config)
+        found = sharded.retrieve(query, config)
+        assert [r.id for r in found] == [r.id for r in expected]
+    assert sharded.retrieve_batch(TEXTS[:3], config) == [sharded.retrieve(q, config) for q in TEXTS[:3]]
+
+
+def test_sparse_shards_merge_and_normalize(tiny_subject):
+    shard_subject(tiny_subject, 2)
+    retriever = ShardedRetriever.for_subject(tiny_subject, kind="sparse")
+
+    results = retriever.retrieve("encryption at rest least privilege", RetrievalConfig(top_k=3))
+
+    assert results[0].id == make_chunks()[2]["id"]
+    assert results[0].score == 1.0
+    assert all(0.0 <= r.score <= 1.0 for r in results)
+
+
+def test_sparse_shards_rank_like_the_unsharded_subject(tiny_subject):
+    # "cloud" is in every doc of the first shard but one doc of the second,
+    # so per-shard IDF would rank the second shard's "cloud" doc first
+    texts = [
+        "cloud backup storage",
+        "cloud cost report for storage teams",
+        "cloud network design",
+        "cloud identity and access policy review",
+        "cloud storage tiers",
+        "database replication lag",
+        "storage class lifecycle rules for archives",
+        "incident response runbook",
+    ]
+    chunks = make_chunks("skewed", texts)
+    write_chunk_store(Path("data/processed/skewed/chunk_store"), "skewed", chunks)
+    shard_subject("skewed", 2)
+
+    config = RetrievalConfig(top_k=len(texts))
+    single = BM25Retriever("skewed")
+    sharded = RetrievalFactory.create_retriever(StrategyConfig(type="sparse", subject="skewed", sharded=True))
+
+    assert isinstance(sharded, ShardedRetriever) and len(sharded.shards) == 2
+    for query in ["cloud storage", "storage", "cloud"]:
+        expected = single.retrieve(query, config)
+        found = sharded.retrieve(query, config)
+        assert [r.id for r in found] == [r.id for r in expected]
+        assert [r.score for r in found] == pytest.approx([r.score for r in expected])
+
+
+def test_subjects_of_different_sizes_rank_like_one_joint_subject(tiny_subject):
+    # "cloud" is common in the large subject but rare in the small one, so
+    # each subject's own IDF would put the small subject's hit first
+    large = [f"cloud service {i} with storage notes" for i in range(40)] + ["storage pricing tiers"]
+    small = ["cloud outage report", "quarterly budget review", "team offsite agenda"]
+    subjects = {"large": make_chunks("large", large), "small": make_chunks("small", small)}
+    for subject, chunks in subjects.items():
+        write_chunk_store(Path("data/processed", subject, "chunk_store"), subject, chunks)
+    joint = subjects["large"] + subjects["small"]
+    write_chunk_store(Path("data/processed/joint/chunk_store"), "joint", joint)
+
+    config = RetrievalConfig(top_k=len(joint))
+    single = BM25Retriever("joint")
+    sharded = ShardedRetriever.from_subjects(["large", "small"], kind="sparse")
+
+    for query in ["cloud storage", "cloud outage", "storage"]:
+        expected = single.retrieve(query, config)
+        found = sharded.retrieve(query, config)
+        assert [r.id for r in found] == [r.id for r in expected]
+        assert [r.score for r in found] == pytest.approx([r.score for r in expected], abs=1e-6)
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import SRC_DIR, main
+from config.strategy import StrategyConfig
+from retrieval.dense import DenseRetriever
+from retrieval.interfaces import RetrievalConfig
+from retrieval.pipeline import RetrievalPipeline
+from retrieval.sparse import BM25Retriever
+from tests.helpers import TEXTS, FakeEmbedder
+
+
+def test_factory_import_does_not_load_backends():
+    code = (
+        "import sys; import retrieval.pipeline, config.strategy; "
+        "print(sorted(m for m in ('faiss', 'scipy') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], env={"PYTHONPATH": str(SRC_DIR)},
+        capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_lazy_retrievers_touch_nothing_until_first_query(tiny_dense_subject):
+    # A missing subject only fails once something is actually loaded
+    missing = BM25Retriever("no_such_subject", lazy=True)
+    with pytest.raises(FileNotFoundError):
+        missing.load()
+
+    eager = DenseRetriever(tiny_dense_subject, embedder=FakeEmbedder())
+    lazy = DenseRetriever(tiny_dense_subject, embedder=FakeEmbedder(), lazy=True)
+    assert lazy.corpus is None
+    try:
+        config = RetrievalConfig(top_k=2)
+        assert lazy.retrieve_batch(TEXTS[:2], config) == eager.retrieve_batch(TEXTS[:2], config)
+    finally:
+        eager.close()
+        lazy.close()
+
+
+def test_background_load_signals_readiness(tiny_dense_subject):
+    config = StrategyConfig(type="hybrid", dense_subject=tiny_dense_subject, sparse_subject=tiny_dense_subject)
+    pipeline = RetrievalPipeline(config, embedder=FakeEmbedder(), load="background")
+    try:
+        assert pipeline.wait_ready(timeout=10)
+        assert pipeline.run(TEXTS[0], top_k=2)
+    finally:
+        pipeline.close()
+
+    broken = RetrievalPipeline(StrategyConfig(type="sparse", subject="no_such_subject"), load="background")
+    with pytest.raises(FileNotFoundError):
+        broken.wait_ready(timeout=10)
+    with pytest.raises(FileNotFoundError):
+        broken.run("anything", top_k=1)
+
+
+def test_startup_benchmark_reports_every_load_mode(tiny_subject):
+    reports = main(["--subject", tiny_subject, "--strategy", "sparse", "--load", "eager", "lazy", "--repeat", "1"])
+
+    assert [r["load"] for r in reports] == ["eager", "lazy"]
+    assert all("faiss" not in r["heavy_modules_at_import"] for r in reports)
+    assert reports[1]["construct_s"] < reports[1]["first_query_s"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core.constants import TelemetryStage
+from core.telemetry import LatencySketch, TelemetryRecorder
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(0)
+    samples = rng.lognormal(mean=-4, sigma=1, size=20_000)
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for v in samples:
+        sketch.add(float(v))
+
+    for q in (0.5, 0.95, 0.99):
+        exact = np.quantile(samples, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+
+def test_sketches_merge_like_one_stream():
+    a, b, both = LatencySketch(), LatencySketch(), LatencySketch()
+    for i in range(1, 1001):
+        (a if i % 2 else b).add(i / 1000)
+        both.add(i / 1000)
+    a.merge(b)
+
+    assert a.count == both.count == 1000
+    assert a.quantile(0.99) == both.quantile(0.99)
+
+
+def test_nested_spans_record_full_paths():
+    recorder = TelemetryRecorder()
+    for _ in range(3):
+        with recorder.stage(TelemetryStage.RETRIEVAL):
+            with recorder.stage("dense"):
+                with recorder.stage("embed_query"):
+                    pass
+
+    summary = recorder.summary()
+    assert set(summary) == {"retrieval", "retrieval/dense", "retrieval/dense/embed_query"}
+    assert summary["retrieval/dense/embed_query"]["count"] == 3
+    assert set(recorder.get_timings()) == {"retrieval", "dense", "embed_query"}
+
+    text = recorder.to_prometheus()
+    assert 'keystone_stage_latency_seconds{stage="retrieval/dense",quantile="0.99"}' in text
+    assert 'keystone_stage_latency_seconds_count{stage="retrieval"} 3' in text
+
+
+def test_disabled_recorder_records_nothing():
+    recorder = TelemetryRecorder(enabled=False)
+    with recorder.stage("retrieval"):
+        recorder.record("dense", 0.1)
+
+    assert recorder.summary() == {}
+    assert recorder.get_timings() == {}
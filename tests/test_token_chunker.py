@@ -0,0 +1,69 @@
+import pickle
+
+import pytest
+
+from ingestion.chunkers.recursive_chunker import recursive_chunker
+from ingestion.chunkers.token_chunker import token_chunker
+from ingestion.corpus import corpus_source
+from tests.helpers import WordEncoding
+
+SOURCE = corpus_source(id="doc", title="Doc", path="doc.pdf")
+
+PAGE = "\n\n".join(
+    " ".join(f"Sentence {p}.{s} talks about cloud reliability and cost." for s in range(6))
+    for p in range(8)
+)
+
+
+def _chunk(chunker, text=PAGE):
+    return chunker.chunk(text=text, subject="tiny", source=SOURCE, page=3)
+
+
+def test_chunks_respect_token_budget_and_overlap():
+    encoding = WordEncoding()
+    chunker = token_chunker(chunk_tokens=60, overlap_tokens=20, encoding=encoding)
+    chunks = _chunk(chunker)
+
+    assert len(chunks) > 1
+    for i, c in enumerate(chunks):
+        assert len(encoding.encode(c["text"])) <= 60
+        assert c["id"] == f"tiny_doc_p3_c{i}"
+        meta = c["metadata"]
+        assert PAGE[meta["start_char"]:meta["end_char"]].strip() == c["text"]
+
+    # Consecutive chunks overlap but always make progress
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert prev["metadata"]["start_char"] < cur["metadata"]["start_char"] < prev["metadata"]["end_char"]
+    assert chunks[-1]["metadata"]["end_char"] == len(PAGE)
+
+
+def test_prefers_paragraph_and_sentence_boundaries():
+    chunker = token_chunker(chunk_tokens=60, overlap_tokens=0, encoding=WordEncoding())
+    for c in _chunk(chunker):
+        assert c["text"].endswith(".")
+
+
+def test_unbroken_text_is_cut_at_token_boundaries():
+    chunker = token_chunker(chunk_tokens=10, overlap_tokens=0, encoding=WordEncoding(), separators=())
+    text = " ".join(f"w{i}" for i in range(35))
+    chunks = _chunk(chunker, text)
+
+    assert [len(c["text"].split()) for c in chunks] == [10, 10, 10, 5]
+
+
+def test_fewer_chunks_than_character_windows():
+    token_chunks = _chunk(token_chunker(chunk_tokens=120, overlap_tokens=16, encoding=WordEncoding()))
+    char_chunks = _chunk(recursive_chunker())
+
+    assert len(token_chunks) < len(char_chunks)
+    assert sum(len(c["text"]) for c in token_chunks) < sum(len(c["text"]) for c in char_chunks)
+
+
+def test_invalid_budget():
+    with pytest.raises(ValueError):
+        token_chunker(chunk_tokens=10, overlap_tokens=10)
+
+
+def test_picklable_for_worker_processes():
+    chunker = pickle.loads(pickle.dumps(token_chunker(encoding=WordEncoding())))
+    assert isinstance(chunker.encoding, WordEncoding)